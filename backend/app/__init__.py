@@ -1,3 +1,13 @@
-from .main import app
+from importlib import import_module
 
 __all__ = ["app"]
+
+
+def __getattr__(name):
+    # Lazy so importing a submodule (e.g. the report renderers in a spawned
+    # render process) does not build the whole API and start its logging thread
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = import_module(".main", __name__).app
+    globals()[name] = value
+    return value
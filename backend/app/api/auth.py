@@ -1,16 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from ..core.database import get_database
+from fastapi.requests import HTTPConnection
 from ..models.user import UserCreate, UserLogin, UserResponse, Token
 from ..services.auth_service import AuthService
-from ..services.research_service import ResearchService
-from ..models.schemas import ResearchSession
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 
-def get_auth_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> AuthService:
-    return AuthService(db)
+def get_auth_service(connection: HTTPConnection) -> AuthService:
+    return connection.app.state.auth_service
 
 
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
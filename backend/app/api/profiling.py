@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from ..core.profiling import artifact_path, list_artifacts
+
+
+router = APIRouter(prefix="/api/profiles", tags=["profiling"])
+
+
+@router.get("")
+async def get_profiles():
+    """List stored profiling artifacts"""
+    return list_artifacts()
+
+
+@router.get("/{name}")
+async def download_profile(name: str):
+    """Download a pstats or HTML flame view artifact"""
+    path = artifact_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/html" if name.endswith(".html") else "application/octet-stream"
+    return FileResponse(path=path, media_type=media_type, filename=name)
@@ -1,18 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
-from fastapi.responses import FileResponse
-from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
-from ..core.database import get_database
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query, Request, Response
+from fastapi.requests import HTTPConnection
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
+from ..core.config import settings
+from ..core.encoding import EncodedEvent, dumps_text
 from ..models.schemas import (
     ResearchRequest, ResearchResponse, ResearchSession,
-    ApprovalRequest, AgentUpdate
+    ApprovalRequest, ReportFormat
 )
-from ..services.research_service import ResearchService
+from ..services.export_service import RENDERERS
+from ..services.research_service import ResearchService, TERMINAL_STATUSES
+from ..services.admission import queue_event
+from ..services.session_cache import session_cache
 from .websocket import manager
+from ..core.log import get_logger
 import asyncio
-import os
-import json
-from datetime import datetime
+import functools
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+logger = get_logger("api")
 
 
 def serialize_datetime(obj):
@@ -22,22 +30,36 @@ def serialize_datetime(obj):
 
 router = APIRouter(prefix="/api/research", tags=["research"])
 
+PONG = dumps_text({"type": "pong"})
 
-def get_research_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> ResearchService:
-    return ResearchService(db)
+
+def get_research_service(connection: HTTPConnection) -> ResearchService:
+    """The app-lifetime instance created in the lifespan (HTTP and WebSocket)"""
+    return connection.app.state.research_service
 
 
 @router.post("/start", response_model=ResearchResponse)
 async def start_research(
     request: ResearchRequest,
-    background_tasks: BackgroundTasks,
     service: ResearchService = Depends(get_research_service)
 ):
+    if not service.accepting:
+        raise HTTPException(status_code=503, detail="Server is shutting down", headers={"Retry-After": "1"})
+    if request.replay_session_id and not service.has_cassette(request.replay_session_id):
+        raise HTTPException(status_code=404, detail="No cassette recorded for that session")
+    if request.profile and not settings.profiling_enabled:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server")
+    
     # Create session
     session = await service.create_session(request)
     
-    # Start research in background
-    background_tasks.add_task(service.execute_research, session.id)
+    # Start research in background; the service tracks it so shutdown can drain it
+    service.start_research(
+        session.id,
+        update_callback=functools.partial(broadcast_update, session.id),
+        profile=request.profile,
+        queue_callback=functools.partial(manager.broadcast_to_session, session.id)
+    )
     
     return ResearchResponse(
         session_id=session.id,
@@ -46,27 +68,113 @@ async def start_research(
     )
 
 
+def validators(version: int, updated_at) -> dict:
+    """ETag/Last-Modified headers for a session; ``no-cache`` makes browsers revalidate every poll"""
+    headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
+    if isinstance(updated_at, datetime):
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(updated_at, usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, headers: dict) -> bool:
+    """RFC 9110 precedence: If-None-Match decides when present, else If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return headers["ETag"] in tags or "*" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
 @router.get("/session/{session_id}", response_model=ResearchSession)
 async def get_session(
     session_id: str,
+    request: Request,
+    response: Response,
     service: ResearchService = Depends(get_research_service)
 ):
+    # Cheap revalidation first: only version/updated_at are read for a 304
+    marker = await service.get_version(session_id)
+    if not marker:
+        raise HTTPException(status_code=404, detail="Session not found")
+    headers = validators(marker["version"], marker.get("updated_at"))
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
     session = await service.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    response.headers.update(validators(session.version, session.updated_at))
     return session
 
 
+@router.get("/session/{session_id}/delta")
+async def get_session_delta(
+    session_id: str,
+    since: str = Query("0.0", description="token from the previous delta, '<version>.<last event seq>'"),
+    service: ResearchService = Depends(get_research_service)
+):
+    """Status plus whatever changed since ``since``: rewritten plan/sections and new agent updates"""
+    try:
+        since_version, since_seq = (int(part) for part in since.split("."))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid delta token")
+    
+    marker = await service.get_version(session_id)
+    if not marker:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if marker["version"] == since_version:
+        return Response(status_code=304, headers=validators(marker["version"], marker.get("updated_at")))
+    
+    delta = await service.get_delta(session_id, since_version, since_seq)
+    if delta is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return delta
+
+
+@router.get("/session/{session_id}/trace")
+async def get_session_trace(
+    session_id: str,
+    service: ResearchService = Depends(get_research_service)
+):
+    """Waterfall summary of the session's last research run (debugging aid)"""
+    summary = await service.get_trace_summary(session_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail="No trace recorded for this session")
+    return summary
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit rate of this process's session cache"""
+    return session_cache.stats()
+
+
+@router.get("/admission/stats")
+async def get_admission_stats(service: ResearchService = Depends(get_research_service)):
+    """Running and queued research runs in this process"""
+    return service.admission.stats()
+
+
 @router.post("/approve")
 async def approve_plan(
     approval: ApprovalRequest,
     service: ResearchService = Depends(get_research_service)
 ):
-    session = await service.get_session(approval.session_id)
-    if not session:
+    processed = await service.approve_plan(approval)
+    if processed is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    await service.approve_plan(approval)
+    if not processed:
+        raise HTTPException(status_code=409, detail="Session already finished")
     
     return {"message": "Plan approval processed", "approved": approval.approved}
 
@@ -81,38 +189,138 @@ async def get_user_sessions(
     return sessions
 
 
+@router.post("/session/{session_id}/cancel")
+async def cancel_research(
+    session_id: str,
+    service: ResearchService = Depends(get_research_service)
+):
+    """
+    Stop a session that is planning, awaiting approval or researching. It
+    is marked cancelled at once; the run stops mid-step if this worker owns
+    it, otherwise before its next agent step.
+    """
+    cancelled = await service.cancel_research(session_id)
+    if cancelled is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="Session already finished")
+    return {"message": "Research cancelled", "session_id": session_id}
+
+
 @router.delete("/session/{session_id}")
 async def delete_session(
     session_id: str,
     service: ResearchService = Depends(get_research_service)
 ):
-    """Delete a research session"""
+    """Delete a research session, cancelling its run if one is in progress"""
     deleted = await service.delete_session(session_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"message": "Session deleted successfully"}
 
 
+def byte_range(request: Request, etag: str, length: int) -> Optional[Tuple[int, int]]:
+    """
+    The single ``bytes=`` range requested, as inclusive offsets, or None for
+    the whole body: no Range, a stale If-Range, or multiple ranges (which we
+    answer with 200 rather than multipart). An invalid range, e.g.
+    ``bytes=500-100``, is ignored as RFC 9110 requires; a valid one that
+    selects nothing (starts past the end, or ``bytes=-0``) raises 416.
+    """
+    header = request.headers.get("range")
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    if not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if first and last and int(last) < int(first):
+        return None
+    if first:
+        start = int(first)
+        end = min(int(last), length - 1) if last else length - 1
+    else:
+        start, end = max(length - int(last), 0), length - 1  # suffix: the last N bytes
+    if start > end or start >= length:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{length}"})
+    return start, end
+
+
 @router.get("/download/{session_id}")
 async def download_report(
     session_id: str,
+    request: Request,
+    report_format: ReportFormat = Query(ReportFormat.PDF, alias="format"),
     service: ResearchService = Depends(get_research_service)
 ):
-    """Download the PDF report for a research session"""
+    """
+    Download the report for a research session as PDF (default), Markdown
+    (``?format=md``) or HTML (``?format=html``), streamed from the report
+    store in chunks. A format not rendered yet, or rendered from older
+    sections, is built from the stored sections first and kept for the next
+    request. Supports Range/If-Range for resumed and partial downloads and
+    If-None-Match for revalidation.
+    """
     session = await service.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    if session.status != "completed" or not session.final_report_path:
+    if session.status != "completed":
+        raise HTTPException(status_code=404, detail="Report not available")
+    
+    # Rendered from the stored sections if missing or the sections changed
+    try:
+        report = await service.ensure_report(session, report_format)
+    except Exception as e:
+        logger.exception(f"Report rendering failed for {session_id} ({report_format.value}): {e}")
+        raise HTTPException(status_code=500, detail="Report generation failed")
+    if report is None:
         raise HTTPException(status_code=404, detail="Report not available")
     
-    if not os.path.exists(session.final_report_path):
-        raise HTTPException(status_code=404, detail="Report file not found")
+    renderer = RENDERERS[report_format]
+    filename = f"research_report_{session_id}.{report_format.value}"
+    headers = validators(0, report.modified)
+    headers.update({
+        "ETag": report.etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'{"inline" if renderer.inline else "attachment"}; filename="{filename}"',
+    })
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
     
-    return FileResponse(
-        path=session.final_report_path,
-        filename=f"research_report_{session_id}.pdf",
-        media_type="application/pdf"
+    requested = byte_range(request, report.etag, report.length)
+    start, end = requested or (0, report.length - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if requested:
+        headers["Content-Range"] = f"bytes {start}-{end}/{report.length}"
+    return StreamingResponse(
+        service.reports.read(report, start, end),
+        status_code=206 if requested else 200,
+        media_type=renderer.media_type,
+        headers=headers
+    )
+
+
+@router.get("/export/{user_id}")
+async def export_reports(
+    user_id: str,
+    report_format: ReportFormat = Query(ReportFormat.PDF, alias="format"),
+    session_ids: Optional[List[str]] = Query(None, alias="session_id"),
+    service: ResearchService = Depends(get_research_service)
+):
+    """
+    Zip of all of a user's completed reports, or only those given as
+    repeated ``?session_id=`` parameters, in one format. The archive is
+    streamed while it is built, and reports missing from the store are
+    rendered on the way.
+    """
+    filename = f"insightengine_reports_{datetime.utcnow():%Y%m%d}.zip"
+    return StreamingResponse(
+        service.export_archive(user_id, report_format, session_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
@@ -120,57 +328,78 @@ async def download_report(
 async def websocket_endpoint(
     websocket: WebSocket,
     session_id: str,
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    since: int = Query(0, ge=0),
+    service: ResearchService = Depends(get_research_service)
 ):
     """
     WebSocket endpoint for streaming real-time research updates.
     Clients connect here to watch the multi-agent system work.
+    
+    Every update carries a ``seq``; a client reconnecting with ``?since=<last
+    seq it saw>`` only receives the events after it, with no gap or overlap
+    between the history message and the live stream.
     """
     await manager.connect(websocket, session_id)
+    tail = None
     
     try:
-        # Send existing updates first
-        service = ResearchService(db)
-        session = await service.get_session(session_id)
+        # Send missed updates first; live broadcasts are buffered meanwhile
+        updates = await service.get_agent_updates(session_id, since)
         
-        if session and session.agent_updates:
-            # Convert to dict with datetime serialization
-            updates_data = []
-            for u in session.agent_updates:
-                update_dict = u.dict()
-                update_dict['timestamp'] = update_dict['timestamp'].isoformat()
-                updates_data.append(update_dict)
-            
-            await websocket.send_json({
+        if updates:
+            # Stored updates are already in wire form; encode the whole history once
+            await websocket.send_text(dumps_text({
                 "type": "history",
-                "updates": updates_data
-            })
+                "since": since,
+                "updates": updates
+            }))
+        last_seq = updates[-1]["seq"] if updates else since
+        await manager.go_live(websocket, last_seq)
+        queued = service.admission.position(session_id)
+        if queued:
+            # Later changes arrive as broadcasts; a client joining mid-wait needs the current place
+            await websocket.send_text(dumps_text(queue_event(*queued)))
+        if session_id not in service.running:
+            # Broadcasts only reach connections in the worker running the session
+            tail = asyncio.create_task(tail_session(websocket, service, session_id, last_seq))
         
         # Keep connection alive and listen for messages
         while True:
             try:
                 data = await websocket.receive_text()
                 # Echo back for connection health check
-                await websocket.send_json({"type": "pong"})
+                await websocket.send_text(PONG)
             except WebSocketDisconnect:
                 break
             except Exception as e:
-                print(f"WebSocket error: {e}")
+                logger.debug(f"WebSocket error: {e}")
                 break
     
     finally:
+        if tail is not None:
+            tail.cancel()
         manager.disconnect(websocket, session_id)
 
 
+async def tail_session(websocket: WebSocket, service: ResearchService, session_id: str, last_seq: int):
+    """Relay a run owned by another worker process by polling its stored updates until it ends"""
+    try:
+        while True:
+            await asyncio.sleep(settings.ws_tail_interval_seconds)
+            updates, status = await service.poll_agent_updates(session_id, last_seq)
+            for record in updates:
+                await websocket.send_text(EncodedEvent(record).text)
+            if updates:
+                last_seq = updates[-1]["seq"]
+            if status is None or status in TERMINAL_STATUSES:
+                return
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.debug(f"WebSocket tail stopped: {e}")
+
+
 # Helper function for services to broadcast updates
-async def broadcast_update(session_id: str, update: AgentUpdate):
+async def broadcast_update(session_id: str, event: EncodedEvent):
     """Broadcast an agent update to all connected clients"""
-    update_dict = update.dict()
-    update_dict['timestamp'] = update_dict['timestamp'].isoformat()
-    await manager.broadcast_to_session(
-        session_id,
-        {
-            "type": "agent_update",
-            "update": update_dict
-        }
-    )
+    await manager.broadcast_to_session(session_id, event.text, seq=event.seq)
@@ -1,37 +1,76 @@
 from fastapi import WebSocket
-from typing import Dict, Set
-import json
+from typing import Dict, List, Optional, Set, Tuple, Union
+from ..core.metrics import WEBSOCKET_CONNECTIONS, WEBSOCKET_QUEUE_DEPTH
+from ..core.encoding import dumps_text
 
 
 class ConnectionManager:
     
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # Connections still being sent history; live messages queue here meanwhile
+        self.pending: Dict[WebSocket, List[Tuple[Optional[int], str]]] = {}
     
     async def connect(self, websocket: WebSocket, session_id: str):
+        """Accept and subscribe; broadcasts are buffered until ``go_live``"""
         await websocket.accept()
         if session_id not in self.active_connections:
             self.active_connections[session_id] = set()
         self.active_connections[session_id].add(websocket)
+        self.pending[websocket] = []
+        WEBSOCKET_CONNECTIONS.inc()
+    
+    async def go_live(self, websocket: WebSocket, last_seq: int):
+        """Flush messages buffered during history replay, skipping events the history already had"""
+        buffer = self.pending.get(websocket)
+        while buffer:
+            seq, text = buffer.pop(0)
+            if seq is None or seq > last_seq:
+                await websocket.send_text(text)
+                last_seq = seq or last_seq
+        self.pending.pop(websocket, None)
     
     def disconnect(self, websocket: WebSocket, session_id: str):
-        if session_id in self.active_connections:
+        self.pending.pop(websocket, None)
+        if session_id in self.active_connections and websocket in self.active_connections[session_id]:
             self.active_connections[session_id].discard(websocket)
+            WEBSOCKET_CONNECTIONS.dec()
             if not self.active_connections[session_id]:
                 del self.active_connections[session_id]
     
-    async def broadcast_to_session(self, session_id: str, message: dict):
+    async def close_all(self, code: int = 1012):
+        """Close every connection; 1012 (service restart) makes clients reconnect and resume via ``since``"""
+        for session_id, connections in list(self.active_connections.items()):
+            for connection in list(connections):
+                try:
+                    await connection.close(code=code)
+                except Exception:
+                    pass
+                self.disconnect(connection, session_id)
+    
+    async def broadcast_to_session(self, session_id: str, message: Union[dict, str], seq: Optional[int] = None):
+        """Send a message to every connection of a session, encoding it at most once"""
         if session_id in self.active_connections:
-            disconnected = set()
+            text = message if isinstance(message, str) else dumps_text(message)
+            connections = []
             for connection in self.active_connections[session_id]:
+                if connection in self.pending:
+                    self.pending[connection].append((seq, text))
+                else:
+                    connections.append(connection)
+            WEBSOCKET_QUEUE_DEPTH.inc(len(connections))
+            disconnected = set()
+            for connection in connections:
                 try:
-                    await connection.send_json(message)
+                    await connection.send_text(text)
                 except Exception:
                     disconnected.add(connection)
+                finally:
+                    WEBSOCKET_QUEUE_DEPTH.dec()
             
             # Clean up disconnected clients
             for connection in disconnected:
-                self.active_connections[session_id].discard(connection)
+                self.disconnect(connection, session_id)
 
 
 manager = ConnectionManager()
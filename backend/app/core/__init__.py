@@ -1,4 +1,19 @@
+from importlib import import_module
 from .config import settings
-from .database import Database, get_database
 
-__all__ = ["settings", "Database", "get_database"]
+# Database resolves on first access so code that only needs settings (e.g. a
+# spawned report render process) does not import motor
+_EXPORTS = {
+    "Database": ".database",
+    "get_database": ".database",
+}
+
+__all__ = ["settings", *_EXPORTS]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,18 +1,79 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 
 class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     database_name: str = "insightengine"
+    # Client tuning; unset values fall back to MONGODB_URL options, then driver defaults
+    mongo_max_pool_size: Optional[int] = None
+    mongo_min_pool_size: Optional[int] = None
+    mongo_max_idle_time_ms: Optional[int] = None
+    mongo_wait_queue_timeout_ms: Optional[int] = None
+    mongo_server_selection_timeout_ms: Optional[int] = None
+    mongo_connect_timeout_ms: Optional[int] = None
+    mongo_socket_timeout_ms: Optional[int] = None
+    mongo_compressors: str = ""
+    # Per-operation read routing: primary | primaryPreferred | secondary | secondaryPreferred | nearest
+    mongo_history_read_preference: str = "primary"
+    mongo_listing_read_preference: str = "primary"
+    mongo_max_staleness_seconds: int = -1
     secret_key: str = "your-secret-key-change-in-production"
     openai_api_key: str
+    openai_base_url: str = ""
     environment: str = "development"
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
     cloudinary_cloud_name: str = ""
     cloudinary_api_key: str = ""
     cloudinary_api_secret: str = ""
+    openai_rpm_limit: int = 500
+    openai_tpm_limit: int = 30000
+    openai_max_connections: int = 20
+    openai_max_retries: int = 6
+    llm_default_completion_tokens: int = 1000
+    web_host_rate_per_second: float = 1.0
+    web_host_burst: int = 2
+    web_breaker_failure_threshold: int = 3
+    web_breaker_cooldown_seconds: float = 300.0
+    research_section_deadline_seconds: float = 20.0
+    search_overfetch_factor: int = 3
+    research_content_budget_chars: int = 1800
+    dedup_similarity_threshold: float = 0.8
+    approval_poll_interval_seconds: float = 5.0
+    approval_timeout_seconds: float = 3600.0
+    agent_step_timeout_seconds: float = 300.0
+    research_max_concurrent: int = 8
+    research_max_per_user: int = 2
+    research_user_weights: str = ""
+    cassette_mode: str = "off"
+    cassette_dir: str = ""
+    search_providers: str = "duckduckgo"
+    duckduckgo_url: str = "https://html.duckduckgo.com/html/"
+    searxng_url: str = ""
+    search_index_path: str = ""
+    search_hedge_quantile: float = 0.9
+    search_hedge_default_delay: float = 2.0
+    trace_exporter: str = "none"
+    trace_file_path: str = "traces/spans.jsonl"
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    profiling_enabled: bool = False
+    profile_dir: str = "profiles"
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_debug_sample_rate: int = 10
+    session_cache_size: int = 256
+    session_cache_ttl_seconds: float = 5.0
+    shutdown_grace_seconds: float = 30.0
+    ws_tail_interval_seconds: float = 1.0
+    report_store: str = "gridfs"
+    report_gridfs_bucket: str = "reports"
+    report_dir: str = ""
+    report_chunk_size: int = 261120
+    report_cache_dir: str = ""
+    report_cache_max_mb: int = 512
+    report_render_processes: int = 2
+    export_page_size: int = 50
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -1,19 +1,126 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 from .config import settings
+from .metrics import MONGO_SECONDS
+from .tracing import tracer
+from .log import get_logger
+
+
+logger = get_logger("database")
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Settings field -> MongoClient keyword
+CLIENT_OPTIONS = {
+    "mongo_max_pool_size": "maxPoolSize",
+    "mongo_min_pool_size": "minPoolSize",
+    "mongo_max_idle_time_ms": "maxIdleTimeMS",
+    "mongo_wait_queue_timeout_ms": "waitQueueTimeoutMS",
+    "mongo_server_selection_timeout_ms": "serverSelectionTimeoutMS",
+    "mongo_connect_timeout_ms": "connectTimeoutMS",
+    "mongo_socket_timeout_ms": "socketTimeoutMS",
+}
+
+
+def read_preference(name: str, max_staleness: int = -1):
+    """A read preference from its connection-string name, e.g. ``secondaryPreferred``"""
+    mode = READ_PREFERENCES.get(name.strip().lower())
+    if mode is None:
+        raise ValueError(f"Unknown read preference: {name}")
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=max_staleness)
+
+
+class TimedCursor:
+    """Cursor wrapper that times ``to_list`` as a ``find`` operation"""
+    
+    CHAINABLE = {"sort", "limit", "skip", "batch_size"}
+    
+    def __init__(self, cursor):
+        self._cursor = cursor
+    
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name in self.CHAINABLE:
+            return lambda *args, **kwargs: TimedCursor(attr(*args, **kwargs))
+        return attr
+    
+    async def to_list(self, length=None):
+        with MONGO_SECONDS.labels("find").time(), tracer.span("mongo.find", operation="find"):
+            return await self._cursor.to_list(length=length)
+
+
+class TimedCollection:
+    """Collection wrapper that records each awaited operation's latency and span"""
+    
+    TIMED = {
+        "find_one", "insert_one", "update_one", "update_many",
+        "delete_one", "find_one_and_update", "find_one_and_delete", "count_documents",
+    }
+    
+    def __init__(self, collection):
+        self._collection = collection
+    
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in self.TIMED:
+            return attr
+        
+        async def timed(*args, **kwargs):
+            with MONGO_SECONDS.labels(name).time(), tracer.span(f"mongo.{name}", operation=name):
+                return await attr(*args, **kwargs)
+        return timed
+    
+    def find(self, *args, **kwargs) -> TimedCursor:
+        return TimedCursor(self._collection.find(*args, **kwargs))
+    
+    def reading_from(self, preference: str) -> "TimedCollection":
+        """
+        The same collection with reads routed by ``preference``. Secondary
+        reads can lag the primary by the replication delay; only use them
+        where a slightly old view is acceptable.
+        """
+        if preference.strip().lower() == "primary":
+            return self
+        return TimedCollection(self._collection.with_options(
+            read_preference=read_preference(preference, settings.mongo_max_staleness_seconds)
+        ))
+
 
 class Database:
     client: AsyncIOMotorClient = None
     
+    @staticmethod
+    def client_options() -> dict:
+        """Keyword options for the client; only the ones configured, so URL options still apply"""
+        options = {
+            option: getattr(settings, field)
+            for field, option in CLIENT_OPTIONS.items()
+            if getattr(settings, field) is not None
+        }
+        if settings.mongo_compressors:
+            # zstd needs ``zstandard`` and snappy ``python-snappy``; the driver skips (and warns about) missing ones
+            options["compressors"] = settings.mongo_compressors
+        return options
+    
     @classmethod
     async def connect_db(cls):
-        cls.client = AsyncIOMotorClient(settings.mongodb_url)
-        print(f"Connected to MongoDB at {settings.mongodb_url}")
+        options = cls.client_options()
+        cls.client = AsyncIOMotorClient(settings.mongodb_url, **options)
+        logger.info(f"Connected to MongoDB at {settings.mongodb_url}" + (f" with {options}" if options else ""))
     
     @classmethod
     async def close_db(cls):
         if cls.client:
             cls.client.close()
-            print("Closed MongoDB connection")
+            logger.info("Closed MongoDB connection")
     
     @classmethod
     def get_db(cls):
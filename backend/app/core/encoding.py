@@ -0,0 +1,59 @@
+from typing import Any, Dict
+from datetime import datetime
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements, the fallback keeps tools importable
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, "value"):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+class EncodedEvent:
+    """
+    An agent update converted once into its stored form and its wire form.
+
+    ``record`` is the plain dict pushed to ``agent_updates`` in Mongo,
+    carrying the event's per-session sequence number (1-based, equal to its
+    position in ``agent_updates``);
+    ``text`` is the complete ``agent_update`` WebSocket message, encoded a
+    single time and sent as-is to every connection watching the session.
+    """
+
+    __slots__ = ("record", "text")
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.text = dumps_text({"type": "agent_update", "update": record})
+
+    @property
+    def seq(self) -> int:
+        return self.record["seq"]
+
+    @classmethod
+    def from_update(cls, update, seq: int) -> "EncodedEvent":
+        return cls({
+            "seq": seq,
+            "agent": update.agent.value,
+            "action": update.action,
+            "details": update.details,
+            "timestamp": update.timestamp.isoformat(),
+        })
@@ -0,0 +1,163 @@
+from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .config import settings
+import atexit
+import copy
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+
+ROOT_LOGGER = "insightengine"
+
+session_id_var: ContextVar[Optional[str]] = ContextVar("log_session_id", default=None)
+agent_var: ContextVar[Optional[str]] = ContextVar("log_agent", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(component: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{component}")
+
+
+@contextmanager
+def log_context(session_id: Optional[str] = None, agent: Optional[str] = None):
+    """Attach a session id and/or agent to every record logged inside the block"""
+    tokens = []
+    if session_id is not None:
+        tokens.append((session_id_var, session_id_var.set(session_id)))
+    if agent is not None:
+        tokens.append((agent_var, agent_var.set(agent)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def agent_context(agent: str):
+    """Decorator running a coroutine function inside ``log_context(agent=...)``"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with log_context(agent=agent):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ContextFilter(logging.Filter):
+    """Copies the logging context variables onto the record in the calling task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "session_id"):
+            record.session_id = session_id_var.get()
+        if not hasattr(record, "agent"):
+            record.agent = agent_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in ``rate`` DEBUG records per call site; other levels always pass"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counts: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.rate == 0
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them.
+
+    The stock ``prepare`` renders the full formatted line (traceback
+    included) on the calling thread; here only the message arguments are
+    resolved, so that mutable arguments are captured as they were, and all
+    formatting and I/O happens on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "session_id", None):
+            entry["session_id"] = record.session_id
+        if getattr(record, "agent", None):
+            entry["agent"] = record.agent
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s%(context)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [f"{key}={value}" for key in ("session_id", "agent") if (value := getattr(record, key, None))]
+        record.context = f" [{' '.join(parts)}]" if parts else ""
+        return super().format(record)
+
+
+def setup_logging(stream=None) -> logging.Logger:
+    """
+    Route ``insightengine.*`` loggers through a queue to a background thread.
+
+    Callers only pay for a filter pass and a ``queue.put``; formatting and
+    the blocking write to ``stream`` (stdout by default) happen on the
+    listener thread. Safe to call more than once.
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None:
+        return root
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    handler = ContextQueueHandler(queue.SimpleQueue())
+    handler.addFilter(SamplingFilter(settings.log_debug_sample_rate))
+    handler.addFilter(ContextFilter())
+
+    root.handlers = [handler]
+    root.setLevel(settings.log_level.upper())
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(handler.queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
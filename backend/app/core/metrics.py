@@ -0,0 +1,133 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, multiprocess
+import os
+
+
+# Seconds; LLM calls and page fetches have long tails, Mongo ops are sub-millisecond
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+LLM_CALL_SECONDS = Histogram(
+    "insightengine_llm_call_seconds",
+    "Chat completion latency including gateway scheduling",
+    ["agent", "model"],
+    buckets=SLOW_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "insightengine_llm_tokens",
+    "Tokens per chat completion",
+    ["agent", "model", "kind"],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "insightengine_llm_queue_wait_seconds",
+    "Time spent waiting for the shared RPM/TPM buckets",
+    ["priority"],
+    buckets=SLOW_BUCKETS,
+)
+LLM_RETRIES = Counter(
+    "insightengine_llm_retries_total",
+    "Retried chat completions by error type",
+    ["error"],
+)
+
+SEARCH_SECONDS = Histogram(
+    "insightengine_search_seconds",
+    "Search provider latency",
+    ["provider", "outcome"],
+    buckets=SLOW_BUCKETS,
+)
+FETCH_SECONDS = Histogram(
+    "insightengine_page_fetch_seconds",
+    "Page download and extraction latency",
+    ["outcome"],
+    buckets=SLOW_BUCKETS,
+)
+
+MONGO_SECONDS = Histogram(
+    "insightengine_mongo_operation_seconds",
+    "ResearchService MongoDB operation latency",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+
+REPORT_RENDER_SECONDS = Histogram(
+    "insightengine_report_render_seconds",
+    "Time to render a report",
+    ["format"],
+    # Markdown/HTML take milliseconds, a long PDF tens of seconds
+    buckets=FAST_BUCKETS + SLOW_BUCKETS[4:],
+)
+
+WEBSOCKET_CONNECTIONS = Gauge(
+    "insightengine_websocket_connections",
+    "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+WEBSOCKET_QUEUE_DEPTH = Gauge(
+    "insightengine_websocket_queue_depth",
+    "WebSocket messages accepted for broadcast but not yet written",
+    multiprocess_mode="livesum",
+)
+
+SESSION_CACHE_REQUESTS = Counter(
+    "insightengine_session_cache_requests_total",
+    "Session reads by cache result (hit, miss, coalesced onto an in-flight load)",
+    ["result"],
+)
+REPORT_CACHE_REQUESTS = Counter(
+    "insightengine_report_cache_requests_total",
+    "Report downloads by local disk cache result",
+    ["result"],
+)
+SESSION_CACHE_SIZE = Gauge(
+    "insightengine_session_cache_entries",
+    "Parsed sessions held in the in-process cache",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "insightengine_admission_queue_depth",
+    "Research runs waiting for an admission slot",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "insightengine_admission_wait_seconds",
+    "Time a research phase waited for an admission slot",
+    ["phase"],
+    buckets=FAST_BUCKETS + SLOW_BUCKETS[4:],
+)
+
+SESSIONS = Counter(
+    "insightengine_sessions_total",
+    "Research session status transitions",
+    ["status"],
+)
+SECTION_REVISIONS = Histogram(
+    "insightengine_section_revisions",
+    "Revisions requested before a section was accepted",
+    buckets=(0, 1, 2, 3, 5),
+)
+AGENT_EVENTS = Counter(
+    "insightengine_agent_events_total",
+    "Agent updates emitted",
+    ["agent", "action"],
+)
+
+
+def collector_registry():
+    """
+    Registry to scrape. Under multiple workers (``PROMETHEUS_MULTIPROC_DIR``
+    set by ``run.py --prod``) every process writes its samples to that
+    directory and a scrape of any worker aggregates them all.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_worker_exited():
+    """Drop this process's ``livesum`` gauge samples when a worker stops"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,147 @@
+from typing import Optional
+from .config import settings
+from .log import get_logger
+import cProfile
+import os
+import re
+import threading
+import time
+
+
+logger = get_logger("profiling")
+
+
+ARTIFACT_NAME = re.compile(r"^[A-Za-z0-9._-]+\.(pstats|html)$")
+
+# cProfile and pyinstrument both hook the interpreter globally; only one profile may run at a time
+_lock = threading.Lock()
+
+
+def profile_dir() -> str:
+    return os.path.abspath(settings.profile_dir)
+
+
+def artifact_path(name: str) -> Optional[str]:
+    """Resolve a downloadable artifact name, rejecting anything that is not a plain file name"""
+    if not ARTIFACT_NAME.match(name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+def list_artifacts():
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    artifacts = []
+    for name in sorted(os.listdir(directory)):
+        if ARTIFACT_NAME.match(name):
+            stat = os.stat(os.path.join(directory, name))
+            artifacts.append({"name": name, "size": stat.st_size, "created_at": stat.st_mtime})
+    return artifacts
+
+
+class RunProfiler:
+    """
+    Profiles one research run.
+
+    Uses pyinstrument's sampling profiler in async mode when it is installed,
+    which follows only the profiled task and writes an HTML flame view.
+    Otherwise falls back to cProfile, which sees everything the event loop
+    thread runs meanwhile (other sessions included), and writes pstats.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path: Optional[str] = None
+        self._profiler = None
+        self._sampling = False
+
+    def start(self) -> bool:
+        if not _lock.acquire(blocking=False):
+            logger.info(f"Another profile is running, skipping {self.name}")
+            return False
+        try:
+            from pyinstrument import Profiler
+
+            self._profiler = Profiler(async_mode="enabled")
+            self._sampling = True
+        except ImportError:
+            self._profiler = cProfile.Profile()
+        if self._sampling:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+        return True
+
+    def stop(self) -> Optional[str]:
+        if self._profiler is None:
+            return None
+        try:
+            os.makedirs(profile_dir(), exist_ok=True)
+            if self._sampling:
+                self._profiler.stop()
+                self.path = os.path.join(profile_dir(), f"{self.name}.html")
+                with open(self.path, "w", encoding="utf-8") as f:
+                    f.write(self._profiler.output_html())
+            else:
+                self._profiler.disable()
+                self.path = os.path.join(profile_dir(), f"{self.name}.pstats")
+                self._profiler.dump_stats(self.path)
+        finally:
+            self._profiler = None
+            _lock.release()
+        logger.info(f"Wrote {self.path}")
+        return self.path
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that cProfiles a single request when asked to via an
+    ``X-Profile`` header or ``?profile=1``. The artifact name is returned in
+    an ``X-Profile-Artifact`` header. Only installed when profiling is enabled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        if any(name == b"x-profile" and value not in (b"", b"0") for name, value in scope.get("headers", [])):
+            return True
+        return re.search(rb"(^|&)profile=1(&|$)", scope.get("query_string", b"")) is not None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            return await self.app(scope, receive, send)
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        name = f"request-{time.strftime('%Y%m%d-%H%M%S')}-{scope['method'].lower()}-{slug[:60]}.pstats"
+        if not _lock.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+        profiler = cProfile.Profile()
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            profiler.disable()
+            _lock.release()
+            os.makedirs(profile_dir(), exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_dir(), name))
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-artifact", name.encode())]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Write the artifact before the client sees the end of the response
+                finish()
+            await send(message)
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            finish()
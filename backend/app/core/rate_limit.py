@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Continuously refilling token bucket.
+
+    Tokens refill at ``refill_rate`` per second up to ``capacity``. The bucket
+    is not coroutine-aware on its own; callers decide whether to wait
+    (``acquire``) or to schedule around ``time_until``.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def _clamp(self, amount: float) -> float:
+        # A request larger than the bucket could never be satisfied
+        return min(float(amount), self.capacity)
+
+    def time_until(self, amount: float = 1.0) -> float:
+        """Seconds until ``amount`` tokens are available (0 if available now)"""
+        self._refill()
+        missing = self._clamp(amount) - self.tokens
+        if missing <= 0:
+            return 0.0
+        if self.refill_rate <= 0:
+            return float("inf")
+        return missing / self.refill_rate
+
+    def try_consume(self, amount: float = 1.0) -> bool:
+        self._refill()
+        amount = self._clamp(amount)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def consume(self, amount: float):
+        """Unconditionally take (or, with a negative amount, refund) tokens.
+
+        Used to reconcile an estimate with the real cost after the fact, so the
+        balance may go negative.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    async def acquire(self, amount: float = 1.0):
+        while not self.try_consume(amount):
+            await asyncio.sleep(self.time_until(amount))
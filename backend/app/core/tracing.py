@@ -0,0 +1,283 @@
+from typing import Any, Callable, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import defaultdict
+from .config import settings
+from .log import get_logger
+import asyncio
+import functools
+import inspect
+import json
+import os
+import time
+
+
+logger = get_logger("tracing")
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation, shaped after the OpenTelemetry span data model"""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_span_id", "name",
+        "start_ns", "end_ns", "attributes", "status",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON representation"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}} for k, v in self.attributes.items()
+            ],
+            "status": {"code": 2 if self.status == "error" else 1},
+        }
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON ``ExportTraceServiceRequest`` per trace to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, payload: str):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(payload + "\n")
+
+    async def export(self, spans: List[Span]):
+        await asyncio.to_thread(self._write, json.dumps(otlp_payload(spans)))
+
+
+class OTLPHttpExporter:
+    """Posts OTLP/JSON to a collector's ``/v1/traces`` endpoint"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    async def export(self, spans: List[Span]):
+        import httpx
+
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                await client.post(self.endpoint, json=otlp_payload(spans))
+        except Exception as e:
+            logger.warning(f"OTLP export failed: {e}")
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "insightengine"}}]},
+            "scopeSpans": [{"scope": {"name": "insightengine"}, "spans": [s.to_otlp() for s in spans]}],
+        }]
+    }
+
+
+class Tracer:
+    """
+    Minimal in-process tracer.
+
+    Spans are only recorded inside a trace started with ``start_trace``;
+    elsewhere ``span`` is a cheap no-op. The current span travels in a
+    context variable, so tasks created inside a span (e.g. concurrent page
+    fetches) are parented to it automatically.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self._traces: Dict[str, List[Span]] = {}
+
+    @contextmanager
+    def start_trace(self, name: str, **attributes):
+        root = Span(name, os.urandom(16).hex(), None, attributes)
+        self._traces[root.trace_id] = []
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException:
+            root.status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            root.end_ns = time.time_ns()
+            self._traces[root.trace_id].append(root)
+
+    def finish_trace(self, trace_id: str) -> List[Span]:
+        """Detach a trace's spans and hand them to the exporter in the background"""
+        spans = self._traces.pop(trace_id, [])
+        if self.exporter and spans:
+            asyncio.get_running_loop().create_task(self.exporter.export(spans))
+        return spans
+
+    def start_span(self, name: str, **attributes) -> Optional[Span]:
+        """Start a span without making it current; call ``end_span`` when done"""
+        parent = _current_span.get()
+        if parent is None or parent.trace_id not in self._traces:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+    def end_span(self, span: Optional[Span], status: str = "ok"):
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        span.status = status
+        trace = self._traces.get(span.trace_id)
+        if trace is not None:
+            trace.append(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        status = "ok"
+        try:
+            yield span
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span, status)
+
+
+def traced(name: str, **argument_attributes: str) -> Callable:
+    """
+    Decorator wrapping a coroutine function in a span.
+
+    Keyword arguments map span attribute names to parameter names, e.g.
+    ``@traced("web.fetch", url="url")``.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            attributes = {}
+            if argument_attributes and _current_span.get() is not None:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                attributes = {
+                    attr: bound[param] for attr, param in argument_attributes.items() if param in bound
+                }
+            with tracer.span(name, **attributes):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _union_ms(intervals: List[tuple]) -> float:
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total / 1e6
+
+
+def summarize_trace(spans: List[Span]) -> Dict[str, Any]:
+    """
+    Waterfall summary of a finished trace.
+
+    - ``critical_path``: walking back from the end of each span, the chain of
+      children that gated it, flattened with depth and offsets.
+    - ``sleep_ms``: time in spans tagged ``category="sleep"`` (polling waits).
+    - ``idle_ms``: time inside the root not covered by any child span.
+    """
+    root = next((s for s in spans if s.parent_span_id is None), None)
+    if root is None:
+        return {}
+
+    children = defaultdict(list)
+    for span in spans:
+        if span.parent_span_id:
+            children[span.parent_span_id].append(span)
+
+    def walk(span: Span, depth: int, out: List[Dict[str, Any]]):
+        kids = sorted(children.get(span.span_id, []), key=lambda s: s.end_ns)
+        chain = []
+        cursor = span.end_ns
+        while kids:
+            candidates = [k for k in kids if k.end_ns <= cursor]
+            if not candidates:
+                break
+            gating = candidates[-1]
+            chain.append(gating)
+            cursor = gating.start_ns
+            kids = [k for k in candidates if k.end_ns <= gating.start_ns]
+        for step in reversed(chain):
+            out.append({
+                "name": step.name,
+                "depth": depth,
+                "offset_ms": round((step.start_ns - root.start_ns) / 1e6, 1),
+                "duration_ms": round(step.duration_ms, 1),
+                **{k: v for k, v in step.attributes.items() if k in ("section", "agent", "url", "operation")},
+            })
+            walk(step, depth + 1, out)
+
+    critical_path: List[Dict[str, Any]] = []
+    walk(root, 0, critical_path)
+
+    by_name: Dict[str, Dict[str, float]] = {}
+    for span in spans:
+        entry = by_name.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + span.duration_ms, 1)
+
+    descendants = [(s.start_ns, s.end_ns) for s in spans if s is not root]
+    busy_ms = _union_ms(descendants)
+    return {
+        "trace_id": root.trace_id,
+        "total_ms": round(root.duration_ms, 1),
+        "span_count": len(spans),
+        "busy_ms": round(busy_ms, 1),
+        "idle_ms": round(max(0.0, root.duration_ms - busy_ms), 1),
+        "sleep_ms": round(sum(s.duration_ms for s in spans if s.attributes.get("category") == "sleep"), 1),
+        "by_name": by_name,
+        "critical_path": critical_path,
+    }
+
+
+def _build_exporter():
+    if settings.trace_exporter == "file":
+        return FileSpanExporter(settings.trace_file_path)
+    if settings.trace_exporter == "otlp":
+        return OTLPHttpExporter(settings.otlp_endpoint)
+    return None
+
+
+tracer = Tracer(_build_exporter())
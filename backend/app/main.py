@@ -1,10 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from contextlib import asynccontextmanager
 from .core.config import settings
 from .core.database import Database
-from .api import research, auth
+from .core.profiling import ProfilingMiddleware
+from .core.metrics import collector_registry, mark_worker_exited
+from .api import research, auth, profiling
+from .api.websocket import manager
+from .core.log import get_logger, setup_logging, shutdown_logging
+from .services.auth_service import AuthService
+from .services.research_service import ResearchService
+from .services.export_service import shutdown_render_pool
+import asyncio
+
+
+setup_logging()
+logger = get_logger("api")
 
 
 @asynccontextmanager
@@ -12,9 +25,18 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     await Database.connect_db()
+    # Services are stateless over the shared client: build them once per process
+    db = Database.get_db()
+    app.state.research_service = ResearchService(db)
+    app.state.auth_service = AuthService(db)
     yield
-    # Shutdown
+    # Shutdown: finish (or fail) research in flight while the database is still up
+    await app.state.research_service.drain(settings.shutdown_grace_seconds)
+    await asyncio.to_thread(shutdown_render_pool)
+    await manager.close_all()
     await Database.close_db()
+    mark_worker_exited()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -27,7 +49,7 @@ app = FastAPI(
 # Exception handler for validation errors
 @app.exception_handler(Exception)
 async def validation_exception_handler(request, exc):
-    print(f"Validation error: {exc}")
+    logger.error(f"Validation error: {exc}")
     return JSONResponse(
         status_code=422,
         content={"detail": str(exc)}
@@ -42,9 +64,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in profiling; neither the middleware nor the artifact routes exist unless enabled
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(research.router)
 app.include_router(auth.router)
+if settings.profiling_enabled:
+    app.include_router(profiling.router)
 
 
 @app.get("/")
@@ -59,3 +87,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(collector_registry()), media_type=CONTENT_TYPE_LATEST)
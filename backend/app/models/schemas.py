@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -13,6 +13,7 @@ class AgentType(str, Enum):
 
 class ResearchStatus(str, Enum):
     PENDING = "pending"
+    QUEUED = "queued"
     PLANNING = "planning"
     AWAITING_APPROVAL = "awaiting_approval"
     RESEARCHING = "researching"
@@ -20,6 +21,13 @@ class ResearchStatus(str, Enum):
     REVIEWING = "reviewing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ReportFormat(str, Enum):
+    PDF = "pdf"
+    MARKDOWN = "md"
+    HTML = "html"
 
 
 class Citation(BaseModel):
@@ -43,6 +51,7 @@ class SectionContent(BaseModel):
 
 
 class AgentUpdate(BaseModel):
+    seq: Optional[int] = None
     agent: AgentType
     action: str
     details: Dict[str, Any]
@@ -67,6 +76,9 @@ class ResearchRequest(BaseModel):
     user_id: str
     constraints: Optional[str] = None
     scope: Optional[str] = None
+    replay_session_id: Optional[str] = None
+    replay_latency: Literal["zero", "recorded"] = "zero"
+    profile: bool = False
 
 
 class ResearchSession(BaseModel):
@@ -79,8 +91,14 @@ class ResearchSession(BaseModel):
     research_notes: List[ResearchNote] = []
     sections: List[SectionContent] = []
     final_report_path: Optional[str] = None
+    # Other formats rendered on request, by format, as report store keys
+    report_exports: Dict[str, str] = {}
     cloudinary_url: Optional[str] = None
     agent_updates: List[AgentUpdate] = []
+    replay_session_id: Optional[str] = None
+    replay_latency: Literal["zero", "recorded"] = "zero"
+    profile_artifact: Optional[str] = None
+    version: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
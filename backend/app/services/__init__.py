@@ -1,12 +1,28 @@
-from .web_research import WebResearchService
-from .pdf_service import PDFReportService
-from .multi_agent import MultiAgentResearchSystem, AgentState
-from .research_service import ResearchService
-
-__all__ = [
-    "WebResearchService",
-    "PDFReportService",
-    "MultiAgentResearchSystem",
-    "AgentState",
-    "ResearchService",
-]
+from importlib import import_module
+
+# Exports resolve on first access so importing one service module (e.g. from
+# the API) does not drag in openai, reportlab, bs4 and numpy via the others.
+_EXPORTS = {
+    "WebResearchService": ".web_research",
+    "SearchProvider": ".search_providers",
+    "HedgedSearch": ".search_providers",
+    "PDFReportService": ".pdf_service",
+    "ReportRenderer": ".export_service",
+    "build_report_document": ".export_service",
+    "MultiAgentResearchSystem": ".multi_agent",
+    "AgentState": ".multi_agent",
+    "ResearchService": ".research_service",
+    "LLMGateway": ".llm_gateway",
+    "LLMPriority": ".llm_gateway",
+    "get_llm_gateway": ".llm_gateway",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,175 @@
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from collections import deque
+from contextlib import asynccontextmanager
+from ..core.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_WAIT_SECONDS
+from ..core.log import get_logger
+import asyncio
+import itertools
+import time
+
+
+logger = get_logger("admission")
+
+PositionCallback = Callable[[int, int], Awaitable[None]]
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """``"alice=2,guest=0.5"`` -> ``{"alice": 2.0, "guest": 0.5}``"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        user_id, _, weight = item.partition("=")
+        weights[user_id.strip()] = float(weight)
+    return weights
+
+
+def queue_event(phase: str, position: int, waiting: int) -> dict:
+    """WebSocket message for a queued session; ``position`` 1 is next in line"""
+    return {"type": "queue", "phase": phase, "position": position, "waiting": waiting}
+
+
+class Ticket:
+    __slots__ = ("session_id", "user_id", "phase", "finish", "order", "admitted", "enqueued")
+
+    def __init__(self, session_id: str, user_id: str, phase: str, finish: float, order: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.phase = phase
+        self.finish = finish
+        self.order = order
+        self.admitted = asyncio.get_running_loop().create_future()
+        self.enqueued = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Per-process admission for research runs: at most ``max_running`` at
+    once, and at most ``max_per_user`` of those for any one user.
+
+    Waiting runs are ordered across users by self-clocked weighted fair
+    queuing. Each ticket gets a virtual finish tag,
+    ``max(V, user's last tag) + 1 / weight``, and the eligible ticket with
+    the smallest tag goes next. V is the tag of the ticket admitted last. A
+    user who queues 50 runs therefore gets every other slot against a user
+    who queues one, instead of the next 50. Within a user, runs keep their
+    arrival order.
+    """
+
+    def __init__(self, max_running: int, max_per_user: int, weights: Optional[Dict[str, float]] = None):
+        self.max_running = max_running
+        self.max_per_user = max_per_user
+        self.weights = weights or {}
+        self.virtual_time = 0.0
+        self.running = 0
+        self.running_by_user: Dict[str, int] = {}
+        self.waiting: Dict[str, Deque[Ticket]] = {}
+        self.last_finish: Dict[str, float] = {}
+        self._order = itertools.count()
+        self._ranks: Dict[Ticket, int] = {}
+        self._changed: Optional[asyncio.Future] = None
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, user_id: str, phase: str, on_position: Optional[PositionCallback] = None):
+        ticket = await self.acquire(session_id, user_id, phase, on_position)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def acquire(
+        self,
+        session_id: str,
+        user_id: str,
+        phase: str,
+        on_position: Optional[PositionCallback] = None
+    ) -> Ticket:
+        """
+        Wait for a slot. While queued, ``on_position(position, waiting)`` is
+        awaited every time the position changes. A cancelled waiter leaves
+        the queue (or hands back a slot it was just given).
+        """
+        weight = self.weights.get(user_id, 1.0)
+        start = max(self.virtual_time, self.last_finish.get(user_id, 0.0))
+        ticket = Ticket(session_id, user_id, phase, start + 1.0 / weight, next(self._order))
+        self.last_finish[user_id] = ticket.finish
+        self.waiting.setdefault(user_id, deque()).append(ticket)
+        self._dispatch()
+
+        try:
+            last = None
+            while not ticket.admitted.done():
+                changed = self._changed
+                position = self._ranks.get(ticket)
+                if on_position is not None and position is not None and position != last:
+                    last = position
+                    await on_position(position, len(self._ranks))
+                    continue  # the queue may have moved while the callback ran
+                await asyncio.wait([ticket.admitted, changed], return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            if ticket.admitted.done():
+                self.release(ticket)
+            else:
+                self.waiting[user_id].remove(ticket)
+                self._forget(user_id)
+                self._dispatch()
+            raise
+
+        if last is not None:
+            logger.debug(f"Admitted {phase} after {time.perf_counter() - ticket.enqueued:.1f}s in queue")
+        ADMISSION_WAIT_SECONDS.labels(phase).observe(time.perf_counter() - ticket.enqueued)
+        return ticket
+
+    def release(self, ticket: Ticket):
+        self.running -= 1
+        self.running_by_user[ticket.user_id] -= 1
+        if not self.running_by_user[ticket.user_id]:
+            del self.running_by_user[ticket.user_id]
+        self._forget(ticket.user_id)
+        self._dispatch()
+
+    def position(self, session_id: str) -> Optional[Tuple[str, int, int]]:
+        """``(phase, position, waiting)`` if the session is queued here"""
+        for ticket, rank in self._ranks.items():
+            if ticket.session_id == session_id:
+                return ticket.phase, rank, len(self._ranks)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "waiting": len(self._ranks),
+            "max_running": self.max_running,
+            "max_per_user": self.max_per_user,
+            "users_running": len(self.running_by_user),
+            "users_waiting": sum(1 for queue in self.waiting.values() if queue),
+        }
+
+    def _forget(self, user_id: str):
+        # An idle user restarts from the current virtual time
+        if not self.waiting.get(user_id) and user_id not in self.running_by_user:
+            self.waiting.pop(user_id, None)
+            self.last_finish.pop(user_id, None)
+
+    def _dispatch(self):
+        """Admit eligible tickets while there is room, then re-rank the rest and wake their waiters"""
+        while self.running < self.max_running:
+            best = None
+            for user_id, queue in self.waiting.items():
+                if queue and self.running_by_user.get(user_id, 0) < self.max_per_user:
+                    head = queue[0]
+                    if best is None or (head.finish, head.order) < (best.finish, best.order):
+                        best = head
+            if best is None:
+                break
+            self.waiting[best.user_id].popleft()
+            self.virtual_time = max(self.virtual_time, best.finish)
+            self.running += 1
+            self.running_by_user[best.user_id] = self.running_by_user.get(best.user_id, 0) + 1
+            best.admitted.set_result(None)
+
+        queued: List[Ticket] = [ticket for queue in self.waiting.values() for ticket in queue]
+        queued.sort(key=lambda ticket: (ticket.finish, ticket.order))
+        self._ranks = {ticket: rank for rank, ticket in enumerate(queued, 1)}
+        ADMISSION_QUEUE_DEPTH.set(len(queued))
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = asyncio.get_running_loop().create_future()
@@ -0,0 +1,141 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from collections import defaultdict, deque
+from enum import Enum
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+
+
+class CassetteMode(str, Enum):
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class ReplayLatency(str, Enum):
+    RECORDED = "recorded"
+    ZERO = "zero"
+
+
+class CassetteMiss(Exception):
+    """Replay asked for an interaction the cassette does not contain"""
+
+
+class ReplayedLate(Exception):
+    """Zero-latency replay of an interaction that never finished when recorded"""
+
+
+def interaction_key(kind: str, request: Dict[str, Any]) -> str:
+    canonical = json.dumps(request, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(f"{kind}:{canonical}".encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Captured LLM calls and web fetches of one research session.
+
+    In record mode every interaction passing through ``intercept`` is
+    performed for real and appended with its timing. In replay mode the same
+    request is answered from the cassette instead, in recorded order for
+    repeated identical requests, optionally sleeping for the recorded
+    duration. Interactions cancelled while recording (e.g. fetches cut off by
+    the section deadline) replay as never finishing with recorded latency,
+    and raise ``ReplayedLate`` at once with zero latency, so the caller does
+    not sit out a real-time deadline. Cassettes are stored as
+    gzipped JSON lines: a header followed by one interaction per line.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        mode: CassetteMode,
+        replay_latency: ReplayLatency = ReplayLatency.ZERO,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.metadata = metadata or {}
+        self.entries: List[Dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+
+    @staticmethod
+    def read_metadata(path: str) -> Dict[str, Any]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.loads(f.readline()).get("metadata", {})
+
+    @classmethod
+    def load(cls, path: str, replay_latency: ReplayLatency = ReplayLatency.ZERO) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            entries = [json.loads(line) for line in f if line.strip()]
+        if header.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported cassette version: {header.get('version')}")
+
+        cassette = cls(path, CassetteMode.REPLAY, replay_latency, header.get("metadata"))
+        cassette.entries = entries
+        for entry in entries:
+            cassette._queues[entry["key"]].append(entry)
+        return cassette
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": self.VERSION, "metadata": self.metadata}) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry, default=str, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+
+    async def intercept(
+        self,
+        kind: str,
+        request: Dict[str, Any],
+        perform: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run ``perform`` (record) or answer from the cassette (replay).
+
+        ``perform`` must return something JSON-serializable; callers convert
+        rich responses to and from plain data around this call.
+        """
+        key = interaction_key(kind, request)
+
+        if self.mode == CassetteMode.REPLAY:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded {kind} interaction for {json.dumps(request, default=str)[:200]}")
+            entry = queue.popleft()
+            if entry.get("cancelled"):
+                if self.replay_latency == ReplayLatency.ZERO:
+                    raise ReplayedLate(f"{kind} was cut off when recorded")
+                # It never finished when recorded; block until the caller gives up on it again
+                await asyncio.Event().wait()
+            if self.replay_latency == ReplayLatency.RECORDED and entry["elapsed"] > 0:
+                await asyncio.sleep(entry["elapsed"])
+            return entry["response"]
+
+        if self.mode != CassetteMode.RECORD:
+            return await perform()
+
+        entry = {"kind": kind, "key": key, "offset": round(time.monotonic() - self._started, 6), "request": request}
+        started = time.monotonic()
+        try:
+            entry["response"] = await perform()
+        except asyncio.CancelledError:
+            entry.update(cancelled=True, response=None)
+            raise
+        finally:
+            entry["elapsed"] = round(time.monotonic() - started, 6)
+            if "response" in entry:
+                self.entries.append(entry)
+        return entry["response"]
+
+
+def cassette_path(session_id: str, directory: str) -> str:
+    return os.path.join(directory, f"{session_id}.jsonl.gz")
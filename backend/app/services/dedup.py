@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+import numpy as np
+import re
+import zlib
+
+
+_WORD = re.compile(r"\w+")
+_MERSENNE_61 = np.uint64((1 << 61) - 1)
+_SHINGLE_BASE = 1000003
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Words are hashed once with CRC32, combined into rolling shingle hashes
+    with a sliding window, and every permutation is applied to all shingles
+    in a single vectorized step. Two signatures agree in roughly the Jaccard
+    similarity of the underlying shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Kept below 2**31 so a * hash + b stays inside uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)[:, None]
+        self.shingle_size = shingle_size
+        self.powers = np.array(
+            [pow(_SHINGLE_BASE, i, 1 << 32) for i in range(shingle_size)], dtype=np.uint64
+        )
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        if not words:
+            return np.empty(0, dtype=np.uint64)
+        hashes = np.fromiter(
+            (zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words)
+        )
+        size = min(self.shingle_size, len(hashes))
+        windows = sliding_window_view(hashes, size)
+        # uint64 arithmetic wraps, so masking gives the polynomial hash mod 2**32
+        return np.unique((windows * self.powers[:size]).sum(axis=1) & np.uint64(0xFFFFFFFF))
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if shingles.size == 0:
+            return None
+        return ((self.a * shingles[None, :] + self.b) % _MERSENNE_61).min(axis=1)
+
+
+class DuplicateIndex:
+    """
+    Remembers the signatures of pages already used in a research session.
+
+    ``check`` fingerprints new content and reports which earlier URL it
+    near-duplicates. URLs found to be duplicates are remembered, so when a
+    mirror turns up again in a later search it is rejected before fetching.
+    """
+
+    def __init__(self, threshold: float = 0.8, max_entries: int = 500, hasher: Optional[MinHasher] = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hasher = hasher or MinHasher()
+        self.signatures = np.empty((0, self.hasher.a.shape[0]), dtype=np.uint64)
+        self.owners: List[str] = []
+        self.duplicates: Dict[str, str] = {}
+
+    def known_duplicate(self, url: str) -> Optional[str]:
+        return self.duplicates.get(url)
+
+    def check(self, url: str, content: str) -> Optional[str]:
+        """Return the URL ``content`` duplicates, or None after indexing it as new"""
+        signature = self.hasher.signature(content)
+        if signature is None:
+            return None
+
+        if self.owners:
+            similarity = (self.signatures == signature).mean(axis=1)
+            best = int(similarity.argmax())
+            if similarity[best] >= self.threshold and self.owners[best] != url:
+                self.duplicates[url] = self.owners[best]
+                return self.owners[best]
+
+        if url not in self.owners:
+            self.signatures = np.vstack([self.signatures, signature])[-self.max_entries:]
+            self.owners = (self.owners + [url])[-self.max_entries:]
+        return None
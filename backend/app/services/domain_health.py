@@ -0,0 +1,123 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from urllib.parse import urlparse
+from ..core.config import settings
+from ..core.rate_limit import TokenBucket
+from ..core.log import get_logger
+import time
+
+
+logger = get_logger("domain_health")
+
+
+class HostState:
+    """Politeness bucket and circuit breaker state for a single host"""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.bucket = TokenBucket(burst, rate_per_second)
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.opened_until = 0.0
+        self.probing = False
+        self.last_error: Optional[str] = None
+
+
+class DomainHealthTable:
+    """
+    Process-wide per-host rate limiting and circuit breaking for web fetches.
+
+    Every host gets its own token bucket so concurrent sessions can fetch from
+    many sites at once without hammering any one of them. After
+    ``failure_threshold`` consecutive timeouts/errors the host's circuit opens
+    and fetches are skipped outright for ``cooldown`` seconds. The first fetch
+    after the cooldown is a probe that either closes the circuit again or
+    re-opens it.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = 1.0,
+        burst: int = 2,
+        failure_threshold: int = 3,
+        cooldown: float = 300.0,
+        max_hosts: int = 10000,
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_hosts = max_hosts
+        self.hosts: "OrderedDict[str, HostState]" = OrderedDict()
+
+    @staticmethod
+    def host_for(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    def _state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(self.rate_per_second, self.burst)
+            self.hosts[host] = state
+            if len(self.hosts) > self.max_hosts:
+                self.hosts.popitem(last=False)
+        else:
+            self.hosts.move_to_end(host)
+        return state
+
+    def allow(self, url: str) -> bool:
+        """False while the host's circuit is open (skip the fetch entirely)"""
+        state = self._state(self.host_for(url))
+        if state.opened_until == 0.0:
+            return True
+        now = time.monotonic()
+        if now < state.opened_until:
+            return False
+        # Cooldown elapsed: let one probe through and keep everyone else out
+        # until it reports back (or another cooldown passes without a verdict)
+        state.opened_until = now + self.cooldown
+        state.probing = True
+        return True
+
+    async def acquire(self, url: str):
+        """Wait for the host's politeness bucket"""
+        await self._state(self.host_for(url)).bucket.acquire()
+
+    def record_success(self, url: str):
+        state = self._state(self.host_for(url))
+        state.total_successes += 1
+        state.consecutive_failures = 0
+        state.opened_until = 0.0
+        state.probing = False
+
+    def record_failure(self, url: str, reason: str):
+        host = self.host_for(url)
+        state = self._state(host)
+        state.total_failures += 1
+        state.consecutive_failures += 1
+        state.last_error = reason
+        if state.probing or state.consecutive_failures >= self.failure_threshold:
+            state.opened_until = time.monotonic() + self.cooldown
+            state.probing = False
+            logger.warning(f"Circuit open for {host} ({reason}), skipping for {self.cooldown:.0f}s")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            host: {
+                "open": state.opened_until > now,
+                "consecutive_failures": state.consecutive_failures,
+                "total_failures": state.total_failures,
+                "total_successes": state.total_successes,
+                "last_error": state.last_error,
+            }
+            for host, state in self.hosts.items()
+        }
+
+
+domain_health = DomainHealthTable(
+    rate_per_second=settings.web_host_rate_per_second,
+    burst=settings.web_host_burst,
+    failure_threshold=settings.web_breaker_failure_threshold,
+    cooldown=settings.web_breaker_cooldown_seconds,
+)
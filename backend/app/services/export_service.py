@@ -0,0 +1,353 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ..models.schemas import ReportFormat, SectionContent
+from ..core.config import settings
+import asyncio
+import html
+import multiprocessing
+
+
+def format_date(dt_value) -> str:
+    if dt_value is None:
+        return datetime.utcnow().strftime('%B %d, %Y')
+    if isinstance(dt_value, str):
+        try:
+            return datetime.fromisoformat(dt_value.replace('Z', '+00:00')).strftime('%B %d, %Y')
+        except ValueError:
+            return dt_value
+    elif hasattr(dt_value, 'strftime'):
+        return dt_value.strftime('%B %d, %Y')
+    else:
+        return str(dt_value)
+
+
+class ReportSection:
+    __slots__ = ("number", "title", "paragraphs")
+
+    def __init__(self, number: int, title: str, paragraphs: List[str]):
+        self.number = number
+        self.title = title
+        self.paragraphs = paragraphs
+
+
+class Reference:
+    __slots__ = ("number", "title", "url", "accessed")
+
+    def __init__(self, number: int, title: str, url: str, accessed: str):
+        self.number = number
+        self.title = title
+        self.url = url
+        self.accessed = accessed
+
+
+class ReportDocument:
+    """Format-independent report: title page, summary, sections (which double as the TOC) and references"""
+
+    __slots__ = ("topic", "session_id", "generated", "summary", "sections", "references")
+
+    def __init__(self, topic: str, session_id: str, generated: str, summary: str,
+                 sections: List[ReportSection], references: List[Reference]):
+        self.topic = topic
+        self.session_id = session_id
+        self.generated = generated
+        self.summary = summary
+        self.sections = sections
+        self.references = references
+
+
+def build_report_document(topic: str, sections: List[SectionContent], session_id: str) -> ReportDocument:
+    """Everything a renderer needs; citations are deduplicated by URL in first-seen order"""
+    summary = f"This report presents comprehensive research on {topic}. "
+    summary += f"The analysis is organized into {len(sections)} thematic sections, "
+    summary += "each providing detailed insights, evidence, and citations from authoritative sources."
+
+    body = []
+    unique_citations: Dict[str, Reference] = {}
+    for i, section in enumerate(sections, 1):
+        paragraphs = [para for para in section.content.split('\n\n') if para.strip()]
+        body.append(ReportSection(i, section.title, paragraphs))
+
+        for citation in section.citations or []:
+            if isinstance(citation, dict):
+                url = citation.get('url', '')
+                title = citation.get('title', 'Unknown')
+                accessed_at = citation.get('accessed_at')
+            else:
+                url = citation.url
+                title = citation.title
+                accessed_at = citation.accessed_at
+            if url and url not in unique_citations:
+                unique_citations[url] = Reference(len(unique_citations) + 1, title, url, format_date(accessed_at))
+
+    return ReportDocument(
+        topic=topic,
+        session_id=session_id,
+        generated=datetime.utcnow().strftime('%B %d, %Y'),
+        summary=summary,
+        sections=body,
+        references=list(unique_citations.values()),
+    )
+
+
+class ReportRenderer(ABC):
+    """Writes a ``ReportDocument`` to a file in one format"""
+    format = None
+    media_type = "application/octet-stream"
+    # Whether browsers should display the download rather than save it
+    inline = False
+    # Slow enough to be worth a process of its own (see ``render_report``)
+    cpu_bound = False
+
+    @abstractmethod
+    def render(self, document: ReportDocument, path: str):
+        ...
+
+
+class MarkdownRenderer(ReportRenderer):
+    format = ReportFormat.MARKDOWN
+    media_type = "text/markdown"
+
+    def render(self, document: ReportDocument, path: str):
+        lines = [
+            f"# {document.topic}",
+            "",
+            "Research Report",
+            "",
+            f"Generated: {document.generated}  ",
+            f"Session ID: {document.session_id}",
+            "",
+            "## Executive Summary",
+            "",
+            document.summary,
+            "",
+            "## Table of Contents",
+            "",
+        ]
+        lines.extend(f"{section.number}. {section.title}" for section in document.sections)
+        for section in document.sections:
+            lines.extend(["", f"## {section.number}. {section.title}"])
+            for para in section.paragraphs:
+                lines.extend(["", para])
+        lines.extend(["", "## References", ""])
+        if not document.references:
+            lines.append("No references available.")
+        for ref in document.references:
+            title = ref.title.replace("[", "\\[").replace("]", "\\]")
+            lines.append(f"{ref.number}. [{title}](<{ref.url}>)  ")
+            lines.append(f"   Accessed: {ref.accessed}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+HTML_STYLE = (
+    "body{font-family:Georgia,serif;max-width:46em;margin:2em auto;padding:0 1em;line-height:1.6;color:#1a1a1a}"
+    "h1{text-align:center}h2{color:#2c3e50;margin-top:2em}p{text-align:justify}"
+    ".meta{text-align:center;color:#555}.refs li{margin-bottom:.6em;word-break:break-all}"
+)
+
+
+class HTMLRenderer(ReportRenderer):
+    format = ReportFormat.HTML
+    media_type = "text/html"
+    inline = True
+
+    def render(self, document: ReportDocument, path: str):
+        e = html.escape
+        parts = [
+            "<!DOCTYPE html>",
+            '<html lang="en"><head><meta charset="utf-8">',
+            '<meta name="viewport" content="width=device-width, initial-scale=1">',
+            f"<title>{e(document.topic)}</title><style>{HTML_STYLE}</style></head><body>",
+            f"<h1>{e(document.topic)}</h1>",
+            f'<p class="meta">Research Report<br>Generated: {e(document.generated)}<br>'
+            f"Session ID: {e(document.session_id)}</p>",
+            "<h2>Executive Summary</h2>",
+            f"<p>{e(document.summary)}</p>",
+            "<h2>Table of Contents</h2><ol>",
+        ]
+        parts.extend(
+            f'<li><a href="#section-{section.number}">{e(section.title)}</a></li>' for section in document.sections
+        )
+        parts.append("</ol>")
+        for section in document.sections:
+            parts.append(f'<h2 id="section-{section.number}">{section.number}. {e(section.title)}</h2>')
+            parts.extend(f"<p>{e(para)}</p>" for para in section.paragraphs)
+        parts.append("<h2>References</h2>")
+        if not document.references:
+            parts.append("<p>No references available.</p>")
+        else:
+            parts.append('<ol class="refs">')
+            for ref in document.references:
+                url = e(ref.url)
+                parts.append(
+                    f'<li>{e(ref.title)}.<br><i><a href="{url}">{url}</a></i><br>Accessed: {e(ref.accessed)}</li>'
+                )
+            parts.append("</ol>")
+        parts.append("</body></html>")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(parts) + "\n")
+
+
+class PDFRenderer(ReportRenderer):
+    """ReportLab layout; reportlab is imported on first render"""
+    format = ReportFormat.PDF
+    media_type = "application/pdf"
+    cpu_bound = True
+
+    def render(self, document: ReportDocument, path: str):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+        from reportlab.lib import colors
+
+        doc = SimpleDocTemplate(path, pagesize=letter,
+                                topMargin=0.75*inch, bottomMargin=0.75*inch)
+
+        story = []
+        styles = getSampleStyleSheet()
+
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=12,
+            spaceBefore=12
+        )
+
+        body_style = ParagraphStyle(
+            'CustomBody',
+            parent=styles['Normal'],
+            fontSize=11,
+            alignment=TA_JUSTIFY,
+            spaceAfter=12
+        )
+
+        story.append(Spacer(1, 1.5*inch))
+        story.append(Paragraph(document.topic, title_style))
+        story.append(Spacer(1, 0.3*inch))
+        story.append(Paragraph("Research Report", styles['Heading3']))
+        story.append(Spacer(1, 0.2*inch))
+        story.append(Paragraph(f"Generated: {document.generated}", styles['Normal']))
+        story.append(Spacer(1, 0.2*inch))
+        story.append(Paragraph(f"Session ID: {document.session_id}", styles['Normal']))
+        story.append(PageBreak())
+
+        story.append(Paragraph("Executive Summary", heading_style))
+        story.append(Paragraph(document.summary, body_style))
+        story.append(Spacer(1, 0.3*inch))
+
+        story.append(Paragraph("Table of Contents", heading_style))
+        for section in document.sections:
+            story.append(Paragraph(f"{section.number}. {section.title}", styles['Normal']))
+        story.append(Spacer(1, 0.2*inch))
+        story.append(PageBreak())
+
+        for section in document.sections:
+            story.append(Paragraph(f"{section.number}. {section.title}", heading_style))
+            for para in section.paragraphs:
+                story.append(Paragraph(para, body_style))
+            story.append(Spacer(1, 0.2*inch))
+
+        story.append(PageBreak())
+        story.append(Paragraph("References", heading_style))
+
+        if not document.references:
+            story.append(Paragraph("No references available.", styles['Normal']))
+        else:
+            for ref in document.references:
+                ref_text = f"[{ref.number}] {ref.title}. <br/>"
+                ref_text += f"<i>{ref.url}</i><br/>"
+                ref_text += f"Accessed: {ref.accessed}"
+                story.append(Paragraph(ref_text, styles['Normal']))
+                story.append(Spacer(1, 0.15*inch))
+
+        doc.build(story)
+
+
+RENDERERS: Dict[ReportFormat, ReportRenderer] = {
+    renderer.format: renderer for renderer in (PDFRenderer(), MarkdownRenderer(), HTMLRenderer())
+}
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def render_file(report_format: ReportFormat, document: ReportDocument, path: str) -> str:
+    """Module-level so the render pool can pickle it"""
+    RENDERERS[report_format].render(document, path)
+    return path
+
+
+def render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    if _render_pool is None:
+        # spawn, not fork: the parent runs an event loop and logging threads
+        _render_pool = ProcessPoolExecutor(
+            settings.report_render_processes, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _render_pool
+
+
+async def render_report(report_format: ReportFormat, document: ReportDocument, path: str) -> str:
+    """
+    Render to ``path`` without blocking the event loop. CPU-bound formats go
+    to a process pool so concurrent PDF builds are not serialised on the
+    GIL; the rest, and everything when ``REPORT_RENDER_PROCESSES=0``, run in
+    a thread.
+    """
+    global _render_pool
+    if RENDERERS[report_format].cpu_bound and settings.report_render_processes > 0:
+        pool = render_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, render_file, report_format, document, path)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time
+            if _render_pool is pool:
+                _render_pool = None
+            raise
+    return await asyncio.to_thread(render_file, report_format, document, path)
+
+
+def shutdown_render_pool():
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=True, cancel_futures=True)
+        _render_pool = None
+
+
+class ZipSink:
+    """
+    Write-only, unseekable file for ``zipfile``. Written bytes collect here
+    until ``drain`` hands them on, so an archive can be streamed while it is
+    being built. ``zipfile`` falls back to data descriptors on such streams.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
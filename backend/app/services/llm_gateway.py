@@ -0,0 +1,181 @@
+from typing import Any, Dict, List, Optional
+from enum import IntEnum
+from openai import (
+    AsyncOpenAI, RateLimitError, APIConnectionError,
+    APITimeoutError, InternalServerError
+)
+from ..core.config import settings
+from ..core.rate_limit import TokenBucket
+from ..core.metrics import LLM_QUEUE_WAIT_SECONDS, LLM_RETRIES
+from ..core.log import get_logger
+import asyncio
+import heapq
+import itertools
+import random
+import time
+import httpx
+
+
+logger = get_logger("llm_gateway")
+
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class LLMPriority(IntEnum):
+    """Scheduling class of an LLM call, lower values are served first"""
+    INTERACTIVE = 0   # a user is actively waiting (plan creation)
+    STANDARD = 1      # main research pipeline (writing)
+    BACKGROUND = 2    # quality passes that can tolerate delay (critique)
+
+
+class LLMGateway:
+    """
+    Process-wide entry point for chat completions.
+
+    All research sessions share one connection pool and one pair of token
+    buckets (requests/minute and tokens/minute). Callers queue by priority and
+    only the head of the queue may draw from the buckets, so a burst of
+    background work cannot starve interactive calls. Retryable failures are
+    retried with exponential backoff and full jitter, and a 429 pauses the
+    whole gateway rather than just the caller that hit it.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_connections: int = 20,
+        max_retries: int = 6,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        default_completion_tokens: int = 1000,
+        base_url: Optional[str] = None,
+    ):
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            max_retries=0,  # retries are scheduled here so they respect the buckets
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            ),
+        )
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.default_completion_tokens = default_completion_tokens
+
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+        self._paused_until = 0.0
+
+    def estimate_tokens(self, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+        """Rough prompt + completion estimate (~4 characters per token)"""
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        return prompt_chars // 4 + (max_tokens or self.default_completion_tokens)
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait(self, timeout: Optional[float]):
+        event = self._changed
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _acquire(self, priority: LLMPriority, estimated_tokens: int):
+        entry = [int(priority), next(self._sequence)]
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                timeout = None
+                if self._waiters[0] is entry:
+                    timeout = max(
+                        self._paused_until - time.monotonic(),
+                        self.request_bucket.time_until(1),
+                        self.token_bucket.time_until(estimated_tokens),
+                    )
+                    if timeout <= 0:
+                        self.request_bucket.consume(1)
+                        self.token_bucket.consume(estimated_tokens)
+                        heapq.heappop(self._waiters)
+                        self._notify()
+                        return
+                await self._wait(timeout)
+        except BaseException:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._notify()
+            raise
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def chat_completion(self, priority: LLMPriority = LLMPriority.STANDARD, **kwargs):
+        """Schedule a ``chat.completions.create`` call through the shared limits"""
+        estimated = self.estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+
+        attempt = 0
+        while True:
+            with LLM_QUEUE_WAIT_SECONDS.labels(priority.name.lower()).time():
+                await self._acquire(priority, estimated)
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                LLM_RETRIES.labels(type(e).__name__).inc()
+                if isinstance(e, RateLimitError):
+                    # Everyone is over quota, not just this caller
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    self._notify()
+                logger.warning(f"{type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            if usage is not None and usage.total_tokens:
+                self.token_bucket.consume(usage.total_tokens - estimated)
+            return response
+
+
+_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide gateway, creating it on first use"""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(
+            api_key=settings.openai_api_key,
+            requests_per_minute=settings.openai_rpm_limit,
+            tokens_per_minute=settings.openai_tpm_limit,
+            max_connections=settings.openai_max_connections,
+            max_retries=settings.openai_max_retries,
+            default_completion_tokens=settings.llm_default_completion_tokens,
+            base_url=settings.openai_base_url,
+        )
+    return _gateway
@@ -1,16 +1,23 @@
-from typing import List, Dict, Any, Callable, Optional
-from openai import AsyncOpenAI
+from typing import List, Dict, Any, Awaitable, Callable, Optional
 from ..models.schemas import (
     AgentType, AgentUpdate, ResearchPlan, ResearchNote,
     Citation, SectionContent, CritiqueResult
 )
-from ..core.config import settings
 from .web_research import WebResearchService
-import asyncio
+from .llm_gateway import get_llm_gateway, LLMPriority
+from .cassette import Cassette
+from ..core.metrics import LLM_CALL_SECONDS, LLM_TOKENS, AGENT_EVENTS, SECTION_REVISIONS
+from ..core.tracing import tracer, traced
+from ..core.log import get_logger, agent_context
+from openai.types.chat import ChatCompletion
 from datetime import datetime
+import asyncio
 import json
 
 
+logger = get_logger("multi_agent")
+
+
 class AgentState:
     """Shared state between agents"""
     def __init__(self, topic: str):
@@ -25,15 +32,63 @@ class AgentState:
         self.agent_updates: List[AgentUpdate] = []
 
 
+class StepTimeout(Exception):
+    """An agent step ran past its time limit"""
+
+
 class MultiAgentResearchSystem:
    
     
-    def __init__(self, update_callback: Optional[Callable] = None):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
-        self.web_research = WebResearchService()
+    def __init__(
+        self,
+        update_callback: Optional[Callable] = None,
+        cassette: Optional[Cassette] = None,
+        checkpoint: Optional[Callable[[str], Awaitable[None]]] = None,
+        step_timeout: Optional[float] = None
+    ):
+        self.llm = get_llm_gateway()
+        self.web_research = WebResearchService(cassette=cassette)
         self.update_callback = update_callback
+        self.cassette = cassette
+        # Awaited before every step; raises to stop the run (cancelled or deleted session)
+        self.checkpoint = checkpoint
+        self.step_timeout = step_timeout
         self.model = "gpt-4o"
     
+    async def step(self, name: str, agent: Callable[..., Awaitable], *args):
+        """
+        One agent step: the cancellation checkpoint, then ``agent(*args)``
+        under the step timeout. A step that times out is cancelled, which
+        releases its LLM slot and page fetches, and raises ``StepTimeout``.
+        """
+        if self.checkpoint:
+            await self.checkpoint(name)
+        if not self.step_timeout:
+            return await agent(*args)
+        try:
+            return await asyncio.wait_for(agent(*args), self.step_timeout)
+        except asyncio.TimeoutError:
+            raise StepTimeout(f"{name} step exceeded {self.step_timeout:.0f}s")
+    
+    async def complete(self, agent: AgentType, priority: LLMPriority, **kwargs) -> ChatCompletion:
+        """Chat completion through the gateway, captured or replayed when a cassette is attached"""
+        model = kwargs.get("model", self.model)
+        with LLM_CALL_SECONDS.labels(agent.value, model).time(), tracer.span("llm.chat", agent=agent.value, model=model):
+            if self.cassette is None:
+                response = await self.llm.chat_completion(priority=priority, **kwargs)
+            else:
+                async def perform():
+                    response = await self.llm.chat_completion(priority=priority, **kwargs)
+                    return response.model_dump(mode="json")
+                
+                data = await self.cassette.intercept("llm", kwargs, perform)
+                response = ChatCompletion.model_validate(data)
+        
+        if response.usage:
+            LLM_TOKENS.labels(agent.value, model, "prompt").observe(response.usage.prompt_tokens)
+            LLM_TOKENS.labels(agent.value, model, "completion").observe(response.usage.completion_tokens)
+        return response
+    
     async def emit_update(self, agent: AgentType, action: str, details: Dict[str, Any]):
         update = AgentUpdate(
             agent=agent,
@@ -41,12 +96,15 @@ class MultiAgentResearchSystem:
             details=details,
             timestamp=datetime.utcnow()
         )
+        AGENT_EVENTS.labels(agent.value, action).inc()
         
         if self.update_callback:
             await self.update_callback(update)
         
         return update
     
+    @traced("agent.manager")
+    @agent_context("manager")
     async def manager_agent(self, state: AgentState) -> AgentState:
         
         await self.emit_update(
@@ -71,7 +129,9 @@ Respond in JSON format with EXACTLY this structure - no nesting, no extra keys:
     "estimated_sources": 15
 }}"""
         
-        response = await self.client.chat.completions.create(
+        response = await self.complete(
+            AgentType.MANAGER,
+            LLMPriority.INTERACTIVE,
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
@@ -109,6 +169,8 @@ Respond in JSON format with EXACTLY this structure - no nesting, no extra keys:
         
         return state
     
+    @traced("agent.researcher", section="section_title")
+    @agent_context("researcher")
     async def researcher_agent(self, state: AgentState, section_title: str) -> List[Citation]:
        
         await self.emit_update(
@@ -119,9 +181,14 @@ Respond in JSON format with EXACTLY this structure - no nesting, no extra keys:
         
         # Perform web research
         search_query = f"{state.topic} {section_title}"
-        citations = await self.web_research.research_topic(search_query, num_sources=3)
+        report = await self.web_research.gather_sources(
+            search_query,
+            num_sources=3,
+            focus=[section_title] + (state.plan.research_questions if state.plan else [])
+        )
+        citations = report.citations
         
-        print(f"[ResearcherAgent] Found {len(citations)} citations for section '{section_title}'")
+        logger.debug(f"Found {len(citations)} citations for section '{section_title}' ({report.late} late)")
         
         await self.emit_update(
             AgentType.RESEARCHER,
@@ -129,12 +196,17 @@ Respond in JSON format with EXACTLY this structure - no nesting, no extra keys:
             {
                 "section": section_title,
                 "num_sources": len(citations),
+                "late_sources": report.late,
+                "budget_skipped_sources": report.budget_skipped,
+                "duplicate_sources": report.duplicates,
                 "sources": [{"title": c.title, "url": c.url} for c in citations]
             }
         )
         
         return citations
     
+    @traced("agent.writer", section="section_title")
+    @agent_context("writer")
     async def writer_agent(
         self,
         state: AgentState,
@@ -173,7 +245,9 @@ Write clear, engaging prose. Do not use bullet points."""
         if state.needs_revision:
             prompt += f"\n\nREVISION FEEDBACK: {state.revision_feedback}\n\nPlease address this feedback in your revision."
         
-        response = await self.client.chat.completions.create(
+        response = await self.complete(
+            AgentType.WRITER,
+            LLMPriority.STANDARD,
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7
@@ -200,6 +274,8 @@ Write clear, engaging prose. Do not use bullet points."""
         
         return section
     
+    @traced("agent.critique")
+    @agent_context("critique")
     async def critique_agent(
         self,
         state: AgentState,
@@ -239,7 +315,9 @@ Respond in JSON format:
 
 If quality_score >= 5 and no major issues, set has_issues to false."""
         
-        response = await self.client.chat.completions.create(
+        response = await self.complete(
+            AgentType.CRITIQUE,
+            LLMPriority.BACKGROUND,
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
@@ -271,36 +349,36 @@ If quality_score >= 5 and no major issues, set has_issues to false."""
         """
         Main orchestration loop - implements the multi-agent workflow
         """
-        print(f"[MultiAgent] Starting research for topic: {state.topic}")
+        logger.info(f"Starting research for topic: {state.topic}")
         
-        state = await self.manager_agent(state)
+        state = await self.step("plan", self.manager_agent, state)
         
-        print(f"[MultiAgent] Plan approved. Sections: {state.plan.sections}")
+        logger.debug(f"Plan approved. Sections: {state.plan.sections}")
         
         for idx, section_title in enumerate(state.plan.sections):
-            print(f"[MultiAgent] === Section {idx + 1}/{len(state.plan.sections)}: {section_title} ===")
+            logger.info(f"=== Section {idx + 1}/{len(state.plan.sections)}: {section_title} ===")
             
             revision_count = 0
             section_approved = False
             
             while not section_approved and revision_count <= state.max_revisions:
-                print(f"[MultiAgent] Starting revision {revision_count} for section '{section_title}'")
+                logger.debug(f"Starting revision {revision_count} for section '{section_title}'")
                 
                 # Researcher gathers data
-                print(f"[MultiAgent] Researcher Agent: Searching for '{section_title}'...")
-                citations = await self.researcher_agent(state, section_title)
-                print(f"[MultiAgent] Researcher Agent: Found {len(citations)} sources")
+                logger.debug(f"Researcher Agent: Searching for '{section_title}'...")
+                citations = await self.step("research", self.researcher_agent, state, section_title)
+                logger.debug(f"Researcher Agent: Found {len(citations)} sources")
                 
                 # Writer creates content
-                print(f"[MultiAgent] Writer Agent: Drafting section '{section_title}'...")
-                section = await self.writer_agent(state, section_title, citations)
-                print(f"[MultiAgent] Writer Agent: Drafted {len(section.content.split())} words")
+                logger.debug(f"Writer Agent: Drafting section '{section_title}'...")
+                section = await self.step("write", self.writer_agent, state, section_title, citations)
+                logger.debug(f"Writer Agent: Drafted {len(section.content.split())} words")
                 section.revision_count = revision_count
                 
                 # Critique reviews quality
-                print(f"[MultiAgent] Critique Agent: Reviewing section '{section_title}'...")
-                critique = await self.critique_agent(state, section)
-                print(f"[MultiAgent] Critique Agent: Quality score: {critique.feedback[:100] if critique.feedback else 'No feedback'}...")
+                logger.debug(f"Critique Agent: Reviewing section '{section_title}'...")
+                critique = await self.step("critique", self.critique_agent, state, section)
+                logger.debug(f"Critique Agent: Quality score: {critique.feedback[:100] if critique.feedback else 'No feedback'}...")
                 
                 if critique.has_issues:
                     state.needs_revision = True
@@ -316,13 +394,13 @@ If quality_score >= 5 and no major issues, set has_issues to false."""
                             "feedback": critique.feedback
                         }
                     )
-                    print(f"[MultiAgent] Revision {revision_count} requested: {critique.feedback[:100]}...")
+                    logger.info(f"Revision {revision_count} requested: {critique.feedback[:100]}...")
                 else:
                     section_approved = True
                     state.sections.append(section)
                     state.needs_revision = False
                     state.revision_feedback = ""
-                    print(f"[MultiAgent] Section '{section_title}' APPROVED!")
+                    logger.info(f"Section '{section_title}' APPROVED!")
             
             if not section_approved:
                 state.sections.append(section)
@@ -336,9 +414,9 @@ If quality_score >= 5 and no major issues, set has_issues to false."""
                         "final_feedback": critique.feedback
                     }
                 )
-                print(f"[MultiAgent] Section '{section_title}' approved after max revisions ({state.max_revisions})")
+                logger.info(f"Section '{section_title}' approved after max revisions ({state.max_revisions})")
             
-            await asyncio.sleep(1)
+            SECTION_REVISIONS.observe(revision_count)
         
-        print(f"[MultiAgent] Research complete! {len(state.sections)} sections created.")
+        logger.info(f"Research complete! {len(state.sections)} sections created.")
         return state
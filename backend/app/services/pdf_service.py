@@ -1,20 +1,23 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib import colors
-from datetime import datetime
-from typing import List
-from ..models.schemas import SectionContent
+from typing import List, Optional
+from ..models.schemas import ReportFormat, SectionContent
 from ..core.config import settings
+from ..core.log import get_logger
+from .export_service import RENDERERS, build_report_document
 import os
 import tempfile
-import cloudinary
-import cloudinary.uploader
+
+
+logger = get_logger("pdf_service")
 
 
 class PDFReportService:
+    """
+    Builds PDF reports and uploads them to Cloudinary. The layout itself is
+    ``export_service.PDFRenderer``, one renderer among several.
+    
+    reportlab and cloudinary are imported on first use rather than at import
+    time, so loading the API does not pay for them.
+    """
     
     def __init__(self, output_dir: str = None):
         if output_dir is None:
@@ -22,10 +25,13 @@ class PDFReportService:
         else:
             self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
-        print(f"[PDFService] Output directory: {self.output_dir}")
+        logger.debug(f"Output directory: {self.output_dir}")
         
-        # Configure Cloudinary
-        self._configure_cloudinary()
+        # Cloudinary itself is configured on the first upload
+        self.cloudinary_configured = bool(
+            settings.cloudinary_cloud_name and settings.cloudinary_api_key and settings.cloudinary_api_secret
+        )
+        self._cloudinary_ready = False
     
     def _configure_cloudinary(self):
         try:
@@ -34,40 +40,37 @@ class PDFReportService:
             api_secret = settings.cloudinary_api_secret
             
             if cloud_name and api_key and api_secret:
+                import cloudinary
+                
                 cloudinary.config(
                     cloud_name=cloud_name,
                     api_key=api_key,
                     api_secret=api_secret
                 )
                 self.cloudinary_configured = True
-                print(f"[PDFService] Cloudinary configured successfully")
+                self._cloudinary_ready = True
+                logger.debug("Cloudinary configured successfully")
             else:
                 self.cloudinary_configured = False
-                print(f"[PDFService] Cloudinary not configured (missing env vars)")
+                logger.debug("Cloudinary not configured (missing env vars)")
         except Exception as e:
             self.cloudinary_configured = False
-            print(f"[PDFService] Cloudinary configuration error: {e}")
-    
-    def _format_datetime(self, dt_value):
-        if dt_value is None:
-            return datetime.utcnow().strftime('%B %d, %Y')
-        if isinstance(dt_value, str):
-            try:
-                return datetime.fromisoformat(dt_value.replace('Z', '+00:00')).strftime('%B %d, %Y')
-            except:
-                return dt_value
-        elif hasattr(dt_value, 'strftime'):
-            return dt_value.strftime('%B %d, %Y')
-        else:
-            return str(dt_value)
+            logger.warning(f"Cloudinary configuration error: {e}")
     
     def upload_to_cloudinary(self, filepath: str, session_id: str) -> str:
         if not self.cloudinary_configured:
-            print(f"[PDFService] Cloudinary not configured, skipping upload")
+            logger.info("Cloudinary not configured, skipping upload")
             return None
         
+        if not self._cloudinary_ready:
+            self._configure_cloudinary()
+            if not self.cloudinary_configured:
+                return None
+        
         try:
-            print(f"[PDFService] Uploading PDF to Cloudinary...")
+            import cloudinary.uploader
+            
+            logger.debug("Uploading PDF to Cloudinary...")
             result = cloudinary.uploader.upload(
                 filepath,
                 resource_type="raw",
@@ -76,126 +79,21 @@ class PDFReportService:
                 format="pdf"
             )
             url = result.get('secure_url')
-            print(f"[PDFService] PDF uploaded to Cloudinary: {url}")
+            logger.info(f"PDF uploaded to Cloudinary: {url}")
             return url
         except Exception as e:
-            print(f"[PDFService] Failed to upload to Cloudinary: {e}")
+            logger.warning(f"Failed to upload to Cloudinary: {e}")
             return None
     
     def generate_report(
         self,
         topic: str,
         sections: List[SectionContent],
-        session_id: str
+        session_id: str,
+        filename: Optional[str] = None
     ) -> str:
-        
-        filename = f"research_report_{session_id}.pdf"
+        filename = filename or f"research_report_{session_id}.pdf"
         filepath = os.path.join(self.output_dir, filename)
-        
-        doc = SimpleDocTemplate(filepath, pagesize=letter,
-                                topMargin=0.75*inch, bottomMargin=0.75*inch)
-        
-        story = []
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a1a1a'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#2c3e50'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=11,
-            alignment=TA_JUSTIFY,
-            spaceAfter=12
-        )
-        
-        story.append(Spacer(1, 1.5*inch))
-        story.append(Paragraph(topic, title_style))
-        story.append(Spacer(1, 0.3*inch))
-        story.append(Paragraph(f"Research Report", styles['Heading3']))
-        story.append(Spacer(1, 0.2*inch))
-        story.append(Paragraph(
-            f"Generated: {datetime.utcnow().strftime('%B %d, %Y')}",
-            styles['Normal']
-        ))
-        story.append(Spacer(1, 0.2*inch))
-        story.append(Paragraph(f"Session ID: {session_id}", styles['Normal']))
-        story.append(PageBreak())
-        
-        story.append(Paragraph("Executive Summary", heading_style))
-        summary_text = f"This report presents comprehensive research on {topic}. "
-        summary_text += f"The analysis is organized into {len(sections)} thematic sections, "
-        summary_text += "each providing detailed insights, evidence, and citations from authoritative sources."
-        story.append(Paragraph(summary_text, body_style))
-        story.append(Spacer(1, 0.3*inch))
-        
-        story.append(Paragraph("Table of Contents", heading_style))
-        for i, section in enumerate(sections, 1):
-            story.append(Paragraph(f"{i}. {section.title}", styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
-        story.append(PageBreak())
-        
-        all_citations = []
-        for i, section in enumerate(sections, 1):
-            story.append(Paragraph(f"{i}. {section.title}", heading_style))
-            
-            paragraphs = section.content.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    story.append(Paragraph(para, body_style))
-            
-            story.append(Spacer(1, 0.2*inch))
-            
-            if section.citations:
-                all_citations.extend(section.citations)
-        
-        print(f"[PDFService] Generated PDF with {len(all_citations)} total citations")
-        
-        story.append(PageBreak())
-        story.append(Paragraph("References", heading_style))
-        
-        unique_citations = {}
-        
-        for citation in all_citations:
-            if isinstance(citation, dict):
-                url = citation.get('url', '')
-                title = citation.get('title', 'Unknown')
-            else:
-                url = citation.url
-                title = citation.title
-            
-            if url and url not in unique_citations:
-                unique_citations[url] = {
-                    'title': title,
-                    'url': url,
-                    'accessed_at': self._format_datetime(citation.get('accessed_at') if isinstance(citation, dict) else citation.accessed_at)
-                }
-        
-        if not unique_citations:
-            story.append(Paragraph("No references available.", styles['Normal']))
-        else:
-            for i, data in enumerate(unique_citations.values(), 1):
-                ref_text = f"[{i}] {data['title']}. <br/>"
-                ref_text += f"<i>{data['url']}</i><br/>"
-                ref_text += f"Accessed: {data['accessed_at']}"
-                story.append(Paragraph(ref_text, styles['Normal']))
-                story.append(Spacer(1, 0.15*inch))
-        
-        doc.build(story)
-        
+        document = build_report_document(topic, sections, session_id)
+        RENDERERS[ReportFormat.PDF].render(document, filepath)
         return filepath
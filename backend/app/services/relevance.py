@@ -0,0 +1,68 @@
+from typing import List, Dict, Tuple
+from collections import Counter
+import math
+import re
+
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the
+their this to was were what when where which who why will with does do can
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def query_weights(primary: str, secondary: List[str]) -> Dict[str, float]:
+    """Terms from the primary text (section title) count double those from the questions"""
+    weights: Dict[str, float] = {}
+    for text in secondary:
+        for term in tokenize(text):
+            weights[term] = 1.0
+    for term in tokenize(primary):
+        weights[term] = 2.0
+    return weights
+
+
+def rank_results(
+    results: List[Dict[str, str]],
+    primary: str,
+    secondary: List[str],
+    k1: float = 1.2,
+    b: float = 0.75,
+) -> List[Tuple[float, Dict[str, str]]]:
+    """
+    Score search hits by BM25 over their title and snippet.
+
+    IDF is computed over the candidate set itself, which is enough to favour
+    snippets that mention the specific terms of the section over ones that
+    only repeat the topic. Ties keep the search engine's order.
+    """
+    if not results:
+        return []
+
+    weights = query_weights(primary, secondary)
+    docs = [Counter(tokenize(f"{r.get('title', '')} {r.get('snippet', '')}")) for r in results]
+    lengths = [sum(d.values()) for d in docs]
+    avg_length = (sum(lengths) / len(docs)) or 1.0
+    n = len(docs)
+
+    idf = {}
+    for term in weights:
+        df = sum(1 for d in docs if term in d)
+        idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    scored = []
+    for rank, (doc, length) in enumerate(zip(docs, lengths)):
+        score = 0.0
+        for term, weight in weights.items():
+            tf = doc.get(term)
+            if tf:
+                score += weight * idf[term] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        scored.append((score, rank))
+
+    scored.sort(key=lambda s: (-s[0], s[1]))
+    return [(score, results[rank]) for score, rank in scored]
@@ -0,0 +1,320 @@
+from typing import AsyncIterator, List, Optional
+from datetime import datetime, timezone
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+from ..models.schemas import ReportFormat, SectionContent
+from ..core.config import settings
+from ..core.metrics import REPORT_CACHE_REQUESTS
+from ..core.log import get_logger
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+
+logger = get_logger("report_store")
+
+
+def report_fingerprint(topic: str, sections: List[SectionContent]) -> str:
+    """
+    Content hash of what a report renders. Citation access times count to
+    the day, as printed, so re-parsing a stored session gives the same hash.
+    """
+    content = {
+        "topic": topic,
+        "sections": [{
+            "title": section.title,
+            "content": section.content,
+            "citations": [
+                [c.title, c.url, c.excerpt, c.accessed_at.date().isoformat()] for c in section.citations
+            ],
+        } for section in sections],
+    }
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(canonical).hexdigest()[:16]
+
+
+def report_key(session_id: str, fingerprint: str, report_format: ReportFormat = ReportFormat.PDF) -> str:
+    return f"research_report_{session_id}_{fingerprint}.{report_format.value}"
+
+
+class StoredReport:
+    """Metadata of one stored report; ``ref`` is store-specific (GridFS file id, local path)"""
+
+    __slots__ = ("key", "ref", "length", "modified", "etag")
+
+    def __init__(self, key: str, ref, length: int, modified: datetime, etag: str):
+        self.key = key
+        self.ref = ref
+        self.length = length
+        self.modified = modified
+        self.etag = etag
+
+
+async def read_file(path: str, start: int, end: int, chunk_size: int) -> AsyncIterator[bytes]:
+    """Bytes ``start``..``end`` (inclusive) of a local file, one chunk in memory at a time"""
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+class ReportStore(ABC):
+    """Interface for where finished reports live.
+
+    ``put`` copies a locally rendered file into the store, replacing any
+    previous report under the same key. ``read`` streams a byte range of
+    what ``stat`` returned, so a download never holds the whole report.
+    """
+    name = "base"
+
+    @abstractmethod
+    async def put(self, key: str, path: str, content_type: str = "application/pdf") -> StoredReport:
+        ...
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredReport]:
+        ...
+
+    @abstractmethod
+    def read(self, report: StoredReport, start: int, end: int) -> AsyncIterator[bytes]:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+
+class GridFSReportStore(ReportStore):
+    """
+    Reports in a GridFS bucket, so every worker and node sees the same files.
+
+    Reads query ``<bucket>.chunks`` a few chunks at a time instead of using
+    a GridOut, whose cursor buffers up to 16 MB per batch.
+    """
+    name = "gridfs"
+
+    def __init__(self, db: AsyncIOMotorDatabase, bucket: str = "reports", chunk_size: int = 255 * 1024, window: int = 4):
+        self.files = db[f"{bucket}.files"]
+        self.chunks = db[f"{bucket}.chunks"]
+        self.window = window
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket, chunk_size_bytes=chunk_size)
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def _describe(key: str, grid_out) -> StoredReport:
+        modified = grid_out.upload_date.replace(tzinfo=timezone.utc)
+        return StoredReport(key, (grid_out._id, grid_out.chunk_size), grid_out.length, modified, f'"{grid_out._id}"')
+
+    async def put(self, key: str, path: str, content_type: str = "application/pdf") -> StoredReport:
+        stream = self.bucket.open_upload_stream(key, metadata={"contentType": content_type})
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, self.chunk_size)
+                if not chunk:
+                    break
+                await stream.write(chunk)
+        await stream.close()
+        # Readers resolve the newest revision, so older ones are only garbage now. A
+        # newer one may be another worker's concurrent upload of the same key: keep it.
+        for old in await self.files.find({"filename": key, "_id": {"$lt": stream._id}}, {"_id": 1}).to_list(None):
+            await self.bucket.delete(old["_id"])
+        report = await self.stat(key)
+        if report is None:
+            raise FileNotFoundError(f"Report {key} was deleted while it was being stored")
+        return report
+
+    async def stat(self, key: str) -> Optional[StoredReport]:
+        try:
+            grid_out = await self.bucket.open_download_stream_by_name(key)
+        except NoFile:
+            return None
+        return self._describe(key, grid_out)
+
+    async def read(self, report: StoredReport, start: int, end: int) -> AsyncIterator[bytes]:
+        file_id, chunk_size = report.ref
+        n, last = start // chunk_size, end // chunk_size
+        offset = start - n * chunk_size
+        while n <= last:
+            upto = min(n + self.window, last + 1)
+            docs = await self.chunks.find(
+                {"files_id": file_id, "n": {"$gte": n, "$lt": upto}}, {"n": 1, "data": 1}
+            ).sort("n", 1).to_list(None)
+            if not docs or docs[0]["n"] != n:
+                raise IOError(f"Report {report.key} is missing chunk {n}")
+            for doc in docs:
+                data = bytes(doc["data"])
+                stop = end - n * chunk_size + 1 if n == last else len(data)
+                yield data[offset:stop]
+                offset = 0
+                n += 1
+
+    async def delete(self, key: str):
+        for doc in await self.files.find({"filename": key}, {"_id": 1}).to_list(None):
+            await self.bucket.delete(doc["_id"])
+
+
+class LocalReportStore(ReportStore):
+    """Reports in a local (or shared, e.g. NFS) directory; the single-node stand-in"""
+    name = "local"
+
+    def __init__(self, directory: str, chunk_size: int = 255 * 1024):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        if os.path.basename(key) != key:
+            raise ValueError(f"Invalid report key: {key}")
+        return os.path.join(self.directory, key)
+
+    async def put(self, key: str, path: str, content_type: str = "application/pdf") -> StoredReport:
+        target = self._path(key)
+        if os.path.abspath(path) != os.path.abspath(target):
+            # Copy then rename, so readers never see a half-written report; the
+            # partial name is unique so concurrent puts of one key cannot collide
+            fd, partial = tempfile.mkstemp(dir=self.directory, prefix=f"{key}.", suffix=".partial")
+            os.close(fd)
+            try:
+                await asyncio.to_thread(shutil.copyfile, path, partial)
+                os.replace(partial, target)
+            except BaseException:
+                os.remove(partial)
+                raise
+        report = await self.stat(key)
+        if report is None:
+            raise FileNotFoundError(f"Report {key} was deleted while it was being stored")
+        return report
+
+    async def stat(self, key: str) -> Optional[StoredReport]:
+        path = self._path(key)
+        try:
+            st = await asyncio.to_thread(os.stat, path)
+        except FileNotFoundError:
+            return None
+        modified = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+        return StoredReport(key, path, st.st_size, modified, f'"{st.st_mtime_ns:x}-{st.st_size:x}"')
+
+    def read(self, report: StoredReport, start: int, end: int) -> AsyncIterator[bytes]:
+        return read_file(report.ref, start, end, self.chunk_size)
+
+    async def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class CachedReportStore(ReportStore):
+    """
+    Local disk cache in front of another store.
+
+    Cached files are named by key and ETag, so a rebuilt report is never
+    served stale. A full download that misses is streamed to the client and
+    to the cache at once, so a cold cache costs no extra latency. Range
+    requests that miss go straight to the backing store. The oldest files
+    are evicted once the cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, inner: ReportStore, directory: str, max_bytes: int):
+        self.inner = inner
+        self.name = f"{inner.name}+cache"
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = getattr(inner, "chunk_size", 255 * 1024)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, report: StoredReport) -> str:
+        tag = hashlib.sha1(report.etag.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{report.key}.{tag}")
+
+    async def put(self, key: str, path: str, content_type: str = "application/pdf") -> StoredReport:
+        report = await self.inner.put(key, path, content_type)
+        await asyncio.to_thread(shutil.copyfile, path, self._path(report))
+        await asyncio.to_thread(self._evict)
+        return report
+
+    async def stat(self, key: str) -> Optional[StoredReport]:
+        return await self.inner.stat(key)
+
+    async def read(self, report: StoredReport, start: int, end: int) -> AsyncIterator[bytes]:
+        path = self._path(report)
+        if os.path.exists(path):
+            REPORT_CACHE_REQUESTS.labels("hit").inc()
+            os.utime(path)
+            async for chunk in read_file(path, start, end, self.chunk_size):
+                yield chunk
+            return
+
+        REPORT_CACHE_REQUESTS.labels("miss").inc()
+        if start != 0 or end != report.length - 1:
+            async for chunk in self.inner.read(report, start, end):
+                yield chunk
+            return
+
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix=".partial")
+        complete = False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in self.inner.read(report, start, end):
+                    await asyncio.to_thread(f.write, chunk)
+                    yield chunk
+            complete = True
+        finally:
+            # A client that disconnects mid-download leaves no partial entry behind
+            if complete:
+                os.replace(partial, path)
+                await asyncio.to_thread(self._evict)
+            else:
+                os.remove(partial)
+
+    async def delete(self, key: str):
+        await self.inner.delete(key)
+        for name in os.listdir(self.directory):
+            if name.startswith(f"{key}."):
+                os.remove(os.path.join(self.directory, name))
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".partial"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except FileNotFoundError:
+                pass
+
+
+def build_report_store(db: AsyncIOMotorDatabase) -> ReportStore:
+    if settings.report_store == "gridfs":
+        store = GridFSReportStore(db, settings.report_gridfs_bucket, settings.report_chunk_size)
+    elif settings.report_store == "local":
+        directory = settings.report_dir or os.path.join(tempfile.gettempdir(), "insightengine_reports")
+        store = LocalReportStore(directory, settings.report_chunk_size)
+    else:
+        raise ValueError(f"Unknown report store: {settings.report_store}")
+    if settings.report_cache_dir:
+        store = CachedReportStore(store, settings.report_cache_dir, settings.report_cache_max_mb * 1024 * 1024)
+    logger.info(f"Report store: {store.name}")
+    return store
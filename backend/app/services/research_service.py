@@ -1,40 +1,132 @@
-from typing import Optional, Callable
+from typing import AsyncIterator, Dict, List, Optional, Callable, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from datetime import datetime
 from ..models.schemas import (
     ResearchSession, ResearchStatus, ResearchRequest,
-    AgentUpdate, ApprovalRequest
+    AgentUpdate, ApprovalRequest, ReportFormat
 )
-from .multi_agent import MultiAgentResearchSystem, AgentState
 from .pdf_service import PDFReportService
+from .admission import AdmissionController, parse_weights, queue_event
+from .export_service import RENDERERS, ZipSink, build_report_document, render_report
+from .report_store import StoredReport, build_report_store, report_fingerprint, report_key
+from .cassette import Cassette, CassetteMode, ReplayLatency, cassette_path
+from .session_cache import session_cache
+from ..core.config import settings
+from ..core.database import TimedCollection
+from ..core.metrics import REPORT_RENDER_SECONDS, SESSIONS
+from ..core.tracing import tracer, summarize_trace
+from ..core.profiling import RunProfiler
+from ..core.log import get_logger, log_context
+from ..core.encoding import EncodedEvent
+from contextlib import asynccontextmanager
 import asyncio
+import itertools
+import os
+import re
+import tempfile
+import zipfile
+
+
+logger = get_logger("research_service")
+
+
+class ResearchCancelled(Exception):
+    """Raised at a checkpoint once the session was cancelled or deleted"""
+
+MAX_HISTORY_EVENTS = 100000
+
+# Small fields every delta carries, changed or not
+DELTA_FIELDS = ("status", "plan_approved", "final_report_path", "cloudinary_url", "updated_at", "completed_at")
+
+TERMINAL_STATUSES = (ResearchStatus.COMPLETED, ResearchStatus.FAILED, ResearchStatus.CANCELLED)
+
+# What a bulk export reads per session; sections are only loaded to render a missing report
+EXPORT_FIELDS = {"user_id": 1, "topic": 1, "status": 1, "final_report_path": 1, "report_exports": 1}
 
 
 class ResearchService:
     
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
-        self.sessions = db.research_sessions
+        self.sessions = TimedCollection(db.research_sessions)
+        # History replays and session lists may read from secondaries (see settings)
+        self.history = self.sessions.reading_from(settings.mongo_history_read_preference)
+        self.listing = self.sessions.reading_from(settings.mongo_listing_read_preference)
         self.pdf_service = PDFReportService()
+        self.reports = build_report_store(db)
+        # Report rebuilds in flight, by store key
+        self._renders: Dict[str, asyncio.Task] = {}
+        # Research runs owned by this process, by session id
+        self.running: Dict[str, asyncio.Task] = {}
+        # Seq of the last event stored by each of those runs
+        self.last_seq: Dict[str, int] = {}
+        self.accepting = True
+        self.admission = AdmissionController(
+            settings.research_max_concurrent,
+            settings.research_max_per_user,
+            parse_weights(settings.research_user_weights)
+        )
+    
+    @staticmethod
+    def cassette_file(session_id: str) -> Optional[str]:
+        """Path of a session's cassette, or None for ids that are not ObjectIds"""
+        if not ObjectId.is_valid(session_id):
+            return None
+        directory = settings.cassette_dir or os.path.join(tempfile.gettempdir(), "insightengine_cassettes")
+        return cassette_path(session_id, directory)
+    
+    def has_cassette(self, session_id: str) -> bool:
+        path = self.cassette_file(session_id)
+        return bool(path) and os.path.exists(path)
+    
+    def _open_cassette(self, session_id: str, session: ResearchSession) -> Optional[Cassette]:
+        if session.replay_session_id:
+            return Cassette.load(
+                self.cassette_file(session.replay_session_id),
+                ReplayLatency(session.replay_latency)
+            )
+        if settings.cassette_mode == CassetteMode.RECORD:
+            return Cassette(
+                self.cassette_file(session_id),
+                CassetteMode.RECORD,
+                metadata={
+                    "session_id": session_id,
+                    "topic": session.topic,
+                    "recorded_at": datetime.utcnow().isoformat()
+                }
+            )
+        return None
     
     async def create_session(self, request: ResearchRequest) -> ResearchSession:
+        topic = request.topic
+        if request.replay_session_id:
+            # Prompts embed the topic, so a replay must use the recorded one
+            topic = Cassette.read_metadata(self.cassette_file(request.replay_session_id)).get("topic", topic)
+        
         session = ResearchSession(
             user_id=request.user_id,
-            topic=request.topic,
+            topic=topic,
             status=ResearchStatus.PENDING,
+            replay_session_id=request.replay_session_id,
+            replay_latency=request.replay_latency,
         )
         
         result = await self.sessions.insert_one(session.dict(by_alias=True, exclude={"id"}))
         session.id = str(result.inserted_id)
+        SESSIONS.labels(ResearchStatus.PENDING.value).inc()
         
         return session
     
     async def get_session(self, session_id: str) -> Optional[ResearchSession]:
+        """Parsed session via the process-wide cache; callers must not mutate it"""
+        return await session_cache.get(session_id, lambda: self._load_session(session_id))
+    
+    async def _load_session(self, session_id: str) -> Optional[ResearchSession]:
         try:
             data = await self.sessions.find_one({"_id": ObjectId(session_id)})
             if not data:
-                print(f"[ResearchService] Session {session_id} not found in database")
+                logger.warning(f"Session {session_id} not found in database")
                 return None
             
             data["_id"] = str(data["_id"])
@@ -72,65 +164,163 @@ class ResearchService:
             
             sections = data.get('sections', [])
             total_citations = sum(len(s.get('citations', [])) for s in sections)
-            print(f"[ResearchService] Loaded session {session_id}: {len(sections)} sections, {total_citations} citations")
+            logger.debug(f"Loaded session {session_id}: {len(sections)} sections, {total_citations} citations")
             
             return ResearchSession(**data)
         except Exception as e:
-            print(f"Error retrieving session {session_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error retrieving session {session_id}: {e}")
+            return None
+    
+    async def _versioned_update(self, session_id: str, fields: dict, tracked: str):
+        """
+        ``$set`` fields and bump the version, recording the new version in
+        ``<tracked>_version`` so deltas can tell whether that field changed.
+        
+        The new version has to be known inside the same write, so this is a
+        compare-and-set on the current version, retried if another write
+        (e.g. an agent update) got in between. Like ``update_session_status``
+        it leaves a cancelled session alone.
+        """
+        while True:
+            doc = await self.sessions.find_one({"_id": ObjectId(session_id)}, {"version": 1, "status": 1})
+            if not doc or doc.get("status") == ResearchStatus.CANCELLED:
+                return
+            current = doc.get("version", 0)
+            result = await self.sessions.update_one(
+                {
+                    "_id": ObjectId(session_id),
+                    "version": current if current else {"$in": [0, None]},
+                    "status": {"$ne": ResearchStatus.CANCELLED}
+                },
+                {"$set": {
+                    **fields,
+                    "version": current + 1,
+                    f"{tracked}_version": current + 1,
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+            if result.modified_count:
+                session_cache.invalidate(session_id)
+                return
+    
+    async def get_version(self, session_id: str) -> Optional[dict]:
+        """Just the session's change markers (``version``, ``updated_at``): one ``_id`` lookup"""
+        if not ObjectId.is_valid(session_id):
+            return None
+        doc = await self.sessions.find_one({"_id": ObjectId(session_id)}, {"version": 1, "updated_at": 1})
+        if doc:
+            doc.setdefault("version", 0)
+        return doc
+    
+    async def get_delta(self, session_id: str, since_version: int, since_seq: int) -> Optional[dict]:
+        """
+        What changed after ``since_version``: always the small status fields,
+        the plan and sections only if they were rewritten since, and the
+        agent updates after ``since_seq``. None if the session does not
+        exist (or was deleted mid-read).
+        """
+        if not ObjectId.is_valid(session_id):
             return None
+        markers = {"version": 1, "plan_version": 1, "sections_version": 1}
+        base = {**markers, **{field: 1 for field in DELTA_FIELDS}}
+        base["agent_updates"] = {"$slice": [since_seq, MAX_HISTORY_EVENTS]}
+        for _ in range(5):
+            head = await self.sessions.find_one({"_id": ObjectId(session_id)}, markers)
+            if not head:
+                return None
+            projection = dict(base)
+            if head.get("plan_version", 0) > since_version:
+                projection["plan"] = 1
+            if head.get("sections_version", 0) > since_version:
+                projection["sections"] = 1
+            doc = await self.sessions.find_one({"_id": ObjectId(session_id)}, projection)
+            if doc is None:
+                return None
+            # Re-check that plan/sections did not change between the two reads
+            if all(doc.get(k, 0) == head.get(k, 0) for k in markers if k != "version"):
+                break
+        else:
+            # Writes kept landing between the reads: send plan and sections whole from a single read
+            projection = {**base, "plan": 1, "sections": 1}
+            doc = await self.sessions.find_one({"_id": ObjectId(session_id)}, projection)
+            if doc is None:
+                return None
+        
+        delta = {field: doc.get(field) for field in DELTA_FIELDS}
+        delta["version"] = doc.get("version", 0)
+        if "plan" in projection:
+            delta["plan"] = doc.get("plan")
+        if "sections" in projection:
+            delta["sections"] = doc.get("sections", [])
+        updates = doc.get("agent_updates", [])
+        for seq, update in enumerate(updates, start=since_seq + 1):
+            update.setdefault("seq", seq)
+        delta["agent_updates"] = updates
+        last_seq = updates[-1]["seq"] if updates else since_seq
+        delta["token"] = f"{delta['version']}.{last_seq}"
+        return delta
     
     async def update_session_status(self, session_id: str, status: ResearchStatus):
-        """Update session status"""
+        """Update session status; a cancelled session keeps its status"""
+        SESSIONS.labels(ResearchStatus(status).value).inc()
         await self.sessions.update_one(
-            {"_id": ObjectId(session_id)},
+            {"_id": ObjectId(session_id), "status": {"$ne": ResearchStatus.CANCELLED}},
             {
                 "$set": {
                     "status": status,
                     "updated_at": datetime.utcnow()
-                }
+                },
+                "$inc": {"version": 1}
             }
         )
+        session_cache.invalidate(session_id)
     
-    async def add_agent_update(self, session_id: str, update: AgentUpdate):
+    async def add_agent_update(self, session_id: str, event: EncodedEvent):
         """Add an agent update to the session"""
-        update_dict = update.dict()
-        update_dict['timestamp'] = update_dict['timestamp'].isoformat()
-        
         await self.sessions.update_one(
             {"_id": ObjectId(session_id)},
             {
-                "$push": {"agent_updates": update_dict},
-                "$set": {"updated_at": datetime.utcnow()}
+                "$push": {"agent_updates": event.record},
+                "$set": {"updated_at": datetime.utcnow()},
+                "$inc": {"version": 1}
             }
         )
+        session_cache.invalidate(session_id)
     
     async def save_plan(self, session_id: str, plan: dict):
         """Save research plan to session"""
-        await self.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {
-                "$set": {
-                    "plan": plan,
-                    "status": ResearchStatus.AWAITING_APPROVAL,
-                    "updated_at": datetime.utcnow()
-                }
-            }
+        SESSIONS.labels(ResearchStatus.AWAITING_APPROVAL.value).inc()
+        await self._versioned_update(
+            session_id,
+            {"plan": plan, "status": ResearchStatus.AWAITING_APPROVAL},
+            tracked="plan"
         )
     
-    async def approve_plan(self, approval: ApprovalRequest):
-        """Process plan approval"""
-        await self.sessions.update_one(
-            {"_id": ObjectId(approval.session_id)},
+    async def approve_plan(self, approval: ApprovalRequest) -> Optional[bool]:
+        """
+        Process plan approval: None if there is no such session, False if it
+        already finished (including cancelled), so a late approval cannot
+        restart it.
+        """
+        if not ObjectId.is_valid(approval.session_id):
+            return None
+        doc = await self.sessions.find_one_and_update(
+            {"_id": ObjectId(approval.session_id), "status": {"$nin": list(TERMINAL_STATUSES)}},
             {
                 "$set": {
                     "plan_approved": approval.approved,
                     "status": ResearchStatus.RESEARCHING if approval.approved else ResearchStatus.PLANNING,
                     "updated_at": datetime.utcnow()
-                }
-            }
+                },
+                "$inc": {"version": 1}
+            },
+            {"_id": 1}
         )
+        session_cache.invalidate(approval.session_id)
+        if doc is None:
+            exists = await self.sessions.find_one({"_id": ObjectId(approval.session_id)}, {"_id": 1})
+            return False if exists else None
+        return True
     
     async def save_sections(self, session_id: str, sections: list):
         """Save completed sections"""
@@ -143,120 +333,530 @@ class ResearchService:
                         cit['accessed_at'] = cit['accessed_at'].isoformat()
             sections_data.append(section_dict)
         
-        await self.sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {
-                "$set": {
-                    "sections": sections_data,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
+        await self._versioned_update(session_id, {"sections": sections_data}, tracked="sections")
     
-    async def complete_session(self, session_id: str, pdf_path: str, cloudinary_url: str = None):
-        """Mark session as completed"""
+    async def complete_session(self, session_id: str, report: str, cloudinary_url: str = None):
+        """Mark session as completed; ``report`` is the key in the report store"""
+        SESSIONS.labels(ResearchStatus.COMPLETED.value).inc()
         update_data = {
             "status": ResearchStatus.COMPLETED,
-            "final_report_path": pdf_path,
+            "final_report_path": report,
             "completed_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
         if cloudinary_url:
             update_data["cloudinary_url"] = cloudinary_url
         
+        await self.sessions.update_one(
+            {"_id": ObjectId(session_id), "status": {"$ne": ResearchStatus.CANCELLED}},
+            {"$set": update_data, "$inc": {"version": 1}}
+        )
+        session_cache.invalidate(session_id)
+    
+    async def save_trace_summary(self, session_id: str, summary: dict):
+        """Attach a finished trace's waterfall summary to the session"""
         await self.sessions.update_one(
             {"_id": ObjectId(session_id)},
-            {"$set": update_data}
+            {"$set": {"trace_summary": summary}}
         )
     
+    async def save_profile_artifact(self, session_id: str, path: Optional[str]):
+        if path:
+            await self.sessions.update_one(
+                {"_id": ObjectId(session_id)},
+                {"$set": {"profile_artifact": os.path.basename(path), "updated_at": datetime.utcnow()}, "$inc": {"version": 1}}
+            )
+            session_cache.invalidate(session_id)
+    
+    async def get_agent_updates(self, session_id: str, since: int = 0) -> list:
+        """Stored agent updates after sequence number ``since``, as plain dicts"""
+        if not ObjectId.is_valid(session_id):
+            return []
+        updates = await self._read_updates(self.history, session_id, since)
+        # A lagging secondary can miss events this process already broadcast; take those from the primary
+        last = updates[-1]["seq"] if updates else since
+        if self.history is not self.sessions and last < self.last_seq.get(session_id, 0):
+            updates += await self._read_updates(self.sessions, session_id, last)
+        return updates
+    
+    @staticmethod
+    async def _read_updates(collection: TimedCollection, session_id: str, since: int) -> list:
+        if since:
+            # A $slice alone is an exclusion projection and would return the whole document
+            projection = {"_id": 1, "agent_updates": {"$slice": [since, MAX_HISTORY_EVENTS]}}
+        else:
+            projection = {"agent_updates": 1}
+        doc = await collection.find_one({"_id": ObjectId(session_id)}, projection)
+        updates = doc.get("agent_updates", []) if doc else []
+        for seq, update in enumerate(updates, start=since + 1):
+            update.setdefault("seq", seq)  # sessions recorded before sequence numbers
+        return updates
+    
+    async def poll_agent_updates(self, session_id: str, since: int) -> Tuple[List[dict], Optional[str]]:
+        """Updates after ``since`` and the session status in one read, for following a run from another process"""
+        if not ObjectId.is_valid(session_id):
+            return [], None
+        doc = await self.history.find_one(
+            {"_id": ObjectId(session_id)},
+            {"status": 1, "agent_updates": {"$slice": [since, MAX_HISTORY_EVENTS]}}
+        )
+        if not doc:
+            return [], None
+        updates = doc.get("agent_updates", [])
+        for seq, update in enumerate(updates, start=since + 1):
+            update.setdefault("seq", seq)
+        return updates, doc.get("status")
+    
+    async def get_trace_summary(self, session_id: str) -> Optional[dict]:
+        if not ObjectId.is_valid(session_id):
+            return None
+        doc = await self.sessions.find_one({"_id": ObjectId(session_id)}, {"trace_summary": 1})
+        return doc.get("trace_summary") if doc else None
+    
+    def start_research(
+        self,
+        session_id: str,
+        update_callback: Optional[Callable] = None,
+        profile: bool = False,
+        queue_callback: Optional[Callable] = None
+    ) -> asyncio.Task:
+        """
+        Run ``execute_research`` as a task this process tracks until it
+        finishes. ``queue_callback`` receives a ``queue_event`` message each
+        time the run's place in the admission queue changes.
+        """
+        task = asyncio.create_task(
+            self.execute_research(session_id, update_callback, profile=profile, queue_callback=queue_callback)
+        )
+        self.running[session_id] = task
+        def finished(_):
+            self.running.pop(session_id, None)
+            self.last_seq.pop(session_id, None)
+        
+        task.add_done_callback(finished)
+        return task
+    
+    async def cancel_research(self, session_id: str) -> Optional[bool]:
+        """
+        Cancel a session that has not finished: None if there is no such
+        session, False if it already reached a terminal status. The status
+        flips to CANCELLED at once. A run in this process is cancelled
+        outright, and a run in another worker stops at its next checkpoint.
+        """
+        if not ObjectId.is_valid(session_id):
+            return None
+        doc = await self.sessions.find_one_and_update(
+            {"_id": ObjectId(session_id), "status": {"$nin": list(TERMINAL_STATUSES)}},
+            {"$set": {"status": ResearchStatus.CANCELLED, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}},
+            {"_id": 1}
+        )
+        session_cache.invalidate(session_id)
+        if doc is None:
+            exists = await self.sessions.find_one({"_id": ObjectId(session_id)}, {"_id": 1})
+            return False if exists else None
+        SESSIONS.labels(ResearchStatus.CANCELLED.value).inc()
+        with log_context(session_id=session_id):
+            logger.info("Research cancelled" + (" (running here)" if self._cancel_task(session_id) else ""))
+        return True
+    
+    def _cancel_task(self, session_id: str) -> bool:
+        task = self.running.get(session_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+    
+    async def checkpoint(self, session_id: str, step: str):
+        """Between agent steps: stop if the session was cancelled or deleted, possibly by another worker"""
+        doc = await self.sessions.find_one({"_id": ObjectId(session_id)}, {"status": 1})
+        if doc is None:
+            raise ResearchCancelled(f"session deleted before {step}")
+        if doc.get("status") == ResearchStatus.CANCELLED:
+            raise ResearchCancelled(f"cancelled before {step}")
+    
+    async def drain(self, timeout: float):
+        """
+        Stop accepting research and give the runs in flight ``timeout`` seconds
+        to finish. Runs still going after that are cancelled and marked failed
+        so they do not sit in a non-terminal status with no worker behind them.
+        """
+        self.accepting = False
+        if not self.running:
+            return
+        logger.info(f"Draining {len(self.running)} research run(s), up to {timeout:.0f}s")
+        _, pending = await asyncio.wait(list(self.running.values()), timeout=timeout)
+        interrupted = [session_id for session_id, task in self.running.items() if task in pending]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for session_id in interrupted:
+            with log_context(session_id=session_id):
+                logger.warning("Research interrupted by shutdown")
+                try:
+                    await self.update_session_status(session_id, ResearchStatus.FAILED)
+                except Exception as e:
+                    logger.warning(f"Failed to mark interrupted session: {e}")
+    
     async def execute_research(
         self,
         session_id: str,
-        update_callback: Optional[Callable] = None
+        update_callback: Optional[Callable] = None,
+        profile: bool = False,
+        queue_callback: Optional[Callable] = None
+    ):
+        """Run the research pipeline inside a trace and store its summary"""
+        root = None
+        try:
+            with log_context(session_id=session_id), tracer.start_trace("execute_research", session_id=session_id) as root:
+                await self._execute_research(session_id, update_callback, queue_callback, profile)
+        finally:
+            # Cancelled runs too, or their spans would stay in the tracer
+            spans = tracer.finish_trace(root.trace_id) if root is not None else []
+        summary = summarize_trace(spans)
+        try:
+            await self.save_trace_summary(session_id, summary)
+        except Exception as e:
+            logger.warning(f"Failed to save trace summary: {e}")
+    
+    @asynccontextmanager
+    async def _profiled(self, session_id: str, enabled: bool):
+        """
+        Profile the block if asked to and no other profile is running. Only
+        the research phase is profiled: around the approval wait the
+        profile would be mostly polling, and the process-wide profiler lock
+        would block other runs for up to the approval timeout.
+        """
+        profiler = RunProfiler(f"session-{session_id}") if enabled and settings.profiling_enabled else None
+        if profiler and not profiler.start():
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler:
+                await self.save_profile_artifact(session_id, profiler.stop())
+    
+    async def _execute_research(
+        self,
+        session_id: str,
+        update_callback: Optional[Callable] = None,
+        queue_callback: Optional[Callable] = None,
+        profile: bool = False
     ):
        
+        cassette = None
         try:
             session = await self.get_session(session_id)
             if not session:
-                print(f"[ResearchService] Session {session_id} not found")
+                logger.warning(f"Session {session_id} not found")
                 return
             
-            print(f"[ResearchService] Starting research for session {session_id}")
-            print(f"[ResearchService] Topic: {session.topic}")
+            logger.info(f"Starting research for session {session_id}")
+            logger.info(f"Topic: {session.topic}")
             
-            await self.update_session_status(session_id, ResearchStatus.PLANNING)
-            print(f"[ResearchService] Status: PLANNING")
+            # Single producer per session, so a local counter keeps seq equal to the array position
+            next_seq = itertools.count(len(session.agent_updates) + 1)
             
             async def wrapped_callback(update: AgentUpdate):
-                print(f"[AgentUpdate] {update.agent.value}: {update.action} - {update.details.get('message', '')}")
-                await self.add_agent_update(session_id, update)
+                logger.debug(f"{update.agent.value}: {update.action} - {update.details.get('message', '')}")
+                event = EncodedEvent.from_update(update, next(next_seq))
+                await self.add_agent_update(session_id, event)
+                self.last_seq[session_id] = event.seq
                 if update_callback:
-                    await update_callback(update)
+                    await update_callback(event)
             
-            agent_system = MultiAgentResearchSystem(update_callback=wrapped_callback)
+            # Deferred: pulls in openai, bs4 and numpy, which API-only workers never need
+            from .multi_agent import MultiAgentResearchSystem, AgentState
+            
+            async def checkpoint(step: str):
+                await self.checkpoint(session_id, step)
+            
+            cassette = self._open_cassette(session_id, session)
+            agent_system = MultiAgentResearchSystem(
+                update_callback=wrapped_callback,
+                cassette=cassette,
+                checkpoint=checkpoint,
+                step_timeout=settings.agent_step_timeout_seconds
+            )
             state = AgentState(topic=session.topic)
             
-            print(f"[ResearchService] Manager Agent: Creating plan...")
-            state = await agent_system.manager_agent(state)
-            print(f"[ResearchService] Plan created with {len(state.plan.sections)} sections")
+            def admission(phase: str):
+                """Planning and research are admitted separately, so no slot is held through the approval wait"""
+                queued = False
+                
+                async def on_position(position: int, waiting: int):
+                    nonlocal queued
+                    if not queued:
+                        queued = True
+                        await self.update_session_status(session_id, ResearchStatus.QUEUED)
+                    if queue_callback:
+                        await queue_callback(queue_event(phase, position, waiting))
+                
+                return self.admission.slot(session_id, session.user_id, phase, on_position)
+            
+            async with admission("plan"):
+                await self.update_session_status(session_id, ResearchStatus.PLANNING)
+                logger.debug("Status: PLANNING")
+                logger.debug("Manager Agent: Creating plan...")
+                state = await agent_system.step("plan", agent_system.manager_agent, state)
+            logger.info(f"Plan created with {len(state.plan.sections)} sections")
             
+            # A cancel from another worker during planning must not be overwritten by AWAITING_APPROVAL
+            await checkpoint("approval")
             await self.save_plan(session_id, state.plan.dict())
-            print(f"[ResearchService] Plan created! Waiting for user approval...")
+            logger.info("Plan created! Waiting for user approval...")
             
-            max_wait = 3600  # 1 hour timeout
+            max_wait = settings.approval_timeout_seconds
+            poll_interval = settings.approval_poll_interval_seconds
             waited = 0
+            next_notice = 30
+            approval_span = tracer.start_span("approval_wait", category="sleep")
             while waited < max_wait:
                 session = await self.get_session(session_id)
+                if session is None:
+                    raise ResearchCancelled("session deleted while awaiting approval")
+                if session.status == ResearchStatus.CANCELLED:
+                    raise ResearchCancelled("cancelled while awaiting approval")
                 if session.plan_approved:
-                    print(f"[ResearchService] Plan approved! Starting research phase.")
+                    logger.info("Plan approved! Starting research phase.")
                     break
-                await asyncio.sleep(5)
-                waited += 5
-                if waited % 30 == 0:
-                    print(f"[ResearchService] Still waiting for approval... ({waited}s)")
+                await asyncio.sleep(poll_interval)
+                waited += poll_interval
+                if waited >= next_notice:
+                    next_notice += 30
+                    logger.debug(f"Still waiting for approval... ({waited:.0f}s)")
+            tracer.end_span(approval_span)
             
             if not session.plan_approved:
-                print(f"[ResearchService] Plan not approved, failing session")
+                logger.warning("Plan not approved, failing session")
                 await self.update_session_status(session_id, ResearchStatus.FAILED)
                 return
             
-            await self.update_session_status(session_id, ResearchStatus.RESEARCHING)
-            print(f"[ResearchService] Starting research phase...")
-            state = await agent_system.run_research(state)
-            print(f"[ResearchService] Research phase complete. {len(state.sections)} sections created.")
-            
-            await self.save_sections(session_id, state.sections)
-            
-            print(f"[ResearchService] Generating PDF report...")
-            try:
-                pdf_path = self.pdf_service.generate_report(
-                    topic=session.topic,
-                    sections=state.sections,
-                    session_id=session_id
-                )
+            async with admission("research"), self._profiled(session_id, profile):
+                await self.update_session_status(session_id, ResearchStatus.RESEARCHING)
+                logger.info("Starting research phase...")
+                state = await agent_system.run_research(state)
+                logger.info(f"Research phase complete. {len(state.sections)} sections created.")
                 
-                cloudinary_url = self.pdf_service.upload_to_cloudinary(pdf_path, session_id)
+                await checkpoint("report")
+                await self.save_sections(session_id, state.sections)
                 
-                await self.complete_session(session_id, pdf_path, cloudinary_url)
-                print(f"[ResearchService] Research complete! PDF: {pdf_path}")
-                if cloudinary_url:
-                    print(f"[ResearchService] Cloudinary URL: {cloudinary_url}")
-            except Exception as pdf_error:
-                print(f"[ResearchService] PDF generation failed: {pdf_error}")
-                await self.update_session_status(session_id, ResearchStatus.COMPLETED)
-                print(f"[ResearchService] Research completed (PDF generation failed)")
+                logger.debug("Generating PDF report...")
+                try:
+                    key = report_key(session_id, report_fingerprint(session.topic, state.sections))
+                    stored, cloudinary_url = await self._render_report(
+                        session_id, session.topic, state.sections, key, upload=True
+                    )
+                
+                    await self.complete_session(session_id, stored.key, cloudinary_url)
+                    logger.info(f"Research complete! Report: {stored.key} ({stored.length} bytes, {self.reports.name})")
+                    if cloudinary_url:
+                        logger.debug(f"Cloudinary URL: {cloudinary_url}")
+                except Exception as pdf_error:
+                    logger.warning(f"PDF generation failed: {pdf_error}")
+                    await self.update_session_status(session_id, ResearchStatus.COMPLETED)
+                    logger.warning("Research completed (PDF generation failed)")
             
+        except ResearchCancelled as e:
+            logger.info(f"Research stopped: {e}")
+        except asyncio.CancelledError:
+            logger.info("Research task cancelled")
+            raise
         except Exception as e:
-            print(f"[ResearchService] ERROR: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Research failed: {e}")
             await self.update_session_status(session_id, ResearchStatus.FAILED)
+        finally:
+            if cassette is not None and cassette.mode == CassetteMode.RECORD:
+                cassette.save()
+                logger.info(f"Cassette saved: {cassette.path} ({len(cassette.entries)} interactions)")
+    
+    async def _render_report(
+        self,
+        session_id: str,
+        topic: str,
+        sections: list,
+        key: str,
+        report_format: ReportFormat = ReportFormat.PDF,
+        upload: bool = False
+    ) -> Tuple[StoredReport, Optional[str]]:
+        """
+        Render off the event loop and store under ``key``; Cloudinary gets
+        the local file before it is removed. The file name is unique, not
+        ``key``: workers on one host may rebuild the same key at once, and
+        single-flight only covers this process.
+        """
+        renderer = RENDERERS[report_format]
+        fd, path = tempfile.mkstemp(dir=self.pdf_service.output_dir, prefix=f"{session_id}_",
+                                    suffix=f".{report_format.value}")
+        os.close(fd)
+        stored = None
+        try:
+            with REPORT_RENDER_SECONDS.labels(report_format.value).time(), \
+                    tracer.span("report.render", format=report_format.value):
+                document = build_report_document(topic, sections, session_id)
+                await render_report(report_format, document, path)
+            stored = await self.reports.put(key, path, renderer.media_type)
+            cloudinary_url = None
+            if upload:
+                cloudinary_url = await asyncio.to_thread(self.pdf_service.upload_to_cloudinary, path, session_id)
+        finally:
+            if stored is None or stored.ref != path:
+                os.remove(path)
+        return stored, cloudinary_url
+    
+    async def ensure_report(
+        self,
+        session: ResearchSession,
+        report_format: ReportFormat = ReportFormat.PDF
+    ) -> Optional[StoredReport]:
+        """
+        The stored report in ``report_format`` for the session's current
+        sections, rendered from them if the store does not have it yet.
+        Concurrent callers share one render. None if the session has no
+        sections to render.
+        """
+        if not session.sections:
+            return None
+        key = report_key(session.id, report_fingerprint(session.topic, session.sections), report_format)
+        report = await self.reports.stat(key)
+        if report is not None:
+            return report
+        
+        task = self._renders.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._rebuild_report(session, key, report_format))
+            self._renders[key] = task
+            task.add_done_callback(lambda _: self._renders.pop(key, None))
+        # Shielded: a client giving up does not cancel the render for the others
+        return await asyncio.shield(task)
+    
+    async def _rebuild_report(self, session: ResearchSession, key: str, report_format: ReportFormat) -> StoredReport:
+        with log_context(session_id=session.id):
+            logger.info(f"Rendering {report_format.value} report from stored sections")
+            stored, _ = await self._render_report(session.id, session.topic, session.sections, key, report_format)
+            await self.save_report(session.id, key, report_format)
+            return stored
+    
+    async def save_report(self, session_id: str, key: str, report_format: ReportFormat = ReportFormat.PDF):
+        """Point the session at a rendered report and drop the one it replaces"""
+        pdf = report_format == ReportFormat.PDF
+        field = "final_report_path" if pdf else f"report_exports.{report_format.value}"
+        previous = await self.sessions.find_one_and_update(
+            {"_id": ObjectId(session_id)},
+            {"$set": {field: key, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}},
+            {field: 1}
+        ) or {}
+        session_cache.invalidate(session_id)
+        if pdf:
+            old_key = previous.get("final_report_path")
+        else:
+            old_key = (previous.get("report_exports") or {}).get(report_format.value)
+        if old_key and old_key != key and not os.path.isabs(old_key):
+            await self.reports.delete(old_key)
+    
+    async def iter_export_pages(
+        self,
+        user_id: str,
+        session_ids: Optional[List[str]] = None,
+        page_size: int = 50
+    ) -> AsyncIterator[List[dict]]:
+        """
+        A user's completed sessions (all, or those in ``session_ids``) in
+        ``_id`` order, one page of ``EXPORT_FIELDS`` documents at a time.
+        Pages are keyed on the last ``_id`` rather than one long-lived
+        cursor, so a slow download cannot time a cursor out.
+        """
+        query = {"user_id": user_id, "status": ResearchStatus.COMPLETED}
+        if session_ids is not None:
+            query["_id"] = {"$in": [ObjectId(s) for s in session_ids if ObjectId.is_valid(s)]}
+        last_id = None
+        while True:
+            page_query = query
+            if last_id is not None:
+                page_query = {**query, "_id": {**query.get("_id", {}), "$gt": last_id}}
+            cursor = self.listing.find(page_query, EXPORT_FIELDS).sort("_id", 1).limit(page_size)
+            page = await cursor.to_list(length=page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]["_id"]
+    
+    async def _export_report(self, doc: dict, report_format: ReportFormat) -> Optional[StoredReport]:
+        """The stored report a session points at, or one rendered from its sections"""
+        if report_format == ReportFormat.PDF:
+            key = doc.get("final_report_path")
+        else:
+            key = (doc.get("report_exports") or {}).get(report_format.value)
+        if key and not os.path.isabs(key):
+            report = await self.reports.stat(key)
+            if report is not None:
+                return report
+        
+        full = await self.sessions.find_one({"_id": doc["_id"]}, {**EXPORT_FIELDS, "sections": 1})
+        if full is None:
+            return None
+        full["_id"] = str(full["_id"])
+        return await self.ensure_report(ResearchSession(**full), report_format)
+    
+    async def export_archive(
+        self,
+        user_id: str,
+        report_format: ReportFormat = ReportFormat.PDF,
+        session_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Zip of a user's reports, yielded as it is written. At most one page of
+        sessions and one store chunk are held at a time. The reports a page
+        is missing are rendered concurrently while the ones before them
+        stream. Sessions that cannot be exported are listed in
+        ``export_errors.txt`` at the end of the archive.
+        """
+        # PDFs are already compressed; the text formats shrink several times
+        compression = zipfile.ZIP_STORED if report_format == ReportFormat.PDF else zipfile.ZIP_DEFLATED
+        sink = ZipSink()
+        errors = []
+        with zipfile.ZipFile(sink, "w", compression) as archive:
+            async for page in self.iter_export_pages(user_id, session_ids, settings.export_page_size):
+                lookups = [asyncio.ensure_future(self._export_report(doc, report_format)) for doc in page]
+                try:
+                    for doc, lookup in zip(page, lookups):
+                        session_id = str(doc["_id"])
+                        try:
+                            report = await lookup
+                        except Exception as e:
+                            logger.warning(f"Export of {session_id} failed: {e}")
+                            errors.append(f"{session_id}\t{doc.get('topic', '')}\tfailed: {e}")
+                            continue
+                        if report is None:
+                            errors.append(f"{session_id}\t{doc.get('topic', '')}\tno report sections")
+                            continue
+                        
+                        slug = re.sub(r"[^A-Za-z0-9]+", "_", doc.get("topic", "")).strip("_")[:60] or "report"
+                        info = zipfile.ZipInfo(f"{slug}_{session_id}.{report_format.value}",
+                                               date_time=report.modified.timetuple()[:6])
+                        info.compress_type = compression
+                        with archive.open(info, "w") as entry:
+                            async for chunk in self.reports.read(report, 0, report.length - 1):
+                                entry.write(chunk)
+                                data = sink.drain()
+                                if data:
+                                    yield data
+                        yield sink.drain()  # the entry's data descriptor
+                finally:
+                    # Client gone: stop waiting on this page (shared renders carry on)
+                    for lookup in lookups:
+                        lookup.cancel()
+                    await asyncio.gather(*lookups, return_exceptions=True)
+            if errors:
+                archive.writestr("export_errors.txt", "\n".join(errors) + "\n")
+        yield sink.drain()
     
     async def get_user_sessions(self, user_id: str, limit: int = 20):
         """Get all sessions for a user"""
         sessions = []
-        cursor = self.sessions.find({"user_id": user_id}).sort("created_at", -1).limit(limit)
-        async for doc in cursor:
+        cursor = self.listing.find({"user_id": user_id}).sort("created_at", -1).limit(limit)
+        for doc in await cursor.to_list(length=limit):
             doc["_id"] = str(doc["_id"])
             
             if isinstance(doc.get('status'), str):
@@ -280,8 +880,18 @@ class ResearchService:
     async def delete_session(self, session_id: str) -> bool:
         """Delete a research session"""
         try:
-            result = await self.sessions.delete_one({"_id": ObjectId(session_id)})
-            return result.deleted_count > 0
+            doc = await self.sessions.find_one_and_delete(
+                {"_id": ObjectId(session_id)}, {"final_report_path": 1, "report_exports": 1}
+            )
+            session_cache.invalidate(session_id)
+            # Stops a run in this process; one in another worker stops at its next checkpoint
+            self._cancel_task(session_id)
+            if doc:
+                keys = [doc.get("final_report_path"), *(doc.get("report_exports") or {}).values()]
+                for key in keys:
+                    if key and not os.path.isabs(key):
+                        await self.reports.delete(key)
+            return doc is not None
         except Exception as e:
-            print(f"Error deleting session {session_id}: {e}")
+            logger.error(f"Error deleting session {session_id}: {e}")
             return False
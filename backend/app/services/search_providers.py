@@ -0,0 +1,308 @@
+import httpx
+from bs4 import BeautifulSoup
+from typing import List, Dict, Optional
+from collections import deque
+from ..core.config import settings
+from .domain_health import domain_health
+from ..core.metrics import SEARCH_SECONDS
+from ..core.log import get_logger
+from abc import ABC, abstractmethod
+from urllib.parse import unquote, quote_plus
+import asyncio
+import json
+import re
+import time
+
+
+logger = get_logger("search")
+
+
+def extract_duckduckgo_url(ddg_url: str) -> str:
+    """Extract the actual URL from DuckDuckGo redirect URL format"""
+    # DuckDuckGo format: //duckduckgo.com/l/?uddg=ACTUAL_URL
+    if ddg_url.startswith('//'):
+        ddg_url = 'https:' + ddg_url
+
+    # Extract the redirect URL
+    if 'uddg=' in ddg_url:
+        match = re.search(r'uddg=([^&]+)', ddg_url)
+        if match:
+            url = unquote(match.group(1))
+            # Ensure protocol
+            if not url.startswith('http://') and not url.startswith('https://'):
+                url = 'https://' + url
+            return url
+
+    # Ensure protocol for any other URL
+    if not ddg_url.startswith('http://') and not ddg_url.startswith('https://'):
+        ddg_url = 'https://' + ddg_url
+
+    return ddg_url
+
+
+class SearchUnavailable(Exception):
+    """Raised by a provider that cannot answer right now"""
+
+
+class LatencyStats:
+    """Rolling window of successful response times for one provider"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.successes += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "samples": len(self.samples),
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+class SearchProvider(ABC):
+    """Interface for a web search backend.
+
+    ``search`` returns a list of ``{'title', 'url', 'snippet'}`` dicts and
+    raises on failure, so the hedging layer can fail over immediately.
+    """
+    name = "base"
+
+    @abstractmethod
+    async def search(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        ...
+
+
+class DuckDuckGoHTMLProvider(SearchProvider):
+    name = "duckduckgo"
+
+    def __init__(self, headers: Dict[str, str], base_url: str = "https://html.duckduckgo.com/html/"):
+        self.headers = headers
+        self.base_url = base_url
+
+    async def search(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        search_url = f"{self.base_url}?q={quote_plus(query)}"
+        if not domain_health.allow(search_url):
+            raise SearchUnavailable("duckduckgo circuit open")
+
+        await domain_health.acquire(search_url)
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.get(search_url, headers=self.headers, follow_redirects=True)
+        except httpx.HTTPError as e:
+            domain_health.record_failure(search_url, type(e).__name__)
+            raise
+
+        if response.status_code == 429 or response.status_code >= 500:
+            domain_health.record_failure(search_url, f"HTTP {response.status_code}")
+        else:
+            domain_health.record_success(search_url)
+        if response.status_code != 200:
+            raise SearchUnavailable(f"duckduckgo returned HTTP {response.status_code}")
+
+        results = []
+        soup = BeautifulSoup(response.text, 'html.parser')
+        for div in soup.find_all('div', class_='result__body', limit=max_results):
+            title_elem = div.find('a', class_='result__a')
+            snippet_elem = div.find('a', class_='result__snippet')
+
+            if title_elem and snippet_elem:
+                results.append({
+                    'title': title_elem.get_text(strip=True),
+                    'url': extract_duckduckgo_url(title_elem.get('href', '')),
+                    'snippet': snippet_elem.get_text(strip=True)
+                })
+        return results
+
+
+class SearXNGProvider(SearchProvider):
+    """A self-hosted SearXNG instance queried through its JSON API"""
+    name = "searxng"
+
+    def __init__(self, base_url: str, headers: Dict[str, str]):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers
+
+    async def search(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(
+                f"{self.base_url}/search",
+                params={"q": query, "format": "json"},
+                headers=self.headers
+            )
+            response.raise_for_status()
+
+        return [
+            {
+                'title': item.get('title', ''),
+                'url': item['url'],
+                'snippet': item.get('content', '')
+            }
+            for item in response.json().get('results', [])[:max_results]
+            if item.get('url')
+        ]
+
+
+class LocalIndexProvider(SearchProvider):
+    """
+    Offline provider backed by a JSON file of ``{'title', 'url', 'snippet'}``
+    records, ranked by query term overlap. Meant for tests, benchmarks and
+    development without network access.
+    """
+    name = "local"
+
+    def __init__(self, index_path: str):
+        with open(index_path, encoding="utf-8") as f:
+            self.documents = json.load(f)
+        self._terms = [
+            set(re.findall(r"\w+", f"{d.get('title', '')} {d.get('snippet', '')}".lower()))
+            for d in self.documents
+        ]
+
+    async def search(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        query_terms = set(re.findall(r"\w+", query.lower()))
+        scored = [
+            (len(query_terms & terms), i)
+            for i, terms in enumerate(self._terms)
+        ]
+        scored = sorted((s for s in scored if s[0] > 0), key=lambda s: (-s[0], s[1]))
+        return [
+            {
+                'title': self.documents[i].get('title', ''),
+                'url': self.documents[i]['url'],
+                'snippet': self.documents[i].get('snippet', '')
+            }
+            for _, i in scored[:max_results]
+        ]
+
+
+class HedgedSearch:
+    """
+    Runs providers in preference order with hedged requests.
+
+    The primary is asked first. If it has not answered within its observed
+    ``hedge_quantile`` latency (``default_delay`` until enough samples exist),
+    the next provider is fired as well and the first non-empty answer wins.
+    A provider that fails or comes back empty triggers the next one
+    immediately instead of waiting out the hedge delay.
+    """
+
+    def __init__(
+        self,
+        providers: List[SearchProvider],
+        hedge_quantile: float = 0.9,
+        default_delay: float = 2.0,
+        min_samples: int = 10,
+    ):
+        if not providers:
+            raise ValueError("HedgedSearch needs at least one provider")
+        self.providers = providers
+        self.hedge_quantile = hedge_quantile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.stats: Dict[str, LatencyStats] = {p.name: LatencyStats() for p in providers}
+
+    def hedge_delay(self, provider: SearchProvider) -> float:
+        stats = self.stats[provider.name]
+        if len(stats.samples) < self.min_samples:
+            return self.default_delay
+        return stats.percentile(self.hedge_quantile)
+
+    async def _timed_search(self, provider: SearchProvider, query: str, max_results: int):
+        started = time.monotonic()
+        try:
+            results = await provider.search(query, max_results)
+        except asyncio.CancelledError:
+            SEARCH_SECONDS.labels(provider.name, "cancelled").observe(time.monotonic() - started)
+            raise
+        except Exception as e:
+            SEARCH_SECONDS.labels(provider.name, "error").observe(time.monotonic() - started)
+            self.stats[provider.name].failures += 1
+            logger.warning(f"Search error ({provider.name}): {e}")
+            return []
+        elapsed = time.monotonic() - started
+        SEARCH_SECONDS.labels(provider.name, "ok" if results else "empty").observe(elapsed)
+        self.stats[provider.name].observe(elapsed)
+        return results
+
+    async def search(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
+        waiting = list(self.providers)
+        running: Dict[asyncio.Task, SearchProvider] = {}
+        last_launched: Optional[SearchProvider] = None
+
+        def launch():
+            nonlocal last_launched
+            last_launched = waiting.pop(0)
+            task = asyncio.create_task(self._timed_search(last_launched, query, max_results))
+            running[task] = last_launched
+
+        launch()
+        try:
+            while running:
+                timeout = self.hedge_delay(last_launched) if waiting else None
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    logger.debug(f"Search hedge: {last_launched.name} slower than p{int(self.hedge_quantile * 100)}, firing {waiting[0].name}")
+                    launch()
+                    continue
+                for task in done:
+                    running.pop(task)
+                    results = task.result()
+                    if results:
+                        return results
+                if waiting:
+                    launch()
+            return []
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+
+def build_provider(name: str, headers: Dict[str, str]) -> SearchProvider:
+    if name == "duckduckgo":
+        return DuckDuckGoHTMLProvider(headers, settings.duckduckgo_url)
+    if name == "searxng":
+        if not settings.searxng_url:
+            raise ValueError("SEARXNG_URL must be set to use the searxng provider")
+        return SearXNGProvider(settings.searxng_url, headers)
+    if name == "local":
+        if not settings.search_index_path:
+            raise ValueError("SEARCH_INDEX_PATH must be set to use the local provider")
+        return LocalIndexProvider(settings.search_index_path)
+    raise ValueError(f"Unknown search provider: {name}")
+
+
+_search: Optional[HedgedSearch] = None
+
+
+def get_search(headers: Dict[str, str]) -> HedgedSearch:
+    """Return the process-wide hedged search, so latency stats are shared by all sessions"""
+    global _search
+    if _search is None:
+        names = [n.strip() for n in settings.search_providers.split(",") if n.strip()]
+        _search = HedgedSearch(
+            [build_provider(name, headers) for name in names],
+            hedge_quantile=settings.search_hedge_quantile,
+            default_delay=settings.search_hedge_default_delay,
+        )
+    return _search
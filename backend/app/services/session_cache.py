@@ -0,0 +1,96 @@
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from ..models.schemas import ResearchSession
+from ..core.config import settings
+from ..core.metrics import SESSION_CACHE_REQUESTS, SESSION_CACHE_SIZE
+import asyncio
+import time
+
+
+class SessionCache:
+    """
+    Bounded LRU of parsed sessions with single-flight loading.
+
+    Concurrent misses for the same id share one loader task, which runs
+    detached so a cancelled caller does not cancel it for the others.
+    ``invalidate`` drops the entry and forgets any in-flight load, so a load
+    that raced a write is handed to its waiters but never cached.
+
+    Entries are shared between callers and must be treated as read-only.
+    Writes made by other worker processes are not seen here; ``ttl`` bounds
+    how long such an entry can be stale.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, ResearchSession]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(
+        self,
+        session_id: str,
+        loader: Callable[[], Awaitable[Optional[ResearchSession]]]
+    ) -> Optional[ResearchSession]:
+        entry = self._entries.get(session_id)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(session_id)
+            self._record("hit")
+            return entry[1]
+
+        task = self._inflight.get(session_id)
+        if task is None:
+            self._record("miss")
+            task = asyncio.ensure_future(self._load(session_id, loader))
+            self._inflight[session_id] = task
+        else:
+            self._record("coalesced")
+        return await asyncio.shield(task)
+
+    async def _load(self, session_id: str, loader) -> Optional[ResearchSession]:
+        me = asyncio.current_task()
+        try:
+            session = await loader()
+        finally:
+            current = self._inflight.get(session_id) is me
+            if current:
+                del self._inflight[session_id]
+        # Only cache if nothing invalidated the id while we were loading
+        if current and session is not None:
+            self._entries[session_id] = (time.monotonic(), session)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            SESSION_CACHE_SIZE.set(len(self._entries))
+        return session
+
+    def invalidate(self, session_id: str):
+        self._entries.pop(session_id, None)
+        self._inflight.pop(session_id, None)
+        SESSION_CACHE_SIZE.set(len(self._entries))
+
+    def _record(self, result: str):
+        if result == "hit":
+            self.hits += 1
+        elif result == "miss":
+            self.misses += 1
+        else:
+            self.coalesced += 1
+        SESSION_CACHE_REQUESTS.labels(result).inc()
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / requests, 4) if requests else 0.0,
+        }
+
+
+session_cache = SessionCache(settings.session_cache_size, settings.session_cache_ttl_seconds)
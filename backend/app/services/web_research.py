@@ -1,80 +1,85 @@
 import httpx
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List, Dict, Optional
 from ..models.schemas import Citation
+from ..core.config import settings
+from .domain_health import domain_health
+from .search_providers import get_search
+from .relevance import rank_results
+from .dedup import DuplicateIndex
+from .cassette import Cassette, ReplayedLate
+from ..core.metrics import FETCH_SECONDS
+from ..core.tracing import traced
+from ..core.log import get_logger
 from datetime import datetime
 import asyncio
-import re
-from urllib.parse import urlparse, unquote
+import time
 
 
-def extract_duckduckgo_url(ddg_url: str) -> str:
-    """Extract the actual URL from DuckDuckGo redirect URL format"""
-    # DuckDuckGo format: //duckduckgo.com/l/?uddg=ACTUAL_URL
-    if ddg_url.startswith('//'):
-        ddg_url = 'https:' + ddg_url
-    
-    # Extract the redirect URL
-    if 'uddg=' in ddg_url:
-        match = re.search(r'uddg=([^&]+)', ddg_url)
-        if match:
-            url = unquote(match.group(1))
-            # Ensure protocol
-            if not url.startswith('http://') and not url.startswith('https://'):
-                url = 'https://' + url
-            return url
-    
-    # Ensure protocol for any other URL
-    if not ddg_url.startswith('http://') and not ddg_url.startswith('https://'):
-        ddg_url = 'https://' + ddg_url
-    
-    return ddg_url
+logger = get_logger("web_research")
+
+# Page text kept per citation; the writer sees the snippet plus this much
+EXCERPT_CHARS = 500
+
+
+class SourceReport:
+    """Sources gathered for one section, plus what had to be left behind"""
+    def __init__(self):
+        self.citations: List[Citation] = []
+        self.late: int = 0
+        self.budget_skipped: int = 0
+        self.duplicates: int = 0
 
 
 class WebResearchService:
     
-    def __init__(self):
+    def __init__(self, cassette: Optional[Cassette] = None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        self.search_backend = get_search(self.headers)
+        self.duplicates = DuplicateIndex(threshold=settings.dedup_similarity_threshold)
+        self.cassette = cassette
     
-    async def search_duckduckgo(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
-        
-        results = []
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"https://html.duckduckgo.com/html/?q={query}",
-                    headers=self.headers,
-                    follow_redirects=True
-                )
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    result_divs = soup.find_all('div', class_='result__body', limit=max_results)
-                    
-                    for div in result_divs:
-                        title_elem = div.find('a', class_='result__a')
-                        snippet_elem = div.find('a', class_='result__snippet')
-                        
-                        if title_elem and snippet_elem:
-                            raw_url = title_elem.get('href', '')
-                            actual_url = extract_duckduckgo_url(raw_url)
-                            
-                            results.append({
-                                'title': title_elem.get_text(strip=True),
-                                'url': actual_url,
-                                'snippet': snippet_elem.get_text(strip=True)
-                            })
-        except Exception as e:
-            print(f"Search error: {e}")
-        
-        return results
+    def _record_response(self, url: str, status_code: int):
+        """Feed the host's circuit breaker; only throttling and server errors count against it"""
+        if status_code == 429 or status_code >= 500:
+            domain_health.record_failure(url, f"HTTP {status_code}")
+        else:
+            domain_health.record_success(url)
+    
+    @traced("web.search", query="query")
+    async def search(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
+        if self.cassette is not None:
+            return await self.cassette.intercept(
+                "search",
+                {"query": query, "max_results": max_results},
+                lambda: self.search_backend.search(query, max_results=max_results)
+            )
+        return await self.search_backend.search(query, max_results=max_results)
+    
+    @traced("web.fetch", url="url")
+    async def extract_content(self, url: str, sent: Optional[set] = None) -> str:
+        """Page text, or "" on failure; ``url`` is added to ``sent`` once the request goes out"""
+        if self.cassette is not None:
+            return await self.cassette.intercept("fetch", {"url": url}, lambda: self._fetch_content(url, sent))
+        return await self._fetch_content(url, sent)
     
-    async def extract_content(self, url: str) -> str:
+    async def _fetch_content(self, url: str, sent: Optional[set] = None) -> str:
+        if not domain_health.allow(url):
+            FETCH_SECONDS.labels("circuit_open").observe(0)
+            logger.debug(f"Skipping {url}: host circuit open")
+            return ""
+        
+        started = time.monotonic()
+        outcome = "cancelled"
         try:
+            await domain_health.acquire(url)
+            if sent is not None:
+                sent.add(url)
             async with httpx.AsyncClient(timeout=15.0) as client:
                 response = await client.get(url, headers=self.headers, follow_redirects=True)
+                self._record_response(url, response.status_code)
                 
                 if response.status_code == 200:
                     soup = BeautifulSoup(response.text, 'html.parser')
@@ -91,27 +96,158 @@ class WebResearchService:
                     chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
                     text = ' '.join(chunk for chunk in chunks if chunk)
                     
+                    outcome = "ok"
                     return text[:3000]  # Limit content length
+                
+                outcome = f"http_{response.status_code // 100}xx"
+        except httpx.HTTPError as e:
+            outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "http_error"
+            domain_health.record_failure(url, type(e).__name__)
+            logger.warning(f"Content extraction error for {url}: {e}")
         except Exception as e:
-            print(f"Content extraction error for {url}: {e}")
+            outcome = "error"
+            logger.warning(f"Content extraction error for {url}: {e}")
+        finally:
+            FETCH_SECONDS.labels(outcome).observe(time.monotonic() - started)
         
         return ""
     
-    async def research_topic(self, query: str, num_sources: int = 3) -> List[Citation]:
-        search_results = await self.search_duckduckgo(query, max_results=num_sources)
-        citations = []
+    def _make_citation(self, result: Dict[str, str], content: str) -> Citation:
+        return Citation(
+            title=result['title'],
+            url=result['url'],
+            excerpt=result['snippet'] + (f" ...{content[:EXCERPT_CHARS]}" if content else ""),
+            accessed_at=datetime.utcnow()
+        )
+    
+    async def gather_sources(
+        self,
+        query: str,
+        num_sources: int = 3,
+        deadline: Optional[float] = None,
+        focus: Optional[List[str]] = None
+    ) -> SourceReport:
+        """
+        Search and fetch pages concurrently, consuming them as they complete.
         
-        for result in search_results:
-            content = await self.extract_content(result['url'])
-            
-            citation = Citation(
-                title=result['title'],
-                url=result['url'],
-                excerpt=result['snippet'] + (f" ...{content[:500]}" if content else ""),
-                accessed_at=datetime.utcnow()
-            )
-            citations.append(citation)
-            
-            await asyncio.sleep(1)
+        With over-fetching enabled, ``num_sources * search_overfetch_factor``
+        hits are requested and ranked by their snippets against the query and
+        ``focus`` (e.g. the plan's research questions). Pages are downloaded
+        best-first, at most ``num_sources`` at a time, and only while the
+        excerpts gathered plus the most the fetches in flight could add fall
+        short of the content budget: pages that come back empty, thin or
+        near-duplicate a page already used in this session are topped up
+        from the runners-up, and fetches still in flight once the budget is
+        full are cancelled. With no budget, ``num_sources`` pages are kept.
+        
+        When ``deadline`` seconds (measured from when the search returns, so
+        the search provider's politeness wait is not charged to the fetches)
+        run out, the section goes ahead with whatever is ready; fetches still
+        in flight are cancelled and counted as late. Only hosts that were
+        actually sent a request count the miss against their circuit breaker.
+        """
+        if deadline is None:
+            deadline = settings.research_section_deadline_seconds
+        
+        loop = asyncio.get_running_loop()
+        report = SourceReport()
+        
+        overfetch = max(1, settings.search_overfetch_factor)
+        search_results = await self.search(query, max_results=num_sources * overfetch)
+        deadline_at = loop.time() + deadline
+        if overfetch > 1:
+            candidates = [result for _, result in rank_results(search_results, query, focus or [])]
+        else:
+            candidates = list(search_results)
+        reserve = list(enumerate(candidates))
+        budget = settings.research_content_budget_chars
+        
+        fetches = {}
+        ready = []
+        budget_used = 0
+        # URLs whose request went out; a fetch still waiting on its host's rate limit never reached the host
+        sent = set()
+        
+        def fetch_next():
+            # Mirrors recognised in earlier sections are rejected without a request
+            while reserve:
+                rank, result = reserve.pop(0)
+                if self.duplicates.known_duplicate(result['url']):
+                    report.duplicates += 1
+                    continue
+                # Politeness is enforced per host by domain_health, so pages can be fetched together
+                task = asyncio.create_task(self.extract_content(result['url'], sent))
+                fetches[task] = (rank, result)
+                return task
+            return None
         
-        return citations
+        pending = set()
+        
+        def top_up():
+            while reserve and len(pending) < num_sources:
+                if budget:
+                    # Most the fetches in flight could still add to the budget
+                    in_flight = sum(len(fetches[task][1]['snippet']) + len(" ...") + EXCERPT_CHARS for task in pending)
+                    if budget_used + in_flight >= budget:
+                        return
+                elif len(ready) + len(pending) >= num_sources:
+                    return
+                task = fetch_next()
+                if task is None:
+                    return
+                pending.add(task)
+        
+        top_up()
+        # Fetches a zero-latency replay reports as late straight away
+        replayed_late = 0
+        try:
+            while pending and not (budget and budget_used >= budget):
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    rank, result = fetches[task]
+                    try:
+                        content = task.result()
+                    except ReplayedLate:
+                        replayed_late += 1
+                        continue
+                    duplicate_of = self.duplicates.check(result['url'], content) if content else None
+                    if duplicate_of:
+                        report.duplicates += 1
+                        logger.debug(f"Dropping {result['url']}: near-duplicate of {duplicate_of}")
+                    # Dropped pages are replaced by top_up below if still needed
+                    if duplicate_of or (not content and reserve):
+                        continue
+                    citation = self._make_citation(result, content)
+                    ready.append((rank, citation))
+                    budget_used += len(citation.excerpt)
+                if not (budget and budget_used >= budget):
+                    top_up()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        if budget and budget_used >= budget:
+            report.budget_skipped = len(pending) + replayed_late
+        else:
+            report.late = len(pending) + replayed_late
+            for task in pending:
+                _, result = fetches[task]
+                if result['url'] in sent:
+                    domain_health.record_failure(result['url'], "section deadline exceeded")
+        
+        report.citations = [citation for _, citation in sorted(ready, key=lambda item: item[0])]
+        if report.late:
+            logger.info(f"Research deadline hit for '{query}': {report.late} late source(s) dropped")
+        
+        return report
+    
+    async def research_topic(self, query: str, num_sources: int = 3) -> List[Citation]:
+        report = await self.gather_sources(query, num_sources=num_sources)
+        return report.citations
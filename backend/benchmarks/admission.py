@@ -0,0 +1,137 @@
+"""
+Tail latency for light users while one heavy user floods the server.
+
+A simulation, not a load test. The real ``AdmissionController`` is used, but
+agents are replaced by sleeps. Every session makes ``--steps`` LLM calls of
+``--step-ms`` each, and all calls contend for a shared quota of
+``--llm-capacity`` concurrent calls (the provider's rate limit). One heavy
+user submits ``--heavy`` sessions at t=0. ``--light`` other users submit one
+session each, spread evenly over ``--arrival-window`` seconds. Three
+admission policies are compared:
+
+- ``none``: every session starts at once (the behaviour before admission)
+- ``fifo``: a global limit of ``--max-running`` in arrival order
+- ``fair``: the same global limit plus ``--max-per-user`` and weighted fair
+  queuing across users
+
+Latency is from submission to the last step finishing.
+
+    cd backend
+    python -m benchmarks.admission --heavy 50 --light 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+
+POLICIES = ("none", "fifo", "fair")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy", type=int, default=50, help="sessions submitted by the heavy user at t=0")
+    parser.add_argument("--light", type=int, default=20, help="light users, one session each")
+    parser.add_argument("--arrival-window", type=float, default=2.0, help="seconds over which light users arrive")
+    parser.add_argument("--steps", type=int, default=6, help="LLM calls per session")
+    parser.add_argument("--step-ms", type=float, default=20.0)
+    parser.add_argument("--llm-capacity", type=int, default=4, help="concurrent LLM calls across all sessions")
+    parser.add_argument("--max-running", type=int, default=8)
+    parser.add_argument("--max-per-user", type=int, default=2)
+    parser.add_argument("--policy", choices=POLICIES, action="append", help="repeatable; default all")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies):
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def admission_policy(policy: str, args):
+    """An ``async with`` factory taking ``(session_id, user_id)``"""
+    from app.services.admission import AdmissionController
+
+    if policy == "none":
+        @asynccontextmanager
+        async def unlimited(session_id, user_id):
+            yield
+        return unlimited
+    if policy == "fifo":
+        semaphore = asyncio.Semaphore(args.max_running)
+
+        @asynccontextmanager
+        async def fifo(session_id, user_id):
+            async with semaphore:
+                yield
+        return fifo
+    controller = AdmissionController(args.max_running, args.max_per_user)
+    return lambda session_id, user_id: controller.slot(session_id, user_id, "research")
+
+
+async def simulate(policy: str, args) -> dict:
+    admit = admission_policy(policy, args)
+    llm = asyncio.Semaphore(args.llm_capacity)
+    latencies = {"heavy": [], "light": []}
+
+    async def session(session_id: str, user_id: str, kind: str, delay: float):
+        await asyncio.sleep(delay)
+        submitted = time.perf_counter()
+        async with admit(session_id, user_id):
+            for _ in range(args.steps):
+                async with llm:
+                    await asyncio.sleep(args.step_ms / 1000)
+        latencies[kind].append(time.perf_counter() - submitted)
+
+    tasks = [session(f"heavy-{i}", "heavy", "heavy", 0.0) for i in range(args.heavy)]
+    spacing = args.arrival_window / max(args.light, 1)
+    tasks += [session(f"light-{i}", f"light-{i}", "light", (i + 0.5) * spacing) for i in range(args.light)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    result = {kind: summarize(values) for kind, values in latencies.items() if values}
+    result["makespan_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["LOG_LEVEL"] = "WARNING"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    results = {policy: asyncio.run(simulate(policy, args)) for policy in args.policy or POLICIES}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    ideal = args.steps * args.step_ms
+    print(f"{args.heavy} heavy sessions at t=0, {args.light} light users over {args.arrival_window:g}s; "
+          f"{args.steps} x {args.step_ms:g} ms steps, LLM capacity {args.llm_capacity} "
+          f"(uncontended session: {ideal:.0f} ms)\n")
+    print(f"{'policy':<8}{'user':<7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'makespan':>12}")
+    for policy, result in results.items():
+        for kind in ("light", "heavy"):
+            if kind not in result:
+                continue
+            r = result[kind]
+            makespan = f"{result['makespan_ms']:>9.0f} ms" if kind == "light" else ""
+            print(f"{policy:<8}{kind:<7}{r['p50_ms']:>7.0f} ms{r['p95_ms']:>7.0f} ms"
+                  f"{r['p99_ms']:>7.0f} ms{r['max_ms']:>7.0f} ms{makespan}")
+
+
+if __name__ == "__main__":
+    main()
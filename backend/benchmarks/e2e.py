@@ -0,0 +1,242 @@
+"""
+Offline end-to-end throughput benchmark.
+
+Drives N concurrent research sessions through
+``/api/research/start`` -> ``/approve`` -> completion against a real uvicorn
+instance of the API, with OpenAI, search/pages and MongoDB replaced by local
+stand-ins (see ``benchmarks/fakes.py``). Reports per-stage latency
+percentiles and sessions/minute.
+
+    cd backend
+    python -m benchmarks.e2e --sessions 20 --concurrency 10
+
+Mongo defaults to an in-memory ``mongomock_motor`` client; pass
+``--mongo-url`` to run against a real server instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime
+
+from .fakes import LatencyModel, ServerThread, create_openai_app, create_web_app, free_port
+
+
+# Patches that must outlive start_api(), e.g. mongomock's GridFS support
+_process_patches = ExitStack()
+
+STAGES = {
+    # stage: (start action, end action) taken from the session's agent_updates
+    "plan": ("planning", "plan_created"),
+    "search": ("searching", "sources_found"),
+    "write": ("writing", "section_drafted"),
+    "critique": ("reviewing", "review_complete"),
+}
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sections", type=int, default=4, help="sections per plan")
+    parser.add_argument("--llm-ttft", type=float, default=0.5, help="median time to first token (s)")
+    parser.add_argument("--llm-ttft-sigma", type=float, default=0.5)
+    parser.add_argument("--llm-tps", type=float, default=80.0, help="mean completion tokens/second")
+    parser.add_argument("--critique-fail-rate", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--page-latency", type=float, default=0.3, help="median page latency (s)")
+    parser.add_argument("--page-latency-sigma", type=float, default=1.0)
+    parser.add_argument("--host-rate", type=float, default=1000.0,
+                        help="per-host fetch rate; all fixture pages share one host")
+    parser.add_argument("--approval-poll", type=float, default=5.0)
+    parser.add_argument("--mongo-url", default="", help="real MongoDB instead of in-memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def start_stand_ins(args):
+    llm = ServerThread(create_openai_app(
+        LatencyModel(args.llm_ttft, args.llm_ttft_sigma, args.llm_tps),
+        seed=args.seed,
+        sections=args.sections,
+        critique_fail_rate=args.critique_fail_rate,
+    )).start()
+
+    web_port = free_port()
+    web_url = f"http://127.0.0.1:{web_port}"
+    web = ServerThread(create_web_app(
+        web_url,
+        seed=args.seed,
+        search_latency=args.search_latency,
+        page_latency_median=args.page_latency,
+        page_latency_sigma=args.page_latency_sigma,
+    ), port=web_port).start()
+    return llm, web
+
+
+def configure_environment(args, llm_url: str, web_url: str):
+    """Settings are read at import time, so this must run before importing ``app``"""
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"{llm_url}/v1",
+        "OPENAI_RPM_LIMIT": "100000",
+        "OPENAI_TPM_LIMIT": "100000000",
+        "SEARCH_PROVIDERS": "duckduckgo",
+        "DUCKDUCKGO_URL": f"{web_url}/html/",
+        "WEB_HOST_RATE_PER_SECOND": str(args.host_rate),
+        "WEB_HOST_BURST": str(max(1, int(args.host_rate))),
+        "APPROVAL_POLL_INTERVAL_SECONDS": str(args.approval_poll),
+        "CLOUDINARY_CLOUD_NAME": "",
+    })
+    if args.mongo_url:
+        os.environ["MONGODB_URL"] = args.mongo_url
+        os.environ["DATABASE_NAME"] = f"insightengine_bench_{int(time.time())}"
+
+
+def start_api(args):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.main import app
+    from app.core.database import Database
+
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient, enabled_gridfs_integration
+
+        _process_patches.enter_context(enabled_gridfs_integration())  # GridFS report store
+
+        async def connect_db():
+            Database.client = AsyncMongoMockClient()
+
+        Database.connect_db = staticmethod(connect_db)
+
+    return ServerThread(app).start()
+
+
+def parse_ts(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if isinstance(value, str) else value
+
+
+def stage_durations(session: dict):
+    """Pair each start action with the next matching end action per section"""
+    durations = defaultdict(list)
+    open_stages = {}
+    for update in session.get("agent_updates", []):
+        ts = parse_ts(update["timestamp"])
+        key_section = update.get("details", {}).get("section")
+        for stage, (start, end) in STAGES.items():
+            if update["action"] == start:
+                open_stages[(stage, key_section)] = ts
+            elif update["action"] == end and (stage, key_section) in open_stages:
+                started = open_stages.pop((stage, key_section))
+                durations[stage].append((ts - started).total_seconds())
+    return durations
+
+
+async def run_session(client, index: int, results: dict, poll: float):
+    started = time.monotonic()
+    response = await client.post("/api/research/start", json={"topic": f"Benchmark topic {index} energy storage", "user_id": f"bench-user-{index % 5}"})
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+
+    while True:
+        session = (await client.get(f"/api/research/session/{session_id}")).json()
+        if session["status"] in ("awaiting_approval", "failed"):
+            break
+        await asyncio.sleep(poll)
+    results["time_to_plan"].append(time.monotonic() - started)
+
+    approved_at = time.monotonic()
+    await client.post("/api/research/approve", json={"session_id": session_id, "approved": True})
+
+    while True:
+        session = (await client.get(f"/api/research/session/{session_id}")).json()
+        if session["status"] in ("completed", "failed"):
+            break
+        await asyncio.sleep(poll)
+
+    finished = time.monotonic()
+    results["approval_to_complete"].append(finished - approved_at)
+    results["end_to_end"].append(finished - started)
+    results["status"].append(session["status"])
+    for stage, values in stage_durations(session).items():
+        results[stage].extend(values)
+
+
+async def drive(base_url: str, args) -> dict:
+    import httpx
+
+    results = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        async def bounded(i):
+            async with semaphore:
+                await run_session(client, i, results, poll=0.1)
+
+        started = time.monotonic()
+        await asyncio.gather(*(bounded(i) for i in range(args.sessions)))
+        elapsed = time.monotonic() - started
+
+    completed = results["status"].count("completed")
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "completed": completed,
+        "failed": args.sessions - completed,
+        "wall_seconds": round(elapsed, 2),
+        "sessions_per_minute": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        "latency_seconds": {},
+    }
+    for name in ["time_to_plan", "approval_to_complete", "end_to_end", *STAGES]:
+        values = results.get(name, [])
+        report["latency_seconds"][name] = {
+            "n": len(values),
+            "p50": round(percentile(values, 0.5), 3),
+            "p90": round(percentile(values, 0.9), 3),
+            "p99": round(percentile(values, 0.99), 3),
+            "mean": round(statistics.fmean(values), 3) if values else float("nan"),
+        }
+    return report
+
+
+def print_report(report: dict):
+    print(f"\n{report['completed']}/{report['sessions']} sessions completed "
+          f"in {report['wall_seconds']}s at concurrency {report['concurrency']} "
+          f"-> {report['sessions_per_minute']} sessions/min\n")
+    print(f"{'stage':<22}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'mean':>10}")
+    for name, row in report["latency_seconds"].items():
+        print(f"{name:<22}{row['n']:>6}{row['p50']:>10}{row['p90']:>10}{row['p99']:>10}{row['mean']:>10}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    llm, web = start_stand_ins(args)
+    configure_environment(args, llm.url, web.url)
+    api = start_api(args)
+    try:
+        report = asyncio.run(drive(api.url, args))
+    finally:
+        api.stop()
+        web.stop()
+        llm.stop()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
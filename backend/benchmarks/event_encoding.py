@@ -0,0 +1,109 @@
+"""
+CPU and encoded payloads per agent event: per-connection ``send_json`` vs
+serialize-once ``EncodedEvent``.
+
+Both paths build the Mongo record and deliver the message to ``--connections``
+stand-in WebSockets that just keep what they are sent, so only encoding work
+is measured.
+
+    cd backend
+    python -m benchmarks.event_encoding --connections 10 --events 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+
+class SinkWebSocket:
+    """Mimics Starlette's ``send_json`` (``json.dumps`` per call) and ``send_text``"""
+
+    def __init__(self):
+        self.last = None
+
+    async def send_json(self, data):
+        self.last = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    async def send_text(self, text):
+        self.last = text
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--events", type=int, default=20000)
+    return parser.parse_args(argv)
+
+
+def sample_update():
+    from app.models.schemas import AgentUpdate, AgentType
+
+    return AgentUpdate(
+        agent=AgentType.RESEARCHER,
+        action="sources_found",
+        details={
+            "section": "Market landscape and key players",
+            "message": "Found 3 sources",
+            "sources": [f"https://example.com/articles/{i}" for i in range(3)],
+            "late_sources": 0,
+            "duplicate_sources": 1,
+        },
+    )
+
+
+async def per_connection(update, sockets):
+    # Previous path: dict + isoformat for persistence, again for the broadcast, send_json per socket
+    record = update.dict()
+    record["timestamp"] = record["timestamp"].isoformat()
+    message = update.dict()
+    message["timestamp"] = message["timestamp"].isoformat()
+    for ws in sockets:
+        await ws.send_json({"type": "agent_update", "update": message})
+    return record
+
+
+async def serialize_once(update, sockets):
+    from app.core.encoding import EncodedEvent
+
+    event = EncodedEvent.from_update(update, seq=1)
+    for ws in sockets:
+        await ws.send_text(event.text)
+    return event.record
+
+
+async def measure(path, args) -> dict:
+    update = sample_update()
+    sockets = [SinkWebSocket() for _ in range(args.connections)]
+    for _ in range(200):
+        await path(update, sockets)
+
+    started = time.process_time()
+    for _ in range(args.events):
+        await path(update, sockets)
+    cpu = time.process_time() - started
+
+    # Encoded payloads produced for one event: one per socket vs one shared string
+    await path(update, sockets)
+    payloads = {id(ws.last): len(ws.last) for ws in sockets}
+
+    return {"us_per_event": cpu / args.events * 1e6, "payloads": len(payloads), "json_bytes": sum(payloads.values())}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.core import encoding
+
+    print(f"{args.events} events to {args.connections} connections (encoder: {'orjson' if encoding.orjson else 'json'})\n")
+    print(f"{'path':<18}{'cpu/event':>14}{'payloads':>10}{'json bytes':>12}")
+    for name, path in (("send_json", per_connection), ("serialize-once", serialize_once)):
+        result = asyncio.run(measure(path, args))
+        print(f"{name:<18}{result['us_per_event']:>11.1f} us{result['payloads']:>10}{result['json_bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
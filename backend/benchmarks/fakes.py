@@ -0,0 +1,171 @@
+"""
+Local stand-ins for the external services a research session talks to.
+
+- ``create_openai_app``: an OpenAI-compatible ``/v1/chat/completions`` that
+  answers manager, writer and critique prompts with canned but well-formed
+  content after a simulated time-to-first-token plus token-rate delay.
+- ``create_web_app``: a DuckDuckGo-HTML-shaped ``/html/`` search page and the
+  ``/page/{n}`` articles it links to, generated deterministically from a seed.
+
+Both are plain FastAPI apps; ``ServerThread`` runs any ASGI app on a free
+local port in a background thread.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+from html import escape
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+import uvicorn
+
+
+VOCABULARY = (
+    "adoption analysis battery capacity carbon cost data deployment demand "
+    "efficiency emissions energy evidence forecast grid growth impact industry "
+    "infrastructure investment market model network performance policy power "
+    "production regulation renewable research risk scale sector solar storage "
+    "supply technology trend wind workforce"
+).split()
+
+
+class LatencyModel:
+    """Lognormal time-to-first-token plus a normally distributed token rate"""
+
+    def __init__(self, ttft_median: float, ttft_sigma: float, tokens_per_second: float, tps_jitter: float = 0.2):
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_second = tokens_per_second
+        self.tps_jitter = tps_jitter
+
+    def sample(self, rng: random.Random, completion_tokens: int) -> float:
+        ttft = self.ttft_median * rng.lognormvariate(0, self.ttft_sigma) if self.ttft_median else 0.0
+        if not self.tokens_per_second:
+            return ttft
+        rate = max(1.0, rng.gauss(self.tokens_per_second, self.tokens_per_second * self.tps_jitter))
+        return ttft + completion_tokens / rate
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def create_openai_app(latency: LatencyModel, seed: int = 0, sections: int = 4, critique_fail_rate: float = 0.2) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+
+        if "research manager" in prompt:
+            content = json.dumps({
+                "sections": [f"Section {i + 1}: {_words(rng, 3)}" for i in range(sections)],
+                "research_questions": [f"How does {_words(rng, 3)} change?" for _ in range(6)],
+                "estimated_sources": 15,
+            })
+        elif "quality reviewer" in prompt:
+            has_issues = rng.random() < critique_fail_rate
+            content = json.dumps({
+                "has_issues": has_issues,
+                "feedback": "Tighten the argument and cite sources." if has_issues else "",
+                "unsupported_claims": [],
+                "quality_score": 4 if has_issues else 8,
+            })
+        else:
+            content = "\n\n".join(_words(rng, 90) for _ in range(4))
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        await asyncio.sleep(latency.sample(rng, completion_tokens))
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def create_web_app(
+    base_url: str,
+    seed: int = 0,
+    num_pages: int = 40,
+    search_latency: float = 0.2,
+    page_latency_median: float = 0.3,
+    page_latency_sigma: float = 1.0,
+) -> FastAPI:
+    """``base_url`` is where this app will be reachable, used for result links"""
+    app = FastAPI()
+    rng = random.Random(seed)
+    pages = [
+        {"title": f"{_words(rng, 4).title()} report", "body": "\n".join(_words(rng, 60) for _ in range(8))}
+        for _ in range(num_pages)
+    ]
+
+    @app.get("/html/", response_class=HTMLResponse)
+    async def search(q: str = ""):
+        await asyncio.sleep(search_latency)
+        picks = random.Random(q).sample(range(num_pages), min(12, num_pages))
+        results = "".join(
+            f'<div class="result__body">'
+            f'<a class="result__a" href="{base_url}/page/{i}">{escape(pages[i]["title"])}</a>'
+            f'<a class="result__snippet">{escape(pages[i]["body"][:160])}</a>'
+            f'</div>'
+            for i in picks
+        )
+        return f"<html><body>{results}</body></html>"
+
+    @app.get("/page/{page_id}", response_class=HTMLResponse)
+    async def page(page_id: int):
+        await asyncio.sleep(page_latency_median * random.lognormvariate(0, page_latency_sigma))
+        data = pages[page_id % num_pages]
+        paragraphs = "".join(f"<p>{escape(p)}</p>" for p in data["body"].split("\n"))
+        return f"<html><head><title>{escape(data['title'])}</title></head><body><h1>{escape(data['title'])}</h1>{paragraphs}</body></html>"
+
+    return app
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app with uvicorn on its own event loop in a daemon thread"""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
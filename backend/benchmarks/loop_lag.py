@@ -0,0 +1,127 @@
+"""
+Event-loop lag while logging: ``print()`` vs the queued logging pipeline.
+
+Simulates research sessions that each log a few lines per step into a slow
+stdout, e.g. a pipe drained by a container log driver, by giving the sink a
+fixed per-write delay. A monitor task measures how late its 5 ms ticks fire;
+with ``print`` every write stalls the loop, with the queue handler the writes
+happen on the listener thread.
+
+    cd backend
+    python -m benchmarks.loop_lag --sessions 20 --write-delay 0.0005
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+
+class SlowStream:
+    """File-like sink whose writes block for ``delay`` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lines = 0
+        self.writes = 0
+
+    def write(self, text: str):
+        time.sleep(self.delay)
+        self.writes += 1
+        self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent logging tasks")
+    parser.add_argument("--lines-per-step", type=int, default=3)
+    parser.add_argument("--step-interval", type=float, default=0.01, help="seconds between steps per session")
+    parser.add_argument("--write-delay", type=float, default=0.0005, help="seconds each write blocks")
+    parser.add_argument("--duration", type=float, default=3.0)
+    return parser.parse_args(argv)
+
+
+async def measure(emit, args) -> dict:
+    lags = []
+    emitted = 0
+    stop = asyncio.Event()
+
+    async def monitor(interval=0.005):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    async def session(index: int):
+        nonlocal emitted
+        step = 0
+        while not stop.is_set():
+            for line in range(args.lines_per_step):
+                emit(f"session {index} step {step} line {line}: fetched 3 sources, drafted 412 words")
+                emitted += 1
+            step += 1
+            await asyncio.sleep(args.step_interval)
+
+    tasks = [asyncio.create_task(monitor())] + [asyncio.create_task(session(i)) for i in range(args.sessions)]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    ordered = sorted(lags)
+    return {
+        "emitted": emitted,
+        "lag_p50_ms": statistics.median(ordered) * 1000,
+        "lag_p99_ms": ordered[int(0.99 * (len(ordered) - 1))] * 1000,
+        "lag_max_ms": ordered[-1] * 1000,
+    }
+
+
+def run_print(args) -> dict:
+    stream = SlowStream(args.write_delay)
+    # One write per line, as StreamHandler does; print() would write the text and "\n" separately
+    result = asyncio.run(measure(lambda line: stream.write(line + "\n"), args))
+    result["writes"] = stream.writes
+    return result
+
+
+def run_logging(args) -> dict:
+    from app.core.log import get_logger, log_context, setup_logging, shutdown_logging
+
+    stream = SlowStream(args.write_delay)
+    shutdown_logging()  # in case app.main was imported, which sets up logging to stdout
+    setup_logging(stream=stream)
+    logger = get_logger("benchmark")
+
+    def emit(line):
+        with log_context(session_id="benchmark"):
+            logger.info(line)
+
+    result = asyncio.run(measure(emit, args))
+    drain_started = time.perf_counter()
+    shutdown_logging()
+    result["drain_seconds"] = time.perf_counter() - drain_started
+    result["writes"] = stream.writes
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    print(f"{args.sessions} sessions x {args.lines_per_step} lines every {args.step_interval * 1000:.0f}ms, "
+          f"{args.write_delay * 1000:.2f}ms per write, {args.duration:.0f}s\n")
+    print(f"{'sink':<10}{'lines':>9}{'writes':>9}{'lag p50':>11}{'lag p99':>11}{'lag max':>11}")
+    for name, run in (("print", run_print), ("logging", run_logging)):
+        r = run(args)
+        print(f"{name:<10}{r['emitted']:>9}{r['writes']:>9}{r['lag_p50_ms']:>9.2f}ms{r['lag_p99_ms']:>9.2f}ms{r['lag_max_ms']:>9.2f}ms"
+              + (f"   (queue drained in {r['drain_seconds']:.2f}s)" if "drain_seconds" in r else ""))
+
+
+if __name__ == "__main__":
+    main()
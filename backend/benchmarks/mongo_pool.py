@@ -0,0 +1,200 @@
+"""
+MongoDB pool size, wire compression and read routing under a mixed load.
+
+Seeds ``--sessions`` research sessions, each with ``--history`` agent updates.
+Then it runs these through the real ``ResearchService`` for ``--duration``
+seconds per configuration:
+
+- writers appending agent updates (``add_agent_update``), like running agents
+- history readers replaying every update of a session, like WebSocket reconnects
+- listing readers loading a user's recent sessions, like the dashboard
+
+Each configuration is one combination of ``--pool-sizes``, ``--compressors`` and
+``--read-preferences``. The read preference is applied to both history and
+listing reads. Routing only matters against a replica set, e.g. three local
+``mongod --replSet rs0`` processes (see ``benchmarks/README.md``):
+
+    cd backend
+    python -m benchmarks.mongo_pool \\
+        --mongo-url "mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0" \\
+        --pool-sizes 10,100 --read-preferences primary,secondaryPreferred --compressors none,zstd
+
+Without ``--mongo-url`` it runs against in-memory ``mongomock_motor`` as a
+smoke test only: pool size, compression and read routing have no effect there.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default="")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--history", type=int, default=300, help="agent updates seeded per session")
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--history-readers", type=int, default=32)
+    parser.add_argument("--listing-readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per configuration")
+    parser.add_argument("--pool-sizes", default="100")
+    parser.add_argument("--compressors", default="none", help="comma list; 'none' or e.g. zstd, snappy, zlib")
+    parser.add_argument("--read-preferences", default="primary,secondaryPreferred")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def update_record(seq: int) -> dict:
+    return {
+        "seq": seq,
+        "agent": "researcher",
+        "action": "sources_found",
+        "details": {
+            "section": "Market landscape and key players",
+            "message": "Found 3 sources",
+            "sources": [f"https://example.com/articles/{seq}/{i}" for i in range(3)],
+        },
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+async def seed(db, args) -> list:
+    await db.research_sessions.drop()
+    now = datetime.utcnow()
+    docs = [{
+        "topic": f"benchmark topic {i}",
+        "user_id": f"user-{i % args.users}",
+        "status": "researching",
+        "plan": {
+            "sections": [f"Section {s}: " + "x" * 200 for s in range(5)],
+            "research_questions": [f"Question {q}?" for q in range(5)],
+            "estimated_sources": 15,
+        },
+        "sections": [],
+        "agent_updates": [update_record(seq) for seq in range(1, args.history + 1)],
+        "version": args.history,
+        "created_at": now - timedelta(minutes=i),
+        "updated_at": now,
+    } for i in range(args.sessions)]
+    result = await db.research_sessions.insert_many(docs)
+    await db.research_sessions.create_index([("user_id", 1), ("created_at", -1)])
+    return [str(_id) for _id in result.inserted_ids]
+
+
+async def run_config(args, pool_size: int, compressors: str, read_pref: str) -> dict:
+    from app.core.config import settings
+    from app.core.database import Database
+    from app.core.encoding import EncodedEvent
+    from app.services.research_service import ResearchService
+
+    settings.mongo_max_pool_size = pool_size
+    settings.mongo_compressors = "" if compressors == "none" else compressors
+    settings.mongo_history_read_preference = read_pref
+    settings.mongo_listing_read_preference = read_pref
+    await Database.connect_db()
+    db = Database.get_db()
+    try:
+        session_ids = await seed(db, args)
+        service = ResearchService(db)
+        next_seq = {session_id: itertools.count(args.history + 1) for session_id in session_ids}
+        latencies = {"write": [], "history": [], "listing": []}
+        deadline = time.perf_counter() + args.duration
+
+        async def loop(kind, operation):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await operation()
+                latencies[kind].append(time.perf_counter() - started)
+                await asyncio.sleep(0)  # mongomock never yields; keep the mix fair in the smoke run
+
+        async def write():
+            session_id = random.choice(session_ids)
+            await service.add_agent_update(session_id, EncodedEvent(update_record(next(next_seq[session_id]))))
+
+        async def replay():
+            await service.get_agent_updates(random.choice(session_ids))
+
+        async def listing():
+            await service.get_user_sessions(f"user-{random.randrange(args.users)}")
+
+        await asyncio.gather(
+            *[loop("write", write) for _ in range(args.writers)],
+            *[loop("history", replay) for _ in range(args.history_readers)],
+            *[loop("listing", listing) for _ in range(args.listing_readers)],
+        )
+        result = {"pool": pool_size, "compressors": compressors, "reads": read_pref}
+        for kind, values in latencies.items():
+            result[f"{kind}_per_s"] = len(values) / args.duration
+            result[f"{kind}_p50_ms"] = statistics.median(values) * 1000 if values else float("nan")
+            result[f"{kind}_p99_ms"] = percentile(values, 0.99) * 1000
+        return result
+    finally:
+        await db.research_sessions.drop()
+        await Database.close_db()
+
+
+def print_report(results: list):
+    header = f"{'pool':>5} {'compress':<9}{'reads':<20}"
+    for kind in ("write", "history", "listing"):
+        header += f"{kind + '/s':>11}{'p50':>8}{'p99':>8}"
+    print(header)
+    for r in results:
+        line = f"{r['pool']:>5} {r['compressors']:<9}{r['reads']:<20}"
+        for kind in ("write", "history", "listing"):
+            line += f"{r[kind + '_per_s']:>11.0f}{r[kind + '_p50_ms']:>8.1f}{r[kind + '_p99_ms']:>8.1f}"
+        print(line)
+    print("\n(latencies in ms)")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ["DATABASE_NAME"] = f"insightengine_pool_bench_{int(time.time())}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    if args.mongo_url:
+        os.environ["MONGODB_URL"] = args.mongo_url
+
+    from app.core.database import Database
+
+    read_prefs = args.read_preferences.split(",")
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient
+
+        async def connect_db():
+            Database.client = AsyncMongoMockClient()
+
+        Database.connect_db = staticmethod(connect_db)
+        # mongomock has no replica set; with_options() there returns a synchronous collection
+        read_prefs = ["primary"]
+        print("No --mongo-url: in-memory smoke run, pool/compression/routing have no effect\n")
+
+    results = []
+    for pool_size, compressors, read_pref in itertools.product(
+        [int(size) for size in args.pool_sizes.split(",")], args.compressors.split(","), read_prefs
+    ):
+        results.append(asyncio.run(run_config(args, pool_size, compressors, read_pref)))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Replay a recorded research session without network, LLM or database.
+
+Record sessions by running the backend with ``CASSETTE_MODE=record``. Each
+session then leaves ``<session_id>.jsonl.gz`` in ``CASSETTE_DIR``, which
+defaults to ``$TMPDIR/insightengine_cassettes``. This script feeds a
+cassette through ``MultiAgentResearchSystem`` exactly as ``execute_research``
+would, skipping approval and persistence. With ``--latency zero`` the wall
+time is pure orchestration overhead.
+
+    cd backend
+    python -m benchmarks.replay /tmp/insightengine_cassettes/<id>.jsonl.gz --repeat 5
+    python -m benchmarks.replay <cassette> --latency recorded --profile replay.pstats
+"""
+import argparse
+import asyncio
+import cProfile
+import os
+import statistics
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette")
+    parser.add_argument("--latency", choices=["zero", "recorded"], default="zero")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profile", help="write cProfile stats of the last run to this file")
+    return parser.parse_args(argv)
+
+
+async def replay_once(path: str, latency: str) -> dict:
+    from app.services.cassette import Cassette, ReplayLatency
+    from app.services.multi_agent import MultiAgentResearchSystem, AgentState
+
+    cassette = Cassette.load(path, ReplayLatency(latency))
+    events = []
+
+    async def collect(update):
+        events.append(update)
+
+    system = MultiAgentResearchSystem(update_callback=collect, cassette=cassette)
+    state = AgentState(topic=cassette.metadata.get("topic", ""))
+
+    started = time.perf_counter()
+    state = await system.manager_agent(state)
+    state = await system.run_research(state)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "seconds": elapsed,
+        "sections": len(state.sections),
+        "events": len(events),
+        "interactions": len(cassette.entries),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    runs = []
+    for i in range(args.repeat):
+        profiler = cProfile.Profile() if args.profile and i == args.repeat - 1 else None
+        if profiler:
+            profiler.enable()
+        runs.append(asyncio.run(replay_once(args.cassette, args.latency)))
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+
+    seconds = [r["seconds"] for r in runs]
+    last = runs[-1]
+    print(f"{last['interactions']} recorded interactions -> {last['sections']} sections, {last['events']} events")
+    print(f"replay ({args.latency} latency) over {len(runs)} runs: "
+          f"min {min(seconds):.3f}s  median {statistics.median(seconds):.3f}s  max {max(seconds):.3f}s")
+    if args.profile:
+        print(f"profile written to {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Report download time-to-first-byte, total time and peak memory vs report size.
+
+For each store (``local``, ``gridfs`` and ``gridfs+cache``) and each size in
+``--sizes-mb``, stores a random report and downloads it through the real
+``/api/research/download`` route. The route is driven directly over ASGI by
+a client that throws the body away, so only server-side work is measured.
+The ``buffered`` row reads the whole report into memory before sending it,
+which is what serving from GridFS without streaming would do.
+
+GridFS runs on in-memory ``mongomock_motor`` unless ``--mongo-url`` is given.
+
+    cd backend
+    python -m benchmarks.report_download --sizes-mb 1,10,50
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", default="1,10,50")
+    parser.add_argument("--stores", default="local,gridfs,gridfs+cache")
+    parser.add_argument("--mongo-url", default="")
+    return parser.parse_args(argv)
+
+
+async def asgi_get(app, path: str) -> dict:
+    """GET ``path`` on ``app``; the body is counted and dropped"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    sent = False
+    never = asyncio.get_running_loop().create_future()
+    result = {"status": None, "bytes": 0, "ttfb": None}
+    started = time.perf_counter()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return await never  # the client stays connected
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            if result["ttfb"] is None:
+                result["ttfb"] = time.perf_counter() - started
+            result["bytes"] += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    result["total"] = time.perf_counter() - started
+    never.cancel()
+    return result
+
+
+async def buffered_get(service, key: str) -> dict:
+    started = time.perf_counter()
+    report = await service.reports.stat(key)
+    body = b"".join([chunk async for chunk in service.reports.read(report, 0, report.length - 1)])
+    elapsed = time.perf_counter() - started
+    return {"status": 200, "bytes": len(body), "ttfb": elapsed, "total": elapsed}
+
+
+async def measure(fetch) -> dict:
+    await fetch()  # warm-up (and, for the cache, populate it)
+    timing = await fetch()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    await fetch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timing["peak_mb"] = peak / 1024 / 1024
+    return timing
+
+
+async def run_store(args, store: str, sizes) -> list:
+    from app.main import app, lifespan
+    from app.core.config import settings
+    from app.core.database import Database
+    from app.models.schemas import SectionContent
+    from app.services.report_store import report_fingerprint, report_key
+
+    settings.report_store = store.split("+")[0]
+    scratch = tempfile.mkdtemp(prefix="report_bench_")
+    settings.report_dir = os.path.join(scratch, "store")
+    settings.report_cache_dir = os.path.join(scratch, "cache") if store.endswith("+cache") else ""
+    rows = []
+    try:
+        async with lifespan(app):
+            service = app.state.research_service
+            for size_mb in sizes:
+                source = os.path.join(scratch, "source.pdf")
+                with open(source, "wb") as f:
+                    f.write(os.urandom(size_mb * 1024 * 1024))
+                sections = [SectionContent(title="Findings", content="benchmark", citations=[])]
+                doc = {
+                    "topic": "bench", "user_id": "bench", "status": "completed", "created_at": datetime.utcnow(),
+                    "sections": [section.dict() for section in sections],
+                }
+                session_id = str((await Database.get_db().research_sessions.insert_one(doc)).inserted_id)
+                key = report_key(session_id, report_fingerprint("bench", sections))
+                stored = await service.reports.put(key, source)
+                await service.complete_session(session_id, stored.key)
+
+                streamed = await measure(lambda: asgi_get(app, f"/api/research/download/{session_id}"))
+                assert streamed["status"] == 200 and streamed["bytes"] == stored.length, streamed
+                rows.append((store, "streamed", size_mb, streamed))
+                if not store.endswith("+cache"):
+                    rows.append((store, "buffered", size_mb, await measure(lambda: buffered_get(service, stored.key))))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return rows
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["LOG_LEVEL"] = "WARNING"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if args.mongo_url:
+        os.environ["MONGODB_URL"] = args.mongo_url
+        os.environ["DATABASE_NAME"] = f"insightengine_report_bench_{int(time.time())}"
+
+    from app.core.database import Database
+
+    patches = ExitStack()
+    if not args.mongo_url:
+        from mongomock_motor import AsyncMongoMockClient, enabled_gridfs_integration
+
+        patches.enter_context(enabled_gridfs_integration())
+
+        async def connect_db():
+            Database.client = AsyncMongoMockClient()
+
+        Database.connect_db = staticmethod(connect_db)
+
+    sizes = [int(size) for size in args.sizes_mb.split(",")]
+    print(f"{'store':<14}{'path':<10}{'size':>7}{'ttfb':>11}{'total':>11}{'peak mem':>11}")
+    with patches:
+        for store in args.stores.split(","):
+            for store_name, path, size_mb, r in asyncio.run(run_store(args, store, sizes)):
+                print(f"{store_name:<14}{path:<10}{size_mb:>5}MB{r['ttfb'] * 1000:>9.1f}ms"
+                      f"{r['total'] * 1000:>9.1f}ms{r['peak_mb']:>9.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
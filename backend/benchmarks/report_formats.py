@@ -0,0 +1,105 @@
+"""
+Report render time and output size per export format.
+
+Builds a synthetic report of ``--sections`` sections, each with
+``--paragraphs`` paragraphs of ``--words`` words and ``--citations`` citations
+(half of them shared across sections, so deduplication has work to do). The
+shared ``build_report_document`` step is timed on its own. Each renderer
+(PDF, Markdown, HTML) is then timed on the built document. Timings are the
+median of ``--repeat`` renders after one warm-up render. The warm-up absorbs
+the first reportlab import.
+
+    cd backend
+    python -m benchmarks.report_formats --sections 8 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+WORDS = ("market growth adoption evidence analysis regulation supply demand platform research "
+         "emerging capacity investment policy framework signal industry trend data model").split()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--citations", type=int, default=6, help="citations per section")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def synthetic_sections(args):
+    from app.models.schemas import Citation, SectionContent
+
+    rng = random.Random(args.seed)
+    sections = []
+    for s in range(args.sections):
+        paragraphs = [" ".join(rng.choice(WORDS) for _ in range(args.words)).capitalize() + "."
+                      for _ in range(args.paragraphs)]
+        citations = []
+        for c in range(args.citations):
+            # Every other citation is shared by all sections
+            source = f"shared-{c}" if c % 2 else f"s{s}-{c}"
+            citations.append(Citation(title=f"Source {source}", url=f"https://example.com/{source}",
+                                      excerpt="excerpt"))
+        sections.append(SectionContent(title=f"Section {s + 1}: {rng.choice(WORDS)} outlook",
+                                       content="\n\n".join(paragraphs), citations=citations))
+    return sections
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["LOG_LEVEL"] = "WARNING"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.services.export_service import RENDERERS, build_report_document
+
+    sections = synthetic_sections(args)
+    build_s = timed(lambda: build_report_document("Benchmark topic", sections, "bench"), args.repeat)
+    document = build_report_document("Benchmark topic", sections, "bench")
+
+    results = {"build_ms": build_s * 1000, "references": len(document.references), "formats": {}}
+    with tempfile.TemporaryDirectory(prefix="report_formats_") as scratch:
+        for report_format, renderer in RENDERERS.items():
+            path = os.path.join(scratch, f"report.{report_format.value}")
+            seconds = timed(lambda: renderer.render(document, path), args.repeat)
+            results["formats"][report_format.value] = {
+                "render_ms": seconds * 1000,
+                "bytes": os.path.getsize(path),
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    pdf_ms = results["formats"]["pdf"]["render_ms"]
+    print(f"{args.sections} sections, {len(document.references)} unique references "
+          f"(median of {args.repeat})\n")
+    print(f"{'build document':<16}{results['build_ms']:>10.2f} ms")
+    print(f"\n{'format':<8}{'render':>12}{'size':>12}{'vs pdf':>10}")
+    for name, r in results["formats"].items():
+        print(f"{name:<8}{r['render_ms']:>9.2f} ms{r['bytes'] / 1024:>9.1f} KB{pdf_ms / r['render_ms']:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
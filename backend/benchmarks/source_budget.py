@@ -0,0 +1,144 @@
+"""
+What the content budget does to source gathering.
+
+Runs ``WebResearchService.gather_sources`` for ``--sections`` sections against
+simulated search results and pages: nothing leaves the process. A fraction of
+pages come back empty (``--empty-rate``) or thin (``--thin-rate``, under 200
+chars of text); the rest are full articles. Fetch times are lognormal around
+``--fetch-ms``. Each ``--budgets`` value (``RESEARCH_CONTENT_BUDGET_CHARS``,
+0 = no budget) is run on the same pages and reports, per section, how many
+pages were fetched, how many citations and excerpt characters the writer
+gets, how often the budget was filled (which is what ends fetching), how
+many fetches in flight it cancelled, and the wall time.
+
+    cd backend
+    python -m benchmarks.source_budget --sections 200 --budgets 0,1000,1800,4000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+
+WORDS = ("market growth adoption evidence analysis regulation supply demand platform research "
+         "emerging capacity investment policy framework signal industry trend data model").split()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--budgets", default="0,1000,1800,4000", help="comma-separated budgets in chars")
+    parser.add_argument("--num-sources", type=int, default=3, help="as passed by the researcher agent")
+    parser.add_argument("--empty-rate", type=float, default=0.15)
+    parser.add_argument("--thin-rate", type=float, default=0.25)
+    parser.add_argument("--fetch-ms", type=float, default=40.0, help="median page fetch time")
+    parser.add_argument("--concurrency", type=int, default=20, help="sections gathered at once")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def text(rng: random.Random, chars: int) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(WORDS))
+    return " ".join(words)[:chars]
+
+
+def build_world(args, hits: int):
+    """Per section: ranked search hits, and each page's text and fetch time"""
+    rng = random.Random(args.seed)
+    sections = []
+    for s in range(args.sections):
+        results, pages = [], {}
+        for h in range(hits):
+            url = f"https://host{rng.randrange(50)}.example/s{s}/p{h}"
+            results.append({"title": f"Result {h}", "url": url, "snippet": text(rng, rng.randint(120, 220))})
+            roll = rng.random()
+            if roll < args.empty_rate:
+                body = ""
+            elif roll < args.empty_rate + args.thin_rate:
+                body = f"s{s}p{h} " + text(rng, rng.randint(40, 200))
+            else:
+                body = f"s{s}p{h} " + text(rng, rng.randint(1500, 3000))
+            pages[url] = (body, args.fetch_ms / 1000 * rng.lognormvariate(0, 0.6))
+        sections.append((results, pages))
+    return sections
+
+
+async def run_budget(budget: int, world, args) -> dict:
+    from app.core.config import settings
+    from app.services.web_research import WebResearchService
+
+    settings.research_content_budget_chars = budget
+    fetched, citations, chars, skipped, seconds = [], [], [], [], []
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def section(results, pages):
+        service = WebResearchService()
+        started_fetches = 0
+
+        async def search(query, max_results=5):
+            return results[:max_results]
+
+        async def fetch(url, sent=None):
+            nonlocal started_fetches
+            started_fetches += 1
+            body, delay = pages[url]
+            await asyncio.sleep(delay)
+            return body
+
+        service.search = search
+        service._fetch_content = fetch
+        async with gate:
+            started = time.perf_counter()
+            report = await service.gather_sources("benchmark query", num_sources=args.num_sources, deadline=60)
+        seconds.append(time.perf_counter() - started)
+        fetched.append(started_fetches)
+        citations.append(len(report.citations))
+        chars.append(sum(len(c.excerpt) for c in report.citations))
+        skipped.append(report.budget_skipped)
+
+    await asyncio.gather(*(section(results, pages) for results, pages in world))
+    return {
+        "pages_fetched": statistics.mean(fetched),
+        "citations": statistics.mean(citations),
+        "excerpt_chars": statistics.mean(chars),
+        "under_1000_chars": sum(1 for c in chars if c < 1000) / len(chars),
+        "budget_filled": sum(1 for c in chars if budget and c >= budget) / len(chars),
+        "fetches_cancelled": statistics.mean(skipped),
+        "p50_ms": statistics.median(seconds) * 1000,
+        "p95_ms": sorted(seconds)[int(0.95 * (len(seconds) - 1))] * 1000,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["LOG_LEVEL"] = "WARNING"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.core.config import settings
+
+    world = build_world(args, args.num_sources * max(1, settings.search_overfetch_factor))
+    budgets = [int(b) for b in args.budgets.split(",")]
+    results = {str(budget): asyncio.run(run_budget(budget, world, args)) for budget in budgets}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.sections} sections, {args.num_sources} sources, {args.empty_rate:.0%} empty and "
+          f"{args.thin_rate:.0%} thin pages, fetch median {args.fetch_ms:g} ms\n")
+    print(f"{'budget':>7}{'fetched':>9}{'cites':>7}{'chars':>7}{'<1000':>7}{'filled':>8}{'cancel':>8}{'p50':>9}{'p95':>9}")
+    for budget, r in results.items():
+        print(f"{budget:>7}{r['pages_fetched']:>9.2f}{r['citations']:>7.2f}{r['excerpt_chars']:>7.0f}"
+              f"{r['under_1000_chars']:>7.0%}{r['budget_filled']:>8.0%}{r['fetches_cancelled']:>8.2f}"
+              f"{r['p50_ms']:>6.0f} ms{r['p95_ms']:>6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
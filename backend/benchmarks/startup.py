@@ -0,0 +1,123 @@
+"""
+Worker cold start and per-request dependency overhead.
+
+Each repeat is a fresh interpreter that imports ``app.main``, runs the
+lifespan against an in-memory ``mongomock_motor`` client and sends requests
+through ``httpx.ASGITransport`` (no sockets). Reported per run:
+
+- ``import``: wall time of ``import app.main``
+- ``first response``: import + lifespan startup + the first request
+- ``per request``: mean latency of a request that resolves the research
+  service dependency (a 404 on ``/session/<id>/trace``), after warm-up
+- which heavy third-party modules were already loaded after the import
+
+Point ``--backend`` at another checkout (e.g. a ``git worktree`` of an older
+commit) to compare trees with the same interpreter.
+
+    cd backend
+    python -m benchmarks.startup --repeat 7
+    python -m benchmarks.startup --backend /tmp/baseline/backend
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ("openai", "reportlab", "cloudinary", "bs4", "numpy", "httpx")
+
+CHILD = """
+import time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+import asyncio, json, sys
+heavy = [name for name in {heavy!r} if name in sys.modules]
+
+import httpx
+from mongomock_motor import AsyncMongoMockClient
+from app.core.database import Database
+
+async def connect_db():
+    Database.client = AsyncMongoMockClient()
+
+Database.connect_db = staticmethod(connect_db)
+harness = time.perf_counter() - imported
+
+async def run():
+    application = app.main.app
+    path = "/api/research/session/000000000000000000000000/trace"
+    async with application.router.lifespan_context(application):
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get(path)
+            first = time.perf_counter() - started - harness
+            assert response.status_code == 404, response.status_code
+            for _ in range(50):
+                await client.get(path)
+            began = time.perf_counter()
+            for _ in range({requests}):
+                await client.get(path)
+            per_request = (time.perf_counter() - began) / {requests}
+    return first, per_request
+
+first, per_request = asyncio.run(run())
+print("RESULT " + json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": first * 1000,
+    "per_request_us": per_request * 1e6,
+    "heavy": heavy,
+}}))
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7, help="fresh interpreters to start")
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per interpreter")
+    parser.add_argument("--backend", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help="backend directory to measure (default: this tree)")
+    parser.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+
+def run_child(args) -> dict:
+    env = dict(os.environ, PYTHONPATH=args.backend, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env["LOG_LEVEL"] = "WARNING"
+    code = CHILD.format(heavy=HEAVY_MODULES, requests=args.requests)
+    completed = subprocess.run([sys.executable, "-c", code], cwd=args.backend, env=env,
+                               capture_output=True, text=True, check=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"no result from child:\n{completed.stdout}\n{completed.stderr}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = [run_child(args) for _ in range(args.repeat)]
+    report = {
+        "backend": os.path.abspath(args.backend),
+        "repeat": args.repeat,
+        "import_ms": statistics.median(r["import_ms"] for r in runs),
+        "first_response_ms": statistics.median(r["first_response_ms"] for r in runs),
+        "per_request_us": statistics.median(r["per_request_us"] for r in runs),
+        "heavy_loaded": runs[-1]["heavy"],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['backend']} (median of {args.repeat} cold starts)\n")
+    print(f"import app.main     {report['import_ms']:>9.0f} ms")
+    print(f"first response      {report['first_response_ms']:>9.0f} ms")
+    print(f"per request         {report['per_request_us']:>9.0f} us")
+    print(f"heavy modules       {', '.join(report['heavy_loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,58 @@
 #!/usr/bin/env python3
+"""
+Development:  python run.py                    (one process, auto-reload)
+Production:   python run.py --prod --workers 4 (uvloop + httptools, graceful drain)
+"""
+import argparse
+import os
+import shutil
+import tempfile
 import uvicorn
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prod", action="store_true", help="multi-worker production mode, no reload")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1,
+                        help="worker processes in --prod mode (default: $WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.environ.get("SHUTDOWN_GRACE_SECONDS", 30)),
+                        help="seconds uvicorn waits for requests in flight on shutdown; research runs "
+                             "are drained separately in the app lifespan (SHUTDOWN_GRACE_SECONDS)")
+    return parser.parse_args()
+
+
+def prepare_metrics_dir(workers: int):
+    """prometheus_client multiprocess mode needs a shared directory, empty when the workers start"""
+    if workers < 2:
+        return
+    path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "insightengine_metrics"))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+    args = parse_args()
+    if not args.prod:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info"
+        )
+    else:
+        # Set before the workers start: they are spawned and inherit the environment
+        prepare_metrics_dir(args.workers)
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            loop="uvloop",
+            http="httptools",
+            proxy_headers=True,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            log_level="info"
+        )
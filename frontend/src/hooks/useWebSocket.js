@@ -1,51 +1,88 @@
-import { useEffect, useState, useCallback } from 'react';
+import { useEffect, useState, useRef } from 'react';
 import { researchApi } from '../services/api';
 
+const MAX_RECONNECT_DELAY = 10000;
+
 export const useWebSocket = (sessionId) => {
   const [updates, setUpdates] = useState([]);
   const [connected, setConnected] = useState(false);
+  // Place in the admission queue while the run waits for a slot, else null
+  const [queue, setQueue] = useState(null);
   const [ws, setWs] = useState(null);
+  // Highest event sequence number received; reconnects resume after it
+  const lastSeq = useRef(0);
 
   useEffect(() => {
     if (!sessionId) return;
 
-    const websocket = researchApi.createWebSocket(sessionId);
+    let websocket = null;
+    let reconnectTimer = null;
+    let attempts = 0;
+    let closedByUs = false;
+    lastSeq.current = 0;
+    setUpdates([]);
+    setQueue(null);
 
-    websocket.onopen = () => {
-      console.log('WebSocket connected');
-      setConnected(true);
+    const appendNew = (incoming) => {
+      const fresh = incoming.filter((u) => u.seq === undefined || u.seq > lastSeq.current);
+      if (fresh.length === 0) return;
+      fresh.forEach((u) => {
+        if (u.seq !== undefined) lastSeq.current = Math.max(lastSeq.current, u.seq);
+      });
+      setUpdates((prev) => [...prev, ...fresh]);
     };
 
-    websocket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      
-      if (data.type === 'history') {
-        // Received historical updates
-        setUpdates(data.updates);
-      } else if (data.type === 'agent_update') {
-        // Received new update
-        setUpdates((prev) => [...prev, data.update]);
-      }
-    };
+    const connect = () => {
+      websocket = researchApi.createWebSocket(sessionId, lastSeq.current);
 
-    websocket.onerror = (error) => {
-      console.error('WebSocket error:', error);
-    };
+      websocket.onopen = () => {
+        console.log('WebSocket connected');
+        attempts = 0;
+        setConnected(true);
+      };
+
+      websocket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+
+        if (data.type === 'history') {
+          // Received historical updates (only the missed ones when resuming)
+          appendNew(data.updates);
+        } else if (data.type === 'agent_update') {
+          // Received new update; a running agent means the run was admitted
+          setQueue(null);
+          appendNew([data.update]);
+        } else if (data.type === 'queue') {
+          setQueue({ phase: data.phase, position: data.position, waiting: data.waiting });
+        }
+      };
+
+      websocket.onerror = (error) => {
+        console.error('WebSocket error:', error);
+      };
+
+      websocket.onclose = () => {
+        console.log('WebSocket disconnected');
+        setConnected(false);
+        if (closedByUs) return;
+        const delay = Math.min(MAX_RECONNECT_DELAY, 500 * 2 ** attempts);
+        attempts += 1;
+        reconnectTimer = setTimeout(connect, delay);
+      };
 
-    websocket.onclose = () => {
-      console.log('WebSocket disconnected');
-      setConnected(false);
+      setWs(websocket);
     };
 
-    setWs(websocket);
+    connect();
 
     // Cleanup
     return () => {
-      if (websocket.readyState === WebSocket.OPEN) {
+      closedByUs = true;
+      clearTimeout(reconnectTimer);
+      if (websocket && websocket.readyState === WebSocket.OPEN) {
         websocket.close();
       }
     };
   }, [sessionId]);
 
-  return { updates, connected, ws };
+  return { updates, connected, ws, queue };
 };
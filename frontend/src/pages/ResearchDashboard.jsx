@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useMemo, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { Download, ArrowLeft, Activity, Brain, ExternalLink, Sparkles, Zap } from 'lucide-react';
+import { Download, ArrowLeft, Activity, Brain, ExternalLink, Sparkles, Zap, XCircle } from 'lucide-react';
 import { researchApi } from '../services/api';
 import { useWebSocket } from '../hooks/useWebSocket';
 import AgentActivityCard from '../components/AgentActivityCard';
@@ -9,6 +9,9 @@ import PlanApprovalDialog from '../components/PlanApprovalDialog';
 import DownloadModal from '../components/DownloadModal';
 import { getAgentColor, getAgentIcon } from '../utils/helpers';
 
+// Statuses a session cannot leave; anything else can still be cancelled
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled'];
+
 const ResearchDashboard = () => {
   const params = useParams();
   const navigate = useNavigate();
@@ -21,7 +24,7 @@ const ResearchDashboard = () => {
   const canvasRef = useRef(null);
   
   // Only connect to WebSocket if we have a valid sessionId
-  const { updates: liveUpdates, connected } = useWebSocket(sessionId && sessionId !== 'undefined' ? sessionId : null);
+  const { updates: liveUpdates, connected, queue } = useWebSocket(sessionId && sessionId !== 'undefined' ? sessionId : null);
 
   // Combine live updates with historical updates from session
   const allUpdates = useMemo(() => {
@@ -196,6 +199,19 @@ const ResearchDashboard = () => {
     }
   };
 
+  const handleCancel = async () => {
+    if (!window.confirm('Stop this research session? Work done so far will be discarded.')) {
+      return;
+    }
+    try {
+      await researchApi.cancelResearch(sessionId);
+    } catch (error) {
+      // 409: it finished meanwhile; the reload below shows the final status
+      console.error('Failed to cancel research:', error);
+    }
+    await loadSession();
+  };
+
   const handleDownload = () => {
     window.open(researchApi.downloadReport(sessionId), '_blank');
   };
@@ -452,9 +468,24 @@ const ResearchDashboard = () => {
                   {/* <div className={`w-2 h-2 rounded-full ${connected ? 'bg-green-400 animate-pulse-ring' : 'bg-slate-400'}`}></div> */}
                   <span className="text-sm text-blue-200">{connected ? 'Live' : 'Reconnecting...'}</span>
                 </div>
+                {queue && (
+                  <div className="glass-effect-light px-4 py-2 rounded-full">
+                    <span className="text-sm text-blue-200">Queued for {queue.phase}: #{queue.position} of {queue.waiting}</span>
+                  </div>
+                )}
               </div>
             </div>
             
+            {!FINISHED_STATUSES.includes(session.status) && (
+              <button
+                onClick={handleCancel}
+                className="flex items-center gap-2 px-6 py-3 glass-effect-light text-red-300 font-bold rounded-xl hover:text-red-200 hover:bg-red-500/10 transition-all duration-300"
+              >
+                <XCircle className="w-5 h-5" />
+                <span>Cancel Research</span>
+              </button>
+            )}
+
             {session.status === 'completed' && (
               <div className="flex items-center gap-3">
                 <button
@@ -103,6 +103,12 @@ export const researchApi = {
     return `${API_BASE_URL}/api/research/download/${sessionId}`;
   },
 
+  // Stop a running research session
+  cancelResearch: async (sessionId) => {
+    const response = await api.post(`/api/research/session/${sessionId}/cancel`);
+    return response.data;
+  },
+
   // Delete a research session
   deleteSession: async (sessionId) => {
     const response = await api.delete(`/api/research/session/${sessionId}`);
@@ -110,9 +116,10 @@ export const researchApi = {
   },
 
   // Create WebSocket connection
-  createWebSocket: (sessionId) => {
+  createWebSocket: (sessionId, since = 0) => {
     const token = localStorage.getItem('token');
-    return new WebSocket(`${WS_BASE_URL}/api/research/stream/${sessionId}`);
+    const query = since > 0 ? `?since=${since}` : '';
+    return new WebSocket(`${WS_BASE_URL}/api/research/stream/${sessionId}${query}`);
   },
 };
 
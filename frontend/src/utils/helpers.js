@@ -46,6 +46,7 @@ export const getAgentIcon = (agent) => {
 export const getStatusColor = (status) => {
   const colors = {
     pending: 'bg-slate-100 text-slate-700 border-slate-200',
+    queued: 'bg-slate-100 text-slate-700 border-slate-200',
     planning: 'bg-blue-50 text-blue-700 border-blue-200',
     awaiting_approval: 'bg-amber-50 text-amber-700 border-amber-200',
     researching: 'bg-blue-50 text-blue-700 border-blue-200',
@@ -53,6 +54,7 @@ export const getStatusColor = (status) => {
     reviewing: 'bg-orange-50 text-orange-700 border-orange-200',
     completed: 'bg-emerald-50 text-emerald-700 border-emerald-200',
     failed: 'bg-red-50 text-red-700 border-red-200',
+    cancelled: 'bg-slate-100 text-slate-500 border-slate-200',
   };
   return colors[status] || 'bg-slate-100 text-slate-700 border-slate-200';
 };